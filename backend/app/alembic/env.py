@@ -33,7 +33,7 @@ target_metadata = SQLModel.metadata
 
 
 def get_url():
-    return settings.SQLALCHEMY_DATABASE_URI
+    return str(settings.SQLALCHEMY_DATABASE_URI)
 
 
 def run_migrations_offline():
@@ -0,0 +1,87 @@
+"""add owners
+
+Revision ID: 0f20dd9d2fac
+Revises: e3c81f4a6b27
+Create Date: 2026-10-17 18:45:54.436840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '0f20dd9d2fac'
+down_revision = 'e3c81f4a6b27'
+branch_labels = None
+depends_on = None
+
+ITEM_TABLES = (
+    ('github_pull_requests', 'pull_request'),
+    ('gitlab_merge_requests', 'merge_request'),
+    ('jira_issues', 'issue'),
+)
+
+SYNC_STATE_COLUMNS = (
+    'source, last_synced_at, last_error, high_water_mark, last_full_sync_at, '
+    'last_inserted, last_updated, last_deleted, last_unchanged, data_version'
+)
+
+# Existing rows belong to the first settings row, which was the only user so far
+FIRST_OWNER = '(SELECT COALESCE(MIN(id), 0) FROM settings)'
+
+
+def create_sync_state_table(name, primary_key):
+    op.create_table(name,
+    sa.Column('source', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    *([sa.Column('owner_id', sa.Integer(), nullable=False)] if 'owner_id' in primary_key else []),
+    sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('high_water_mark', sa.DateTime(), nullable=True),
+    sa.Column('last_full_sync_at', sa.DateTime(), nullable=True),
+    sa.Column('last_inserted', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_updated', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_deleted', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_unchanged', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'),
+    sa.PrimaryKeyConstraint(*primary_key)
+    )
+
+
+def upgrade():
+    for table, key in ITEM_TABLES:
+        op.add_column(table, sa.Column('owner_id', sa.Integer(), nullable=False, server_default='0'))
+        op.execute(f'UPDATE {table} SET owner_id = {FIRST_OWNER}')
+        # Items synced before any settings existed have no owner to belong to
+        op.execute(f'DELETE FROM {table} WHERE owner_id = 0')
+        op.drop_index(f'ix_{table}_{key}', table_name=table)
+        op.create_index(op.f(f'ix_{table}_{key}'), table, [key], unique=False)
+        op.create_index(f'ix_{table}_owner_id_{key}', table, ['owner_id', key], unique=True)
+        op.create_index(f'ix_{table}_owner_id_status', table, ['owner_id', 'status'], unique=False)
+
+    # The primary key changes, so the table is rebuilt rather than altered
+    create_sync_state_table('sync_state_new', ('source', 'owner_id'))
+    op.execute(
+        f'INSERT INTO sync_state_new (owner_id, {SYNC_STATE_COLUMNS}) '
+        f'SELECT {FIRST_OWNER}, {SYNC_STATE_COLUMNS} FROM sync_state'
+    )
+    op.drop_table('sync_state')
+    op.rename_table('sync_state_new', 'sync_state')
+
+
+def downgrade():
+    create_sync_state_table('sync_state_old', ('source',))
+    op.execute(
+        f'INSERT INTO sync_state_old ({SYNC_STATE_COLUMNS}) '
+        f'SELECT {SYNC_STATE_COLUMNS} FROM sync_state WHERE owner_id = {FIRST_OWNER}'
+    )
+    op.drop_table('sync_state')
+    op.rename_table('sync_state_old', 'sync_state')
+
+    for table, key in ITEM_TABLES:
+        op.execute(f'DELETE FROM {table} WHERE owner_id != {FIRST_OWNER}')
+        op.drop_index(f'ix_{table}_owner_id_status', table_name=table)
+        op.drop_index(f'ix_{table}_owner_id_{key}', table_name=table)
+        op.drop_index(op.f(f'ix_{table}_{key}'), table_name=table)
+        op.create_index(f'ix_{table}_{key}', table, [key], unique=True)
+        op.drop_column(table, 'owner_id')
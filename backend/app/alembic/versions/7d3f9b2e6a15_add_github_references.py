@@ -0,0 +1,38 @@
+"""add github references
+
+Revision ID: 7d3f9b2e6a15
+Revises: c4d2a8f61e37
+Create Date: 2026-10-18 09:12:44.281306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f9b2e6a15'
+down_revision = 'c4d2a8f61e37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('github_pull_requests', sa.Column('reference', sqlmodel.sql.sqltypes.AutoString(), nullable=False, server_default=''))
+    op.execute("UPDATE github_pull_requests SET reference = repository || '#' || CAST(pull_request AS TEXT)")
+    op.drop_index('ix_github_pull_requests_owner_id_pull_request', table_name='github_pull_requests')
+    op.create_index(op.f('ix_github_pull_requests_reference'), 'github_pull_requests', ['reference'], unique=False)
+    op.create_index('ix_github_pull_requests_owner_id_reference', 'github_pull_requests', ['owner_id', 'reference'], unique=True)
+
+
+def downgrade():
+    # Keep one pull request per number, which is all the number-only key can hold
+    op.execute(
+        'DELETE FROM github_pull_requests WHERE EXISTS ('
+        'SELECT 1 FROM github_pull_requests other WHERE other.owner_id = github_pull_requests.owner_id '
+        'AND other.pull_request = github_pull_requests.pull_request AND other.id < github_pull_requests.id)'
+    )
+    op.drop_index('ix_github_pull_requests_owner_id_reference', table_name='github_pull_requests')
+    op.drop_index(op.f('ix_github_pull_requests_reference'), table_name='github_pull_requests')
+    op.create_index('ix_github_pull_requests_owner_id_pull_request', 'github_pull_requests', ['owner_id', 'pull_request'], unique=True)
+    op.drop_column('github_pull_requests', 'reference')
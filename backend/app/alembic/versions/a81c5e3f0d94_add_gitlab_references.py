@@ -0,0 +1,39 @@
+"""add gitlab references
+
+Revision ID: a81c5e3f0d94
+Revises: 7d3f9b2e6a15
+Create Date: 2026-10-18 10:03:17.652190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81c5e3f0d94'
+down_revision = '7d3f9b2e6a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('gitlab_merge_requests', sa.Column('reference', sqlmodel.sql.sqltypes.AutoString(), nullable=False, server_default=''))
+    # The repository column holds the full path of the project
+    op.execute("UPDATE gitlab_merge_requests SET reference = repository || '!' || CAST(merge_request AS TEXT)")
+    op.drop_index('ix_gitlab_merge_requests_owner_id_merge_request', table_name='gitlab_merge_requests')
+    op.create_index(op.f('ix_gitlab_merge_requests_reference'), 'gitlab_merge_requests', ['reference'], unique=False)
+    op.create_index('ix_gitlab_merge_requests_owner_id_reference', 'gitlab_merge_requests', ['owner_id', 'reference'], unique=True)
+
+
+def downgrade():
+    # Keep one merge request per iid, which is all the iid-only key can hold
+    op.execute(
+        'DELETE FROM gitlab_merge_requests WHERE EXISTS ('
+        'SELECT 1 FROM gitlab_merge_requests other WHERE other.owner_id = gitlab_merge_requests.owner_id '
+        'AND other.merge_request = gitlab_merge_requests.merge_request AND other.id < gitlab_merge_requests.id)'
+    )
+    op.drop_index('ix_gitlab_merge_requests_owner_id_reference', table_name='gitlab_merge_requests')
+    op.drop_index(op.f('ix_gitlab_merge_requests_reference'), table_name='gitlab_merge_requests')
+    op.create_index('ix_gitlab_merge_requests_owner_id_merge_request', 'gitlab_merge_requests', ['owner_id', 'merge_request'], unique=True)
+    op.drop_column('gitlab_merge_requests', 'reference')
@@ -0,0 +1,79 @@
+"""add search index
+
+Revision ID: c4d2a8f61e37
+Revises: 0f20dd9d2fac
+Create Date: 2026-10-17 21:12:37.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2a8f61e37'
+down_revision = '0f20dd9d2fac'
+branch_labels = None
+depends_on = None
+
+# The searched columns of each item table, with their weight: A ranks above B, B above C
+SEARCH_COLUMNS = {
+    'jira_issues': (('title', 'A'), ('issue', 'A'), ('description', 'C')),
+    'github_pull_requests': (('title', 'A'), ('pull_request', 'A'), ('repository', 'B'), ('description', 'C')),
+    'gitlab_merge_requests': (('title', 'A'), ('merge_request', 'A'), ('repository', 'B'), ('description', 'C')),
+}
+
+
+def upgrade_sqlite(table, columns):
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    # An external content table: the index refers to the rows of the item table by
+    # rowid and reads their text from there, so the text is not stored twice
+    op.execute(
+        f"CREATE VIRTUAL TABLE {table}_fts USING fts5({names}, content='{table}', content_rowid='rowid', "
+        f"tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN '
+        f'INSERT INTO {table}_fts(rowid, {names}) VALUES (new.rowid, {new_values}); END'
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN '
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.rowid, {old_values}); END"
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_fts_update AFTER UPDATE OF {names} ON {table} BEGIN '
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.rowid, {old_values}); "
+        f'INSERT INTO {table}_fts(rowid, {names}) VALUES (new.rowid, {new_values}); END'
+    )
+    op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def upgrade_postgresql(table, columns):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce({column}::text, '')), '{weight}')" for column, weight in columns
+    )
+    op.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED')
+    op.execute(f'CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCH_COLUMNS.items():
+        if dialect == 'sqlite':
+            upgrade_sqlite(table, [column for column, _ in columns])
+        elif dialect == 'postgresql':
+            upgrade_postgresql(table, columns)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_COLUMNS:
+        if dialect == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_vector')
+            op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
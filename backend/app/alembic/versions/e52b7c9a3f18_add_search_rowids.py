@@ -0,0 +1,88 @@
+"""add search rowids
+
+Revision ID: e52b7c9a3f18
+Revises: a81c5e3f0d94
+Create Date: 2026-10-18 11:26:08.417953
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e52b7c9a3f18'
+down_revision = 'a81c5e3f0d94'
+branch_labels = None
+depends_on = None
+
+# The searched columns of each item table, as indexed by c4d2a8f61e37
+SEARCH_COLUMNS = {
+    'jira_issues': ('title', 'issue', 'description'),
+    'github_pull_requests': ('title', 'pull_request', 'repository', 'description'),
+    'gitlab_merge_requests': ('title', 'merge_request', 'repository', 'description'),
+}
+
+
+def drop_search_index(table):
+    for trigger in ('insert', 'delete', 'update'):
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+    op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+def create_search_index(table, columns, rowid, assign_rowid=''):
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    op.execute(
+        f"CREATE VIRTUAL TABLE {table}_fts USING fts5({names}, content='{table}', content_rowid='{rowid}', "
+        f"tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN {assign_rowid}'
+        f'INSERT INTO {table}_fts(rowid, {names}) '
+        f'SELECT {rowid}, {new_values} FROM {table} WHERE rowid = new.rowid; END'
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN '
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.{rowid}, {old_values}); END"
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_fts_update AFTER UPDATE OF {names} ON {table} BEGIN '
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.{rowid}, {old_values}); "
+        f'INSERT INTO {table}_fts(rowid, {names}) VALUES (new.{rowid}, {new_values}); END'
+    )
+    op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # The FTS5 index referred to the rows by their implicit rowid, which VACUUM may
+    # renumber in tables without an INTEGER PRIMARY KEY, leaving the index pointing
+    # at other rows. It refers to them by a column of their own instead, numbered
+    # on insert the way rowids are
+    for table, columns in SEARCH_COLUMNS.items():
+        drop_search_index(table)
+        op.add_column(table, sa.Column('search_rowid', sa.Integer(), nullable=True))
+        op.execute(f'UPDATE {table} SET search_rowid = rowid')
+        op.create_index(f'ix_{table}_search_rowid', table, ['search_rowid'], unique=True)
+        create_search_index(
+            table,
+            columns,
+            'search_rowid',
+            f'UPDATE {table} SET search_rowid = (SELECT COALESCE(MAX(search_rowid), 0) + 1 FROM {table}) '
+            f'WHERE rowid = new.rowid; ',
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table, columns in SEARCH_COLUMNS.items():
+        drop_search_index(table)
+        op.drop_index(f'ix_{table}_search_rowid', table_name=table)
+        op.drop_column(table, 'search_rowid')
+        create_search_index(table, columns, 'rowid')
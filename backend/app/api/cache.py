@@ -0,0 +1,155 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import brotli
+from fastapi import Request, Response
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.metrics import CACHE_LOOKUPS
+from app.core.singleflight import SingleFlight
+
+# Encodings a cached body is compressed with, in order of preference
+ENCODINGS = ("br", "gzip")
+
+_COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "br": lambda body: brotli.compress(body, quality=5),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6),
+}
+
+
+class CachedBody:
+    """
+    A serialized response body together with its strong ETag and the compressed
+    variants built from it so far.
+    """
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str | None) -> bytes:
+        if encoding is None:
+            return self.body
+        if encoding not in self._encoded:
+            self._encoded[encoding] = _COMPRESSORS[encoding](self.body)
+        return self._encoded[encoding]
+
+
+class ResponseCache:
+    """
+    Serialized response bodies, keyed by request and user and by the version of
+    the data they were built from. The least recently used requests are evicted first.
+
+    A body is serialized, hashed and compressed once per data version; until the
+    version changes, repeated requests are answered from memory, or with
+    `304 Not Modified` when the client already holds the current ETag.
+    Concurrent requests that miss on the same body wait for one build of it.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[Hashable, CachedBody]] = OrderedDict()
+        # Built bodies are kept in the entries, so a flight is only shared while it runs
+        self._builds = SingleFlight(0, reusable=lambda cached: False)
+
+    @staticmethod
+    def key(request: Request, owner_id: int) -> str:
+        return f"{owner_id}:{request.url.path}?{sorted(request.query_params.multi_items())}"
+
+    def get(
+        self,
+        request: Request,
+        owner_id: int,
+        version: Hashable,
+        build: Callable[[], BaseModel],
+        include: Dict[str, Any] | None = None,
+    ) -> CachedBody:
+        key = self.key(request, owner_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                CACHE_LOOKUPS.inc(cache="response", result="hit")
+                return entry[1]
+
+        CACHE_LOOKUPS.inc(cache="response", result="miss")
+        cached = self._builds.run_blocking(
+            (key, version), lambda: CachedBody(build().model_dump_json(include=include).encode())
+        )
+        with self._lock:
+            self._entries[key] = (version, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
+
+
+def negotiate_encoding(request: Request) -> str | None:
+    """
+    Picks the preferred encoding the client accepts.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        str | None: One of `ENCODINGS`, or None to send the body uncompressed.
+    """
+    accepted = set()
+    for token in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = token.partition(";")
+        weight = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if weight > 0:
+            accepted.add(coding.strip().lower())
+
+    for encoding in ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def etag_response(request: Request, cached: CachedBody) -> Response:
+    """
+    Builds the response for a cached body, honouring `If-None-Match` and `Accept-Encoding`.
+
+    Each encoding of the body gets its own strong ETag, since the bytes differ.
+
+    Args:
+        request (Request): The incoming request.
+        cached (CachedBody): The serialized body.
+
+    Returns:
+        Response: A `304 Not Modified` when the client holds the current representation,
+            otherwise the (possibly compressed) JSON body.
+    """
+    encoding = negotiate_encoding(request)
+    etag = f'"{cached.etag}-{encoding}"' if encoding else f'"{cached.etag}"'
+    headers: Dict[str, Any] = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        # If-None-Match uses the weak comparison, so a validator a proxy weakened still matches
+        candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=cached.encoded(encoding), media_type="application/json", headers=headers)
@@ -0,0 +1,100 @@
+import hmac
+from typing import Annotated
+
+from fastapi import Depends, Header, HTTPException, Query
+
+from app.core.auth import AuthenticationError, bearer_token
+from app.core.config import settings as app_settings
+from app.core.db import SessionDep
+from app.crud.settings import authenticate_user, get_settings
+from app.models import Settings
+
+
+AuthorizationHeader = Annotated[str | None, Header(description="`Bearer <API token>`; optional while there is a single user")]
+UserIdHeader = Annotated[int | None, Header(description="The user to act for; must be the user of the API token")]
+
+
+def authenticate(db: SessionDep, api_token: str | None, user_id: int | None) -> int:
+    """
+    Resolve the user a request acts for, answering 401 or 403 if it may not.
+    """
+    try:
+        return authenticate_user(db, api_token, user_id)
+    except AuthenticationError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+def get_current_user_id(db: SessionDep, authorization: AuthorizationHeader = None, x_user_id: UserIdHeader = None) -> int:
+    return authenticate(db, bearer_token(authorization), x_user_id)
+
+
+CurrentUserDep = Annotated[int, Depends(get_current_user_id)]
+
+
+def require_admin(authorization: AuthorizationHeader = None) -> None:
+    api_token = bearer_token(authorization)
+    if not app_settings.ADMIN_TOKEN or api_token is None or not hmac.compare_digest(api_token, app_settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="The admin token is required")
+
+
+AdminDep = Depends(require_admin)
+
+
+def get_current_settings(db: SessionDep, user_id: CurrentUserDep) -> Settings | None:
+    return get_settings(db, user_id)
+
+
+CurrentSettingsDep = Annotated[Settings | None, Depends(get_current_settings)]
+
+
+class ListParams:
+    """
+    Pagination and field projection shared by the list endpoints.
+    """
+
+    def __init__(
+        self,
+        limit: Annotated[int | None, Query(ge=1, le=app_settings.LIST_MAX_LIMIT, description="Page size; every item when omitted")] = None,
+        cursor: Annotated[str | None, Query(description="The next_cursor of the previous page")] = None,
+        fields: Annotated[str | None, Query(description="Comma-separated fields to return; id and the item key are always included")] = None,
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()] if fields is not None else None
+
+    def include(self, items_field: str, key: str) -> dict | None:
+        """
+        The fields of a list response to serialize, or None for all of them.
+        """
+        if self.fields is None:
+            return None
+        item_fields = {*self.fields, "id", key}
+        return {items_field: {"__all__": item_fields}, "count": True, "last_synced_at": True, "next_cursor": True, "stale": True}
+
+
+ListParamsDep = Annotated[ListParams, Depends()]
+
+
+class ExportParams:
+    """
+    Field projection of the streaming export endpoints.
+    """
+
+    def __init__(
+        self,
+        fields: Annotated[str | None, Query(description="Comma-separated fields to return; id and the item key are always included")] = None,
+    ) -> None:
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()] if fields is not None else None
+
+    def include(self, key: str) -> set[str] | None:
+        """
+        The fields of an exported item to serialize, or None for all of them.
+        """
+        if self.fields is None:
+            return None
+        return {*self.fields, "id", key}
+
+
+ExportParamsDep = Annotated[ExportParams, Depends()]
@@ -0,0 +1,48 @@
+from typing import Callable, Iterator, List
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, SQLModel
+
+from app.core.db import read_engine
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_response(
+    read_batches: Callable[[Session], Iterator[List[SQLModel]]], include: set[str] | None = None
+) -> StreamingResponse:
+    """
+    Streams items as newline-delimited JSON, one item per line, each batch
+    written as soon as it is read from the database.
+
+    The batches are read through a session of their own, open until the last
+    one was sent: the request's session is closed before a streamed body is.
+    `read_batches` is called, and so the query run, before the response
+    starts, so an invalid request still fails with an error status.
+
+    Args:
+        read_batches (Callable[[Session], Iterator[List[SQLModel]]]): Runs the
+            query on the session and returns the batches of items.
+        include (set[str] | None): The fields of each item to write, or None for all of them.
+
+    Returns:
+        StreamingResponse: The response.
+
+    Raises:
+        ValueError: If the query is invalid.
+    """
+    db = Session(read_engine)
+    try:
+        batches = read_batches(db)
+    except Exception:
+        db.close()
+        raise
+
+    def encode() -> Iterator[bytes]:
+        try:
+            for items in batches:
+                yield "".join(item.model_dump_json(include=include) + "\n" for item in items).encode()
+        finally:
+            db.close()
+
+    return StreamingResponse(encode(), media_type=NDJSON_MEDIA_TYPE)
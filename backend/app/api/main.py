@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import settings, jira, github, gitlab, health
+from app.api.routes import settings, jira, github, gitlab, health, dashboard, events, rate_limits, webhooks, metrics, search
 
 api_router = APIRouter()
 api_router.include_router(settings.router, tags=["settings"])
@@ -8,4 +8,10 @@ api_router.include_router(jira.router, tags=["jira"])
 api_router.include_router(github.router, tags=["github"])
 api_router.include_router(gitlab.router, tags=["gitlab"])
 api_router.include_router(health.router, tags=["health"])
+api_router.include_router(dashboard.router, tags=["dashboard"])
+api_router.include_router(events.router, tags=["events"])
+api_router.include_router(rate_limits.router, tags=["rate-limits"])
+api_router.include_router(search.router, tags=["search"])
 
+api_router.include_router(webhooks.router, tags=["webhooks"])
+api_router.include_router(metrics.router, tags=["metrics"])
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Request
+from sqlmodel import Session
+from app.api.cache import CachedBody, etag_response
+from app.api.deps import CurrentSettingsDep, CurrentUserDep
+from app.core.circuit import circuit_breakers
+from app.core.db import SessionDep
+from app.crud.github import get_github_pull_requests
+from app.crud.gitlab import get_gitlab_merge_requests
+from app.crud.jira import get_jira_issues
+from app.crud.sync import refresh_sources
+from app.crud.sync_state import get_last_synced_at
+from app.models import (
+    DashboardResponse,
+    ErrorResponse,
+    GithubPullRequestResponse,
+    GitlabMergeRequestResponse,
+    JiraIssueResponse,
+)
+import logging
+
+router = APIRouter()
+
+# The dashboard field listing the items of each source
+DASHBOARD_FIELDS = {"jira": "issues", "github": "pull_requests", "gitlab": "merge_requests"}
+
+def read_stored_dashboard(db: Session, user_id: int) -> dict:
+    issues, issues_count, _ = get_jira_issues(db, user_id)
+    pull_requests, pull_requests_count, _ = get_github_pull_requests(db, user_id)
+    merge_requests, merge_requests_count, _ = get_gitlab_merge_requests(db, user_id)
+    return {
+        "issues": JiraIssueResponse(
+            issues=issues,
+            count=issues_count,
+            last_synced_at=get_last_synced_at(db, "jira", user_id),
+            stale=not circuit_breakers["jira"].is_closed,
+        ),
+        "pull_requests": GithubPullRequestResponse(
+            pull_requests=pull_requests,
+            count=pull_requests_count,
+            last_synced_at=get_last_synced_at(db, "github", user_id),
+            stale=not circuit_breakers["github"].is_closed,
+        ),
+        "merge_requests": GitlabMergeRequestResponse(
+            merge_requests=merge_requests,
+            count=merge_requests_count,
+            last_synced_at=get_last_synced_at(db, "gitlab", user_id),
+            stale=not circuit_breakers["gitlab"].is_closed,
+        ),
+    }
+
+@router.get("/dashboard", response_model=DashboardResponse, responses={
+    200: {"description": "Successful response, possibly with stale data for slow or failing sources", "model": DashboardResponse},
+    304: {"description": "Not modified since the ETag sent in If-None-Match"},
+    500: {"description": "Internal server error", "model": ErrorResponse},
+})
+async def read_dashboard(request: Request, db: SessionDep, user_id: CurrentUserDep, user: CurrentSettingsDep):
+    try:
+        sources = await refresh_sources(request.app.state.upstream_clients, user)
+        stored = await asyncio.to_thread(read_stored_dashboard, db, user_id)
+        now = datetime.utcnow()
+        for source, status in sources.items():
+            last_synced_at = stored[DASHBOARD_FIELDS[source]].last_synced_at
+            if status.status == "stale" and last_synced_at is not None:
+                status.age_seconds = (now - last_synced_at).total_seconds()
+        dashboard = DashboardResponse(**stored, sources=sources)
+        return etag_response(request, CachedBody(dashboard.model_dump_json().encode()))
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
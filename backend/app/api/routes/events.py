@@ -0,0 +1,53 @@
+import asyncio
+import json
+from typing import Annotated, AsyncIterator
+
+from fastapi import APIRouter, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from app.api.deps import authenticate
+from app.core.config import settings
+from app.core.db import SessionDep
+from app.core.events import change_broker
+
+router = APIRouter()
+
+async def stream_events(owner_id: int) -> AsyncIterator[str]:
+    """
+    Streams the dashboard events of a user in the Server-Sent Events format.
+
+    `change` events carry the items a sync added, updated or removed for one
+    source, `sync` events the outcome of every sync, and `resync` events tell a
+    client that fell behind to fetch the lists again. A comment is sent while
+    idle so proxies keep the connection open.
+
+    Args:
+        owner_id (int): The user whose events are streamed.
+
+    Yields:
+        str: One encoded event.
+    """
+    with change_broker.subscribe(owner_id) as queue:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event_type, data = await asyncio.wait_for(queue.get(), settings.EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event_type}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@router.get("/events", response_class=StreamingResponse, responses={
+    200: {"description": "Stream of dashboard events", "content": {"text/event-stream": {}}},
+})
+def read_events(
+    db: SessionDep,
+    # EventSource cannot send headers, so the credentials are query parameters here
+    token: Annotated[str | None, Query(description="The API token; optional while there is a single user")] = None,
+    user_id: Annotated[int | None, Query(description="The user to stream events for; must be the user of the API token")] = None,
+):
+    return StreamingResponse(
+        stream_events(authenticate(db, token, user_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
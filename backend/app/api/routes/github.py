@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.api.cache import etag_response, response_cache
+from app.api.deps import CurrentUserDep, ExportParamsDep, ListParamsDep
+from app.api.export import NDJSON_MEDIA_TYPE, ndjson_response
+from app.core.circuit import circuit_breakers
 from app.core.db import SessionDep
-from app.crud.github import get_github_pull_requests
+from app.crud.github import get_github_pull_requests, stream_github_pull_requests
+from app.crud.sync_state import get_data_version
 from app.models import GithubPullRequestResponse, ErrorResponse
 import logging
 
@@ -8,16 +14,72 @@ router = APIRouter()
 
 @router.get("/pull-requests", response_model=GithubPullRequestResponse, responses={
     200: {"description": "Successful response", "model": GithubPullRequestResponse},
+    304: {"description": "Not modified since the ETag sent in If-None-Match"},
+    400: {"description": "Invalid field or cursor", "model": ErrorResponse},
     500: {"description": "Internal server error", "model": ErrorResponse},
-    503: {"description": "GitHub API error", "model": ErrorResponse}
 })
-def read_github_pull_requests(db: SessionDep):
+def read_github_pull_requests(
+    request: Request,
+    db: SessionDep,
+    user_id: CurrentUserDep,
+    params: ListParamsDep,
+    status: str | None = None,
+    repository: str | None = None,
+    is_assigned: bool | None = None,
+):
     try:
-        pull_requests, count = get_github_pull_requests(db)
-        return GithubPullRequestResponse(pull_requests=pull_requests, count=count)
-    except RuntimeError as e:
-        logging.error(f"GitHub API error: {e}")
-        raise HTTPException(status_code=503, detail={"message": str(e)})
+        # Whether the source is down is part of the version, so a cached body never carries an outdated stale flag
+        version = (*get_data_version(db, "github", user_id), not circuit_breakers["github"].is_closed)
+
+        def build() -> GithubPullRequestResponse:
+            pull_requests, count, next_cursor = get_github_pull_requests(
+                db,
+                user_id,
+                status=status,
+                repository=repository,
+                is_assigned=is_assigned,
+                fields=params.fields,
+                limit=params.limit,
+                cursor=params.cursor,
+            )
+            return GithubPullRequestResponse(
+                pull_requests=pull_requests, count=count, last_synced_at=version[1], next_cursor=next_cursor, stale=version[2]
+            )
+
+        cached = response_cache.get(request, user_id, version, build, include=params.include("pull_requests", "reference"))
+        return etag_response(request, cached)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e)})
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
+
+@router.get("/pull-requests/export", response_class=StreamingResponse, responses={
+    200: {"description": "Every matching item as newline-delimited JSON, one item per line", "content": {NDJSON_MEDIA_TYPE: {}}},
+    400: {"description": "Invalid field", "model": ErrorResponse},
+    500: {"description": "Internal server error", "model": ErrorResponse},
+})
+def read_github_pull_requests_export(
+    user_id: CurrentUserDep,
+    params: ExportParamsDep,
+    status: str | None = None,
+    repository: str | None = None,
+    is_assigned: bool | None = None,
+):
+    try:
+        return ndjson_response(
+            lambda db: stream_github_pull_requests(
+                db,
+                user_id,
+                status=status,
+                repository=repository,
+                is_assigned=is_assigned,
+                fields=params.fields,
+            ),
+            include=params.include("reference"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e)})
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
         raise HTTPException(status_code=500, detail={"message": "Internal server error"})
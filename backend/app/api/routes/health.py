@@ -1,10 +1,22 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from app.core.circuit import CLOSED
+from app.core.db import SessionDep
+from app.crud.sync import get_sources_health
+from app.models import ErrorResponse, HealthResponse
+import logging
 
 router = APIRouter()
 
-@router.get("/health", responses={
-    200: {"description": "Successful response"},
-    500: {"description": "Internal server error"},
+@router.get("/health", response_model=HealthResponse, responses={
+    200: {"description": "The database is reachable; `degraded` while an upstream source is failing", "model": HealthResponse},
+    503: {"description": "The database is unreachable", "model": ErrorResponse},
 })
-def read_health():
-    return {"status": "ok"}
+def read_health(db: SessionDep):
+    try:
+        sources = get_sources_health(db)
+    except Exception as e:
+        logging.error(f"Health check failed: {e}")
+        raise HTTPException(status_code=503, detail={"message": "Database unavailable"})
+
+    status = "ok" if all(source.circuit == CLOSED for source in sources.values()) else "degraded"
+    return HealthResponse(status=status, sources=sources)
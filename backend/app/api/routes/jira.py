@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
+from app.api.cache import etag_response, response_cache
+from app.api.deps import CurrentUserDep, ExportParamsDep, ListParamsDep
+from app.api.export import NDJSON_MEDIA_TYPE, ndjson_response
+from app.core.circuit import circuit_breakers
 from app.core.db import SessionDep
-from app.crud.jira import get_jira_issues
+from app.crud.jira import get_jira_issues, stream_jira_issues
+from app.crud.sync_state import get_data_version
 from app.models import JiraIssueResponse, ErrorResponse
 import logging
 
@@ -9,16 +15,64 @@ router = APIRouter()
 
 @router.get("/issues", response_model=JiraIssueResponse, responses={
     200: {"description": "Successful response", "model": JiraIssueResponse},
+    304: {"description": "Not modified since the ETag sent in If-None-Match"},
+    400: {"description": "Invalid field or cursor", "model": ErrorResponse},
     500: {"description": "Internal server error", "model": ErrorResponse},
-    503: {"description": "Jira API error", "model": ErrorResponse}
 })
-def read_jira_issues(db: SessionDep):
+def read_jira_issues(
+    request: Request,
+    db: SessionDep,
+    user_id: CurrentUserDep,
+    params: ListParamsDep,
+    status: str | None = None,
+):
     try:
-        issues, count = get_jira_issues(db)
-        return JiraIssueResponse(issues=issues, count=count)
-    except HTTPException as e:
-        logging.error(f"Jira API error: {e.detail}")
-        raise HTTPException(status_code=e.status_code, detail={"message": str(e.detail)})
+        # Whether the source is down is part of the version, so a cached body never carries an outdated stale flag
+        version = (*get_data_version(db, "jira", user_id), not circuit_breakers["jira"].is_closed)
+
+        def build() -> JiraIssueResponse:
+            issues, count, next_cursor = get_jira_issues(
+                db,
+                user_id,
+                status=status,
+                fields=params.fields,
+                limit=params.limit,
+                cursor=params.cursor,
+            )
+            return JiraIssueResponse(
+                issues=issues, count=count, last_synced_at=version[1], next_cursor=next_cursor, stale=version[2]
+            )
+
+        cached = response_cache.get(request, user_id, version, build, include=params.include("issues", "issue"))
+        return etag_response(request, cached)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e)})
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
+
+@router.get("/issues/export", response_class=StreamingResponse, responses={
+    200: {"description": "Every matching item as newline-delimited JSON, one item per line", "content": {NDJSON_MEDIA_TYPE: {}}},
+    400: {"description": "Invalid field", "model": ErrorResponse},
+    500: {"description": "Internal server error", "model": ErrorResponse},
+})
+def read_jira_issues_export(
+    user_id: CurrentUserDep,
+    params: ExportParamsDep,
+    status: str | None = None,
+):
+    try:
+        return ndjson_response(
+            lambda db: stream_jira_issues(
+                db,
+                user_id,
+                status=status,
+                fields=params.fields,
+            ),
+            include=params.include("issue"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e)})
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
-        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
\ No newline at end of file
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Response
+from app.core.db import SessionDep
+from app.core.metrics import SYNC_LAST_SUCCESS_AGE, registry
+from app.crud.sync import get_sources_health
+
+router = APIRouter()
+
+# The version of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", response_class=Response, responses={
+    200: {"description": "Metrics in the Prometheus text format", "content": {CONTENT_TYPE: {}}},
+})
+def read_metrics(db: SessionDep):
+    for source, health in get_sources_health(db).items():
+        if health.age_seconds is None:
+            SYNC_LAST_SUCCESS_AGE.remove(source=source)
+        else:
+            SYNC_LAST_SUCCESS_AGE.set(health.age_seconds, source=source)
+    return Response(registry.render(), media_type=CONTENT_TYPE)
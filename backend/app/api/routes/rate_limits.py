@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Request
+from app.api.deps import CurrentSettingsDep
+from app.core.rate_limit import rate_limits, token_key
+from app.crud.jira import jira_headers
+from app.models import RateLimitBudgetStatus, RateLimitsResponse, Settings
+
+router = APIRouter()
+
+def user_tokens(settings: Settings | None) -> set[tuple[str, str]]:
+    """
+    The rate limit budgets, as (source, token) keys, of the access tokens of a user.
+    """
+    if settings is None:
+        return set()
+    tokens = set()
+    if settings.github_access_token:
+        tokens.add(("github", token_key(f"Bearer {settings.github_access_token}")))
+    if settings.gitlab_access_token:
+        tokens.add(("gitlab", token_key(f"Bearer {settings.gitlab_access_token}")))
+    if settings.jira_api_email and settings.jira_api_key:
+        tokens.add(("jira", token_key(jira_headers(settings)["Authorization"])))
+    return tokens
+
+@router.get("/rate-limits", response_model=RateLimitsResponse, responses={
+    200: {"description": "Rate limit budget of the current user's upstream tokens, and when each source syncs next"},
+    401: {"description": "API token missing or invalid"},
+    403: {"description": "Not allowed to act for the user"},
+})
+def read_rate_limits(request: Request, settings: CurrentSettingsDep):
+    tokens = user_tokens(settings)
+    budgets = [
+        RateLimitBudgetStatus(
+            source=budget.source,
+            token=budget.token,
+            limit=budget.limit,
+            remaining=budget.remaining,
+            reset_at=budget.reset_at,
+            retry_at=budget.retry_at,
+            last_cost=budget.last_cost,
+            run_cost=budget.run_cost,
+        )
+        for budget in rate_limits.budgets()
+        if (budget.source, budget.token) in tokens
+    ]
+    return RateLimitsResponse(budgets=budgets, next_syncs=request.app.state.scheduler.next_runs())
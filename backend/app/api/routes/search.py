@@ -0,0 +1,31 @@
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query
+from app.api.deps import CurrentUserDep
+from app.core.config import settings as app_settings
+from app.core.db import SessionDep
+from app.crud.search import search_items
+from app.models import ErrorResponse, SearchResponse
+import logging
+
+router = APIRouter()
+
+@router.get("/search", response_model=SearchResponse, responses={
+    200: {"description": "Matching issues, pull requests and merge requests, best first", "model": SearchResponse},
+    400: {"description": "Empty query or unknown source", "model": ErrorResponse},
+    500: {"description": "Internal server error", "model": ErrorResponse},
+})
+def read_search(
+    db: SessionDep,
+    user_id: CurrentUserDep,
+    q: Annotated[str, Query(description="Words to search for in titles, descriptions, repositories and keys")],
+    source: Annotated[str | None, Query(description="Only search this source: jira, github or gitlab")] = None,
+    limit: Annotated[int, Query(ge=1, le=app_settings.LIST_MAX_LIMIT)] = 20,
+):
+    try:
+        return SearchResponse(results=search_items(db, user_id, q, source=source, limit=limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e)})
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
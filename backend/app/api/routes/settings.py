@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
-from app.core.db import SessionDep
-from app.crud.settings import get_settings, create_or_update_settings
-from app.models import Settings, SettingsResponse
+from app.api.deps import AdminDep, CurrentSettingsDep, CurrentUserDep
+from app.core.db import db_writer
+from app.crud.settings import create_or_update_settings, create_settings, issue_api_token
+from app.models import ApiTokenResponse, Settings, SettingsResponse
 import logging
 
 router = APIRouter()
@@ -16,9 +17,8 @@ router = APIRouter()
     },
     response_model=SettingsResponse
 )
-def get(db: SessionDep):
+def get(settings: CurrentSettingsDep):
     try:
-        settings = get_settings(db)
         if settings is None:
             raise HTTPException(status_code=404, detail="Settings not found")
         return settings
@@ -32,21 +32,71 @@ def get(db: SessionDep):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/settings",
-    summary="Create new settings",
+    summary="Create or update the settings of the current user",
     responses={
-        200: {"description": "Successfully created new settings"},
+        200: {"description": "Successfully created or updated the settings"},
         400: {"description": "Bad request"},
+        401: {"description": "API token missing or invalid"},
+        403: {"description": "Not allowed to act for the user"},
+        404: {"description": "User not found"},
         500: {"description": "Internal server error"}
     },
     response_model=SettingsResponse
 )
-def create(db: SessionDep, settings: Settings):
+def create(settings: Settings, user_id: CurrentUserDep):
     try:
-        new_settings = create_or_update_settings(db, **settings.model_dump())
+        # Before the first user exists, this creates them
+        new_settings = db_writer.write_blocking(
+            create_or_update_settings, user_id or None, **settings.model_dump(exclude={"id", "api_token_hash"})
+        )
         return new_settings
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/settings",
+    summary="Add a user",
+    responses={
+        200: {"description": "Successfully created the settings of a new user"},
+        400: {"description": "Bad request"},
+        403: {"description": "The admin token is required"},
+        500: {"description": "Internal server error"}
+    },
+    response_model=SettingsResponse,
+    dependencies=[AdminDep]
+)
+def add(settings: Settings):
+    try:
+        return db_writer.write_blocking(create_settings, **settings.model_dump(exclude={"id", "api_token_hash"}))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/settings/token",
+    summary="Issue a new API token to the current user",
+    description="Replaces the user's previous token. Once a token is issued, every request needs one.",
+    responses={
+        200: {"description": "Successfully issued the token; it is not shown again"},
+        401: {"description": "API token missing or invalid"},
+        403: {"description": "Not allowed to act for the user"},
+        404: {"description": "User not found"},
+        500: {"description": "Internal server error"}
+    },
+    response_model=ApiTokenResponse
+)
+def issue_token(user_id: CurrentUserDep):
+    try:
+        api_token = db_writer.write_blocking(issue_api_token, user_id)
+        return ApiTokenResponse(user_id=user_id, api_token=api_token)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
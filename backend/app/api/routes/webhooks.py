@@ -0,0 +1,107 @@
+import json
+from typing import Annotated, Any, Dict
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from app.core.config import settings as app_settings
+from app.core.db import SessionDep
+from app.core.webhooks import verify_signature, verify_token
+from app.crud.github import apply_github_pull_request_event
+from app.crud.gitlab import apply_gitlab_merge_request_event
+from app.crud.jira import apply_jira_issue_event
+from app.models import ErrorResponse, WebhookResponse
+import logging
+
+router = APIRouter(prefix="/webhooks")
+
+JIRA_ISSUE_EVENTS = ("jira:issue_created", "jira:issue_updated", "jira:issue_deleted")
+
+WEBHOOK_RESPONSES = {
+    200: {"description": "The event was applied, or ignored if it does not concern stored items", "model": WebhookResponse},
+    400: {"description": "The body is not valid JSON", "model": ErrorResponse},
+    401: {"description": "Invalid signature", "model": ErrorResponse},
+    404: {"description": "Webhooks of this source are not configured", "model": ErrorResponse},
+    503: {"description": "The event could not be applied; upstream should deliver it again", "model": ErrorResponse},
+}
+
+def parse_payload(body: bytes) -> Dict[str, Any]:
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"message": f"Invalid JSON: {e}"})
+
+@router.post("/github", response_model=WebhookResponse, responses=WEBHOOK_RESPONSES)
+async def receive_github_webhook(
+    request: Request,
+    db: SessionDep,
+    x_github_event: Annotated[str | None, Header()] = None,
+    x_hub_signature_256: Annotated[str | None, Header()] = None,
+):
+    if not app_settings.GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=404, detail={"message": "GitHub webhooks are not configured"})
+    body = await request.body()
+    if not verify_signature(app_settings.GITHUB_WEBHOOK_SECRET, body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail={"message": "Invalid signature"})
+
+    payload = parse_payload(body)
+    if x_github_event != "pull_request":
+        return WebhookResponse(event=x_github_event or "", applied=False)
+    try:
+        counts = await apply_github_pull_request_event(db, payload)
+        return WebhookResponse(event=x_github_event, applied=True, counts=counts)
+    except RuntimeError as e:
+        logging.error(f"Failed to apply GitHub webhook: {e}")
+        raise HTTPException(status_code=503, detail={"message": str(e)})
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
+
+@router.post("/gitlab", response_model=WebhookResponse, responses=WEBHOOK_RESPONSES)
+async def receive_gitlab_webhook(
+    request: Request,
+    db: SessionDep,
+    x_gitlab_token: Annotated[str | None, Header()] = None,
+):
+    if not app_settings.GITLAB_WEBHOOK_TOKEN:
+        raise HTTPException(status_code=404, detail={"message": "GitLab webhooks are not configured"})
+    if not verify_token(app_settings.GITLAB_WEBHOOK_TOKEN, x_gitlab_token):
+        raise HTTPException(status_code=401, detail={"message": "Invalid token"})
+
+    payload = parse_payload(await request.body())
+    event = payload.get("object_kind") or ""
+    if event != "merge_request":
+        return WebhookResponse(event=event, applied=False)
+    try:
+        counts = await apply_gitlab_merge_request_event(db, request.app.state.upstream_clients["gitlab"], payload)
+        return WebhookResponse(event=event, applied=True, counts=counts)
+    except RuntimeError as e:
+        logging.error(f"Failed to apply GitLab webhook: {e}")
+        raise HTTPException(status_code=503, detail={"message": str(e)})
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
+
+@router.post("/jira", response_model=WebhookResponse, responses=WEBHOOK_RESPONSES)
+async def receive_jira_webhook(
+    request: Request,
+    db: SessionDep,
+    x_hub_signature: Annotated[str | None, Header()] = None,
+):
+    if not app_settings.JIRA_WEBHOOK_SECRET:
+        raise HTTPException(status_code=404, detail={"message": "Jira webhooks are not configured"})
+    body = await request.body()
+    if not verify_signature(app_settings.JIRA_WEBHOOK_SECRET, body, x_hub_signature):
+        raise HTTPException(status_code=401, detail={"message": "Invalid signature"})
+
+    payload = parse_payload(body)
+    event = payload.get("webhookEvent") or ""
+    if event not in JIRA_ISSUE_EVENTS:
+        return WebhookResponse(event=event, applied=False)
+    try:
+        counts = await apply_jira_issue_event(db, request.app.state.upstream_clients["jira"], payload)
+        return WebhookResponse(event=event, applied=True, counts=counts)
+    except RuntimeError as e:
+        logging.error(f"Failed to apply Jira webhook: {e}")
+        raise HTTPException(status_code=503, detail={"message": str(e)})
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
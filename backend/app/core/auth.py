@@ -0,0 +1,65 @@
+import hashlib
+import hmac
+import secrets
+
+
+class AuthenticationError(PermissionError):
+    """
+    Raised when a request does not prove who it acts for: its API token is missing or unknown.
+    """
+
+
+def new_api_token() -> str:
+    """
+    Generates an API token; only its hash is stored.
+
+    Returns:
+        str: The token.
+    """
+    return secrets.token_urlsafe(32)
+
+
+def hash_api_token(token: str) -> str:
+    """
+    Hashes an API token for storage and lookup. Tokens are random, so a plain
+    SHA-256 suffices: there is nothing to guess that a slow hash would protect.
+
+    Args:
+        token (str): The API token.
+
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def verify_api_token(token_hash: str | None, token: str) -> bool:
+    """
+    Checks an API token against a stored hash, in constant time.
+
+    Args:
+        token_hash (str | None): The stored hash, None if no token was issued.
+        token (str): The API token sent with the request.
+
+    Returns:
+        bool: True if the token matches.
+    """
+    return token_hash is not None and hmac.compare_digest(token_hash, hash_api_token(token))
+
+
+def bearer_token(authorization: str | None) -> str | None:
+    """
+    Extracts the token of an `Authorization: Bearer <token>` header.
+
+    Args:
+        authorization (str | None): The header, if any.
+
+    Returns:
+        str | None: The token, or None if the header is missing or not a bearer token.
+    """
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
@@ -0,0 +1,155 @@
+import threading
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import UPSTREAM_REQUESTS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and every
+    request fails at once, without waiting on the upstream. Once
+    `recovery_seconds` passed, a single trial request is let through: its success
+    closes the circuit, its failure opens it again for another period.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float) -> None:
+        self._failure_threshold = failure_threshold
+        self._recovery_seconds = recovery_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_closed(self) -> bool:
+        return self._state == CLOSED
+
+    @property
+    def is_available(self) -> bool:
+        """
+        Whether a request would be let through now: the circuit is closed, or
+        open with its trial due.
+        """
+        with self._lock:
+            if self._state == OPEN:
+                return time.monotonic() - self._opened_at >= self._recovery_seconds
+            return self._state == CLOSED
+
+    def seconds_until_retry(self) -> float:
+        """
+        How long until an open circuit lets a trial request through.
+        """
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(self._opened_at + self._recovery_seconds - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be sent now; the first request after the recovery
+        period becomes the trial.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._recovery_seconds:
+                self._state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+    def abandon(self) -> None:
+        """
+        Gives the trial back when it ended without an answer, such as when it was cancelled.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = OPEN
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self._failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+
+class CircuitBreakers:
+    """
+    One circuit breaker per upstream source, created on first use.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float) -> None:
+        self._failure_threshold = failure_threshold
+        self._recovery_seconds = recovery_seconds
+        self._lock = threading.Lock()
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def __getitem__(self, source: str) -> CircuitBreaker:
+        with self._lock:
+            if source not in self._breakers:
+                self._breakers[source] = CircuitBreaker(self._failure_threshold, self._recovery_seconds)
+            return self._breakers[source]
+
+
+circuit_breakers = CircuitBreakers(settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RECOVERY_SECONDS)
+
+
+class CircuitBreakerTransport(httpx.AsyncBaseTransport):
+    """
+    Sends requests through the circuit breaker of a source.
+
+    Connection errors, timeouts and `5xx` responses count as failures; any other
+    response means the upstream is up. While the circuit is open, requests fail
+    with `UpstreamUnavailable` before anything is sent.
+    """
+
+    def __init__(self, source: str, transport: httpx.AsyncBaseTransport) -> None:
+        self._source = source
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        breaker = circuit_breakers[self._source]
+        if not breaker.allow():
+            UPSTREAM_REQUESTS.inc(source=self._source, status="circuit_open")
+            raise UpstreamUnavailable(f"{self._source} is unavailable; retrying in {breaker.seconds_until_retry():.0f}s")
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            UPSTREAM_REQUESTS.inc(source=self._source, status=type(e).__name__)
+            raise
+        except BaseException:
+            breaker.abandon()
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
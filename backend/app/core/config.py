@@ -4,8 +4,10 @@ from typing import Annotated, Any, Literal
 from pydantic import (
     AnyUrl,
     BeforeValidator,
+    PostgresDsn,
     computed_field,
 )
+from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 def parse_cors(v: Any) -> list[str] | str:
@@ -36,11 +38,92 @@ class Settings(BaseSettings):
         list[AnyUrl] | str, BeforeValidator(parse_cors)
     ] = ["http://localhost:3000"]
 
+    DATABASE_URL: str | None = None
+    SQLITE_PATH: str = "./database/sql_app.db"
+    POSTGRES_SERVER: str | None = None
+    POSTGRES_PORT: int = 5432
+    POSTGRES_USER: str = "postgres"
+    POSTGRES_PASSWORD: str = ""
+    POSTGRES_DB: str = "developer_notifier"
+
     @computed_field  # type: ignore[prop-decorator]
     @property
-    def SQLALCHEMY_DATABASE_URI(self) -> str:
-        return "sqlite:///./database/sql_app.db"
-    
+    def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn | str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
+        # Postgres when a server is configured, so several replicas can share the data
+        if self.POSTGRES_SERVER:
+            return MultiHostUrl.build(
+                scheme="postgresql+psycopg",
+                username=self.POSTGRES_USER,
+                password=self.POSTGRES_PASSWORD,
+                host=self.POSTGRES_SERVER,
+                port=self.POSTGRES_PORT,
+                path=self.POSTGRES_DB,
+            )
+        return f"sqlite:///{self.SQLITE_PATH}"
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+
     PROJECT_NAME: str = "Developer Notifier"
 
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_CACHE_SIZE_KIB: int = 20000
+
+    SYNC_ENABLED: bool = True
+    JIRA_SYNC_INTERVAL_SECONDS: int = 300
+    GITHUB_SYNC_INTERVAL_SECONDS: int = 300
+    GITLAB_SYNC_INTERVAL_SECONDS: int = 300
+    JIRA_SYNC_TIMEOUT_SECONDS: float = 10.0
+    GITHUB_SYNC_TIMEOUT_SECONDS: float = 10.0
+    GITLAB_SYNC_TIMEOUT_SECONDS: float = 10.0
+    JIRA_FULL_SYNC_INTERVAL_SECONDS: int = 3600
+    GITLAB_FULL_SYNC_INTERVAL_SECONDS: int = 3600
+    # How many users (or groups of users sharing an upstream scan) a source syncs at once
+    SYNC_MAX_CONCURRENT_GROUPS: int = 4
+    # A successful sync of a source for a user is reused by refreshes for this long
+    SYNC_MIN_REFRESH_SECONDS: float = 30.0
+
+    # Secrets the upstream webhooks are signed with. While a source's is set, its
+    # changes arrive by webhook and polling only reconciles, at the slower interval
+    GITHUB_WEBHOOK_SECRET: str | None = None
+    GITLAB_WEBHOOK_TOKEN: str | None = None
+    JIRA_WEBHOOK_SECRET: str | None = None
+    WEBHOOK_RECONCILE_INTERVAL_SECONDS: int = 3600
+
+    # Acts for any user and is the only credential that may add users; adding
+    # users is disabled while unset
+    ADMIN_TOKEN: str | None = None
+
+    SETTINGS_VERSION_CHECK_SECONDS: float = 5.0
+
+    UPSTREAM_TIMEOUT_SECONDS: float = 30.0
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    UPSTREAM_READ_TIMEOUT_SECONDS: float = 20.0
+    # Consecutive failures after which a source is considered down, and how long until it is tried again
+    CIRCUIT_FAILURE_THRESHOLD: int = 3
+    CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    UPSTREAM_RETRIES: int = 3
+    UPSTREAM_MAX_CONNECTIONS: int = 10
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 5
+    UPSTREAM_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    UPSTREAM_CONDITIONAL_CACHE_SIZE: int = 1024
+    # Share of each upstream rate limit that scheduled syncs leave for on-demand refreshes
+    RATE_LIMIT_RESERVE_FRACTION: float = 0.1
+
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    COMPRESSION_MINIMUM_SIZE: int = 1000
+    RESPONSE_CACHE_SIZE: int = 256
+    LIST_MAX_LIMIT: int = 500
+    # Rows read from the database at a time by the streaming exports
+    EXPORT_BATCH_SIZE: int = 1000
+
 settings = Settings()
\ No newline at end of file
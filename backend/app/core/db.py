@@ -1,12 +1,120 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import Engine, event
 from sqlmodel import Session, create_engine
-from typing import Generator, Annotated
+from typing import Any, Callable, Generator, Annotated, TypeVar
 from fastapi import Depends
 from app.core.config import settings
+from app.core.metrics import DB_TRANSACTION_SECONDS, DB_WRITE_WAIT_SECONDS
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+T = TypeVar("T")
+
+def create_db_engine(url: str, read_only: bool = False, pool_size: int = 5, max_overflow: int = 10) -> Engine:
+    """
+    Create an engine for SQLite or Postgres, tuned for concurrent readers and a single writer.
+
+    On SQLite, every new connection switches to WAL, so readers keep reading
+    while a write is in progress, and applies the configured `synchronous`,
+    `busy_timeout`, `mmap_size` and `cache_size` pragmas. Read-only engines set
+    `query_only` on SQLite and open read-only transactions on Postgres, so a
+    write sent to the read pool fails instead of taking locks.
+
+    Pooled connections are checked before use and recycled periodically, so
+    connections a database server or proxy dropped are not handed out.
+
+    Args:
+        url (str): The database URL.
+        read_only (bool): Whether connections of this engine may only read.
+        pool_size (int): The number of connections kept open.
+        max_overflow (int): How many more connections may be opened under load.
+
+    Returns:
+        Engine: The engine.
+    """
+    engine = create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+
+    if engine.dialect.name == "postgresql" and read_only:
+        engine = engine.execution_options(postgresql_readonly=True)
+
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def configure_sqlite(dbapi_connection, connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+            # A negative cache_size is in KiB rather than pages
+            cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KIB}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+            cursor.close()
+
+    return engine
+
+
+class DatabaseWriter:
+    """
+    Runs writes one at a time, on a dedicated thread with its own connection.
+
+    SQLite allows a single writer at a time. Queueing writes here, instead of
+    letting concurrent transactions race for the lock, avoids "database is
+    locked" errors. Every unit of work runs in its own short transaction, so the
+    lock is never held while waiting on an upstream API. How long each write
+    waits for the writer and how long its transaction takes are measured.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self._engine = engine
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+    def _run(self, unit: Callable[..., T], args: tuple, kwargs: dict, queued_at: float) -> T:
+        started_at = time.perf_counter()
+        DB_WRITE_WAIT_SECONDS.observe(started_at - queued_at, unit=unit.__name__)
+        with Session(self._engine, expire_on_commit=False) as db:
+            try:
+                result = unit(db, *args, **kwargs)
+                db.commit()
+                return result
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                DB_TRANSACTION_SECONDS.observe(time.perf_counter() - started_at, unit=unit.__name__)
+
+    async def write(self, unit: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run `unit(db, *args, **kwargs)` on the writer and commit it.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self._run, unit, args, kwargs, time.perf_counter()))
+
+    def write_blocking(self, unit: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Like `write`, for callers outside the event loop, such as sync route handlers.
+        """
+        return self._executor.submit(self._run, unit, args, kwargs, time.perf_counter()).result()
+
+
+read_engine = create_db_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    read_only=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
+write_engine = create_db_engine(str(settings.SQLALCHEMY_DATABASE_URI), pool_size=1, max_overflow=0)
+db_writer = DatabaseWriter(write_engine)
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    with Session(read_engine) as session:
         yield session
 
-SessionDep = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_db)]
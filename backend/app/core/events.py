@@ -0,0 +1,136 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# The source whose items each synced table holds, and the column identifying an item
+TABLE_SOURCES = {
+    "jira_issues": ("jira", "issue"),
+    "github_pull_requests": ("github", "reference"),
+    "gitlab_merge_requests": ("gitlab", "reference"),
+}
+
+_PENDING_CHANGES = "pending_changes"
+
+
+class ChangeBroker:
+    """
+    Fans out dashboard events to the open event streams of their user.
+
+    Each subscriber gets its own bounded queue on its own event loop, so one
+    publish reaches any number of browser tabs. `publish` may be called from any
+    thread. A subscriber that falls too far behind is told to resync instead of
+    holding an ever growing backlog.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[asyncio.Queue, Tuple[asyncio.AbstractEventLoop, int]] = {}
+
+    @contextmanager
+    def subscribe(self, owner_id: int) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(self._queue_size)
+        with self._lock:
+            self._subscribers[queue] = (asyncio.get_running_loop(), owner_id)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers.pop(queue, None)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict[str, Any], owner_id: int) -> None:
+        with self._lock:
+            subscribers = [
+                (queue, loop) for queue, (loop, subscriber) in self._subscribers.items() if subscriber == owner_id
+            ]
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event_type, data)
+            except RuntimeError:
+                # The subscriber's loop is already closed
+                pass
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event_type: str, data: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait((event_type, data))
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(("resync", {}))
+
+
+change_broker = ChangeBroker(settings.EVENTS_QUEUE_SIZE)
+
+
+def record_changes(
+    db: Session,
+    table: str,
+    owner_id: int,
+    added: Iterable[Dict[str, Any]] = (),
+    updated: Iterable[Dict[str, Any]] = (),
+    removed: Iterable[Any] = (),
+) -> None:
+    """
+    Remembers rows written to a synced table in the current transaction.
+
+    They are published to the owner's streams as one `change` event per source
+    once the session commits, and dropped if it rolls back. Nothing is kept
+    while no event stream is open.
+
+    Args:
+        db (Session): The session the rows were written in.
+        table (str): The table name.
+        owner_id (int): The user the rows belong to.
+        added (Iterable[Dict[str, Any]]): The inserted rows.
+        updated (Iterable[Dict[str, Any]]): The updated rows.
+        removed (Iterable[Any]): The keys of the deleted rows.
+    """
+    if table not in TABLE_SOURCES or not change_broker.has_subscribers:
+        return
+
+    pending = db.info.setdefault(_PENDING_CHANGES, {})
+    changes = pending.setdefault((table, owner_id), {"added": {}, "updated": {}, "removed": set()})
+    _, key = TABLE_SOURCES[table]
+    for row in added:
+        changes["added"][row[key]] = row
+        changes["removed"].discard(row[key])
+    for row in updated:
+        target = "added" if row[key] in changes["added"] else "updated"
+        changes[target][row[key]] = row
+        changes["removed"].discard(row[key])
+    for item_key in removed:
+        changes["added"].pop(item_key, None)
+        changes["updated"].pop(item_key, None)
+        changes["removed"].add(item_key)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(db: Session) -> None:
+    pending: Dict[Tuple[str, int], Dict[str, Any]] = db.info.pop(_PENDING_CHANGES, {})
+    for (table, owner_id), changes in pending.items():
+        source, key = TABLE_SOURCES[table]
+        if not (changes["added"] or changes["updated"] or changes["removed"]):
+            continue
+        change_broker.publish("change", {
+            "source": source,
+            "key": key,
+            "added": list(changes["added"].values()),
+            "updated": list(changes["updated"].values()),
+            "removed": sorted(changes["removed"]),
+        }, owner_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(db: Session) -> None:
+    db.info.pop(_PENDING_CHANGES, None)
@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from app.core.circuit import CircuitBreakerTransport
+from app.core.config import settings
+from app.core.metrics import CACHE_LOOKUPS, UPSTREAM_BYTES, UPSTREAM_REQUEST_SECONDS, UPSTREAM_REQUESTS
+from app.core.rate_limit import rate_limits
+
+SOURCES = ("jira", "github", "gitlab")
+
+
+class UpstreamClients:
+    """
+    Long-lived async HTTP clients, one per upstream source.
+
+    Each client owns its own keep-alive connection pool, so repeated syncs reuse
+    the TCP+TLS connection to that host instead of handshaking on every refresh.
+    Every request goes through the rate limit budget of its token first, and
+    every response updates that budget and the upstream metrics. Requests also go through the circuit
+    breaker of their source, so a source that is down fails fast instead of
+    waiting out its timeouts on every sync. Pass `transport` (for example an `httpx.MockTransport`) to serve requests
+    locally without network access.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None) -> None:
+        self._clients = {
+            source: httpx.AsyncClient(
+                transport=CircuitBreakerTransport(source, transport or self._build_transport()),
+                timeout=httpx.Timeout(
+                    settings.UPSTREAM_TIMEOUT_SECONDS,
+                    connect=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+                    read=settings.UPSTREAM_READ_TIMEOUT_SECONDS,
+                ),
+                event_hooks=self._hooks(source),
+            )
+            for source in SOURCES
+        }
+
+    @staticmethod
+    def _hooks(source: str) -> dict[str, list]:
+        async def check(request: httpx.Request) -> None:
+            rate_limits.check(source, request)
+            request.extensions["started_at"] = time.perf_counter()
+
+        async def observe(response: httpx.Response) -> None:
+            rate_limits.observe(source, response)
+            # Read the body here, so the latency covers the whole transfer and its size is known
+            await response.aread()
+            UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - response.request.extensions["started_at"], source=source)
+            UPSTREAM_REQUESTS.inc(source=source, status=str(response.status_code))
+            UPSTREAM_BYTES.inc(len(response.request.content), source=source, direction="sent")
+            # What came over the wire, still compressed; responses built in memory, such as mocked ones, report their body
+            received = response.num_bytes_downloaded or len(response.content)
+            UPSTREAM_BYTES.inc(received, source=source, direction="received")
+
+        return {"request": [check], "response": [observe]}
+
+    @staticmethod
+    def _build_transport() -> httpx.AsyncHTTPTransport:
+        return httpx.AsyncHTTPTransport(
+            retries=settings.UPSTREAM_RETRIES,
+            limits=httpx.Limits(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    def __getitem__(self, source: str) -> httpx.AsyncClient:
+        return self._clients[source]
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+
+
+@dataclass
+class CachedResponse:
+    etag: str | None
+    last_modified: str | None
+    data: Any
+
+
+class ConditionalRequestCache:
+    """
+    Validators (`ETag` / `Last-Modified`) of upstream GET responses, keyed by URL,
+    query parameters and credentials, together with whatever the caller derived
+    from the response body.
+
+    A request whose validators still match comes back as `304 Not Modified`, so
+    the caller can reuse the derived data instead of parsing the body again.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    @staticmethod
+    def key(request: httpx.Request) -> str:
+        credentials = request.headers.get("Authorization", "")
+        return hashlib.sha256(f"{request.url}|{credentials}".encode()).hexdigest()
+
+    def get(self, request: httpx.Request) -> CachedResponse | None:
+        with self._lock:
+            key = self.key(request)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def forget(self, request: httpx.Request) -> None:
+        with self._lock:
+            self._entries.pop(self.key(request), None)
+
+    def remember(self, response: httpx.Response, data: Any) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag is None and last_modified is None:
+            return
+
+        with self._lock:
+            key = self.key(response.request)
+            self._entries[key] = CachedResponse(etag=etag, last_modified=last_modified, data=data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+conditional_cache = ConditionalRequestCache(settings.UPSTREAM_CONDITIONAL_CACHE_SIZE)
+
+
+async def conditional_get(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict[str, str],
+    params: dict[str, Any] | None = None,
+) -> tuple[httpx.Response, CachedResponse | None]:
+    """
+    Sends a GET with `If-None-Match` / `If-Modified-Since` when validators of a
+    previous response to the same request are cached.
+
+    Returns the response and, when upstream answered `304 Not Modified`, the
+    cached entry whose data the caller stored with `conditional_cache.remember`.
+    """
+    request = client.build_request("GET", url, headers=headers, params=params)
+    cached = conditional_cache.get(request)
+    if cached is not None:
+        if cached.etag is not None:
+            request.headers["If-None-Match"] = cached.etag
+        if cached.last_modified is not None:
+            request.headers["If-Modified-Since"] = cached.last_modified
+
+    response = await client.send(request)
+    if response.status_code == 304 and cached is not None:
+        CACHE_LOOKUPS.inc(cache="conditional", result="hit")
+        return response, cached
+    CACHE_LOOKUPS.inc(cache="conditional", result="miss")
+    return response, None
@@ -0,0 +1,174 @@
+import bisect
+import math
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Latency buckets, in seconds, for requests and transactions
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Duration buckets, in seconds, for whole sync runs
+SYNC_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    A named metric with a fixed set of labels, rendered in the Prometheus text format.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def remove(self, **labels: str) -> None:
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count of each bucket (not cumulative), the sum and the count
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                labels = format_labels((*self.label_names, "le"), (*key, format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Every metric of the backend, exposed together by the `/metrics` endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to answer API requests, by route", ("method", "route", "status"),
+))
+UPSTREAM_REQUEST_SECONDS = registry.register(Histogram(
+    "upstream_request_duration_seconds", "Time until upstream API responses were fully read", ("source",),
+))
+UPSTREAM_REQUESTS = registry.register(Counter(
+    "upstream_requests_total", "Upstream API requests, by response status or error", ("source", "status"),
+))
+UPSTREAM_BYTES = registry.register(Counter(
+    "upstream_bytes_total", "Bytes sent to and received from upstream APIs", ("source", "direction"),
+))
+SYNC_SECONDS = registry.register(Histogram(
+    "sync_duration_seconds", "Duration of sync runs", ("source",), buckets=SYNC_BUCKETS,
+))
+SYNC_RUNS = registry.register(Counter(
+    "sync_runs_total", "Sync runs per user, by outcome", ("source", "status"),
+))
+SYNC_PAGES = registry.register(Counter(
+    "sync_pages_total", "Pages fetched from upstream APIs by syncs", ("source",),
+))
+SYNC_ROWS = registry.register(Counter(
+    "sync_rows_total", "Rows written or skipped by syncs and webhooks, by change", ("source", "change"),
+))
+SYNC_LAST_SUCCESS_AGE = registry.register(Gauge(
+    "sync_last_success_age_seconds", "Age of the oldest last successful sync among the users of a source", ("source",),
+))
+DB_WRITE_WAIT_SECONDS = registry.register(Histogram(
+    "db_write_wait_seconds", "Time writes waited for the database writer, which holds the write lock", ("unit",),
+))
+DB_TRANSACTION_SECONDS = registry.register(Histogram(
+    "db_transaction_seconds", "Duration of write transactions, commit included", ("unit",),
+))
+CACHE_LOOKUPS = registry.register(Counter(
+    "cache_lookups_total", "Cache lookups, by cache and result (hit or miss)", ("cache", "result"),
+))
@@ -0,0 +1,58 @@
+import time
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import HTTP_REQUEST_SECONDS
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzip-compresses responses the client accepts compressed.
+
+    Responses that already set `Content-Encoding` (the cached list bodies) pass
+    through untouched, and so do event streams, which would otherwise sit in the
+    compressor instead of reaching the client as each event is sent.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "text/event-stream" in Headers(scope=scope).get("accept", ""):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """
+    Measures how long each API request takes to answer.
+
+    Requests are labelled by the path template of their route, such as
+    `/api/v1/pull-requests`, rather than by the requested path, so ids and
+    query strings do not multiply the series.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started_at, method=scope["method"], route=route, status=str(status)
+            )
@@ -0,0 +1,252 @@
+import hashlib
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+
+class RateLimitExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class RateLimitBudget:
+    """
+    What is left of the rate limit of one access token on one source.
+
+    `spent` counts the points this backend used, so the cost of a sync run can
+    be measured; `run_cost` is the cost of the last scheduled run.
+    """
+    source: str
+    token: str
+    limit: int | None = None
+    remaining: int | None = None
+    reset_at: datetime | None = None
+    retry_at: datetime | None = None
+    last_cost: int | None = None
+    spent: int = 0
+    run_cost: int | None = None
+
+    def available(self, now: datetime) -> int | None:
+        """
+        The points left now, or None if upstream never reported them.
+        """
+        if self.reset_at is not None and self.reset_at <= now:
+            return self.limit
+        return self.remaining
+
+
+def token_key(authorization: str) -> str:
+    """
+    Identifies a token without keeping it: a short hash of the Authorization header.
+    """
+    return hashlib.sha256(authorization.encode()).hexdigest()[:12]
+
+
+def parse_reset(value: str, now: datetime) -> datetime | None:
+    """
+    Parses a rate limit reset header: epoch seconds (GitHub, GitLab), seconds
+    from now, or an ISO 8601 timestamp (Jira).
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        try:
+            reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if reset_at.tzinfo is not None:
+            reset_at = reset_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return reset_at
+    if number > 1e9:
+        return datetime.utcfromtimestamp(number)
+    return now + timedelta(seconds=number)
+
+
+def parse_retry_after(value: str, now: datetime) -> datetime | None:
+    """
+    Parses a `Retry-After` header, in seconds or as an HTTP date.
+    """
+    try:
+        return now + timedelta(seconds=float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return retry_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def header(headers: httpx.Headers, name: str) -> str | None:
+    return headers.get(f"X-RateLimit-{name}") or headers.get(f"RateLimit-{name}")
+
+
+def is_rate_limited(response: httpx.Response) -> bool:
+    """
+    Tells a throttled response apart from other errors by its status and headers.
+    """
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        "Retry-After" in response.headers or header(response.headers, "Remaining") == "0"
+    )
+
+
+class RateLimitTracker:
+    """
+    Rate limit budgets of every upstream access token, fed by the responses of
+    the upstream clients.
+
+    GitHub, GitLab and Jira report the limit, what remains of it and when it
+    resets in `X-RateLimit-*` or `RateLimit-*` headers, and throttled responses
+    carry `Retry-After`; GitHub GraphQL responses also report the cost of the
+    query in `rateLimit`. The tracker uses them to refuse requests that would
+    exceed a budget, before they are sent, and to stretch sync intervals so a
+    source's syncs fit in what remains until the reset.
+    """
+
+    def __init__(self, reserve_fraction: float) -> None:
+        self._reserve_fraction = reserve_fraction
+        self._lock = threading.Lock()
+        self._budgets: Dict[Tuple[str, str], RateLimitBudget] = {}
+        self._run_marks: Dict[str, Dict[Tuple[str, str], int]] = {}
+
+    def _budget(self, source: str, authorization: str) -> RateLimitBudget:
+        key = (source, token_key(authorization))
+        if key not in self._budgets:
+            self._budgets[key] = RateLimitBudget(source=source, token=key[1])
+        return self._budgets[key]
+
+    def check(self, source: str, request: httpx.Request) -> None:
+        """
+        Refuses a request whose token has no budget left until its reset.
+
+        Raises:
+            RateLimitExceeded: If upstream asked to back off or the budget is used up.
+        """
+        authorization = request.headers.get("Authorization")
+        if authorization is None:
+            return
+
+        now = datetime.utcnow()
+        with self._lock:
+            budget = self._budgets.get((source, token_key(authorization)))
+            if budget is None:
+                return
+            if budget.retry_at is not None and budget.retry_at > now:
+                raise RateLimitExceeded(f"{source} asked to retry after {budget.retry_at.isoformat()}Z")
+            if budget.reset_at is not None and budget.available(now) == 0:
+                raise RateLimitExceeded(f"{source} rate limit is used up until {budget.reset_at.isoformat()}Z")
+
+    def observe(self, source: str, response: httpx.Response) -> None:
+        """
+        Updates the budget of the token a response was sent with from its headers.
+
+        Every request costs one point, except GitHub GraphQL queries, whose cost
+        is taken from the query result by `observe_graphql`.
+        """
+        authorization = response.request.headers.get("Authorization")
+        if authorization is None:
+            return
+
+        now = datetime.utcnow()
+        headers = response.headers
+        with self._lock:
+            budget = self._budget(source, authorization)
+            if header(headers, "Limit") is not None:
+                budget.limit = int(header(headers, "Limit"))
+            if header(headers, "Remaining") is not None:
+                budget.remaining = int(header(headers, "Remaining"))
+            if header(headers, "Reset") is not None:
+                budget.reset_at = parse_reset(header(headers, "Reset"), now) or budget.reset_at
+            if "Retry-After" in headers:
+                budget.retry_at = parse_retry_after(headers["Retry-After"], now)
+            elif response.status_code == 429 and budget.reset_at is not None:
+                budget.retry_at = budget.reset_at
+            if headers.get("X-RateLimit-Resource") != "graphql":
+                budget.spent += 1
+
+    def observe_graphql(self, source: str, authorization: str, rate_limit: Dict[str, Any]) -> None:
+        """
+        Updates a budget from the `rateLimit { cost remaining resetAt limit }` of a GraphQL result.
+        """
+        with self._lock:
+            budget = self._budget(source, authorization)
+            cost = rate_limit.get("cost")
+            if cost is not None:
+                budget.last_cost = cost
+                budget.spent += cost
+            if rate_limit.get("limit") is not None:
+                budget.limit = rate_limit["limit"]
+            if rate_limit.get("remaining") is not None:
+                budget.remaining = rate_limit["remaining"]
+            if rate_limit.get("resetAt"):
+                budget.reset_at = parse_reset(rate_limit["resetAt"], datetime.utcnow()) or budget.reset_at
+
+    def start_run(self, source: str) -> None:
+        """
+        Marks the start of a scheduled sync of a source, to measure what it costs.
+        """
+        with self._lock:
+            self._run_marks[source] = {
+                key: budget.spent for key, budget in self._budgets.items() if budget.source == source
+            }
+
+    def finish_run(self, source: str) -> None:
+        """
+        Records what the scheduled sync of a source started by `start_run` cost each token.
+        """
+        with self._lock:
+            marks = self._run_marks.pop(source, {})
+            for key, budget in self._budgets.items():
+                if budget.source == source and budget.spent > marks.get(key, 0):
+                    budget.run_cost = budget.spent - marks.get(key, 0)
+
+    def next_interval(self, source: str, interval: float) -> float:
+        """
+        How long to wait before the next scheduled sync of a source.
+
+        At least `interval`. When a token of the source has to back off, the wait
+        lasts until it may retry; otherwise, the remaining budget, less a reserve
+        left for on-demand refreshes, is spread over the time left until the
+        reset, at the cost of the last run.
+
+        Args:
+            source (str): The source name.
+            interval (float): The configured sync interval, in seconds.
+
+        Returns:
+            float: The wait, in seconds.
+        """
+        now = datetime.utcnow()
+        wait = interval
+        with self._lock:
+            budgets = [budget for budget in self._budgets.values() if budget.source == source]
+        for budget in budgets:
+            if budget.retry_at is not None and budget.retry_at > now:
+                wait = max(wait, (budget.retry_at - now).total_seconds())
+            available = budget.available(now)
+            if available is None or budget.reset_at is None or budget.reset_at <= now:
+                continue
+
+            until_reset = (budget.reset_at - now).total_seconds()
+            usable = available - self._reserve_fraction * (budget.limit or available)
+            if usable <= 0:
+                wait = max(wait, until_reset)
+            elif budget.run_cost:
+                runs = usable / budget.run_cost
+                wait = max(wait, min(until_reset / runs, until_reset))
+        return wait
+
+    def budgets(self) -> List[RateLimitBudget]:
+        with self._lock:
+            return [replace(budget) for budget in self._budgets.values()]
+
+
+rate_limits = RateLimitTracker(settings.RATE_LIMIT_RESERVE_FRACTION)
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Maps a source and its configured interval to the wait before its next run
+Pacer = Callable[[str, float], float]
+
+
+class SyncScheduler:
+    """
+    Runs each registered sync job on its own interval in the background.
+
+    Every source gets its own task, so a slow upstream only delays its own source.
+    A job may have a pacer, which turns the configured interval into the wait
+    before its next run, for example to stay within an upstream rate limit.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, tuple[Callable[[], Awaitable[None]], float, Pacer | None]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._next_runs: dict[str, datetime] = {}
+
+    def add_job(
+        self, source: str, job: Callable[[], Awaitable[None]], interval: float, pacer: Pacer | None = None
+    ) -> None:
+        self._jobs[source] = (job, interval, pacer)
+
+    async def _run(
+        self, source: str, job: Callable[[], Awaitable[None]], interval: float, pacer: Pacer | None
+    ) -> None:
+        while True:
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Sync job for {source} crashed: {e}")
+            wait = interval if pacer is None else pacer(source, interval)
+            if wait > interval:
+                logger.info(f"Sync job for {source} paced to {wait:.0f}s")
+            self._next_runs[source] = datetime.utcnow() + timedelta(seconds=wait)
+            await asyncio.sleep(wait)
+
+    def start(self) -> None:
+        for source, (job, interval, pacer) in self._jobs.items():
+            self._next_runs[source] = datetime.utcnow()
+            self._tasks[source] = asyncio.create_task(
+                self._run(source, job, interval, pacer), name=f"sync-{source}"
+            )
+
+    def next_runs(self) -> dict[str, datetime]:
+        """
+        When each running job runs next; a job that is running now shows when it was due.
+        """
+        return dict(self._next_runs)
+
+    async def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._next_runs.clear()
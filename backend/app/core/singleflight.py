@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from app.core.metrics import CACHE_LOOKUPS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the work; callers that arrive while it runs
+    wait for it and all receive its result, or its exception. A result that
+    `reusable` accepts is also handed out to callers arriving within
+    `min_interval` seconds after it completed, so back-to-back calls do not
+    repeat the work.
+
+    Async callers (`run`) and callers on worker threads, such as sync route
+    handlers in the threadpool (`run_blocking`, used by the response cache),
+    share the same flights: the result is held in a thread-safe future that both
+    kinds of callers can wait on.
+
+    A named instance counts, in the cache metrics, the calls that shared a run
+    as hits and the calls that started one as misses.
+    """
+
+    def __init__(
+        self, min_interval: float, reusable: Callable[[Any], bool] = lambda result: True, name: str | None = None
+    ) -> None:
+        self._min_interval = min_interval
+        self._name = name
+        self._reusable = reusable
+        self._lock = threading.Lock()
+        # Each key's flight and, once it completed successfully, when
+        self._flights: Dict[Hashable, Tuple[Future, float | None]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Returns the flight to wait on for a key, and whether the caller has to run it.
+        """
+        future, leader = self._find_or_start(key)
+        if self._name is not None:
+            CACHE_LOOKUPS.inc(cache=self._name, result="miss" if leader else "hit")
+        return future, leader
+
+    def _find_or_start(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                future, completed_at = flight
+                if completed_at is None or time.monotonic() - completed_at < self._min_interval:
+                    return future, False
+
+            future = Future()
+            # A running future cannot be cancelled, so a waiter that gives up leaves it to the others
+            future.set_running_or_notify_cancel()
+            self._flights[key] = (future, None)
+            return future, True
+
+    def _land(self, key: Hashable, future: Future, result: Any = None, error: BaseException | None = None) -> None:
+        with self._lock:
+            current = self._flights.get(key)
+            if current is not None and current[0] is future:
+                if error is None and self._reusable(result):
+                    self._flights[key] = (future, time.monotonic())
+                else:
+                    del self._flights[key]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `work()` for a key, or wait for the run in flight.
+
+        The work runs in its own task, so it completes even if the caller that
+        started it is cancelled.
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(work())
+            self._tasks.add(task)
+
+            def done(task: asyncio.Task) -> None:
+                self._tasks.discard(task)
+                if task.cancelled():
+                    self._land(key, future, error=asyncio.CancelledError())
+                elif task.exception() is not None:
+                    self._land(key, future, error=task.exception())
+                else:
+                    self._land(key, future, result=task.result())
+
+            task.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def run_blocking(self, key: Hashable, work: Callable[[], T]) -> T:
+        """
+        Like `run`, for callers on worker threads; `work` runs on the calling thread.
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                result = work()
+            except BaseException as e:
+                self._land(key, future, error=e)
+                raise
+            self._land(key, future, result=result)
+        return future.result()
+
+    def remember(self, key: Hashable, result: Any) -> None:
+        """
+        Store a result obtained outside of a flight, so calls within `min_interval` reuse it.
+        """
+        if not self._reusable(result):
+            return
+        future = Future()
+        future.set_running_or_notify_cancel()
+        future.set_result(result)
+        with self._lock:
+            current = self._flights.get(key)
+            if current is None or current[1] is not None:
+                self._flights[key] = (future, time.monotonic())
@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parses an ISO 8601 timestamp from an upstream API into a naive UTC datetime,
+    the way timestamps are stored.
+
+    Accepts what GitHub (`2024-01-02T03:04:05Z`), GitLab (`2024-01-02T03:04:05.678Z`)
+    and Jira (`2024-01-02T03:04:05.678+0100`) write. `datetime.fromisoformat` is
+    implemented in C and parses these tens of times faster than `strptime`, which
+    matters when a sync maps thousands of rows.
+
+    Args:
+        value (str): The timestamp.
+
+    Returns:
+        datetime: The timestamp in UTC, without timezone.
+    """
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
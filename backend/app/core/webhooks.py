@@ -0,0 +1,36 @@
+import hashlib
+import hmac
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """
+    Checks an HMAC-SHA256 webhook signature, sent as `sha256=<hex digest>` of
+    the raw request body; GitHub sends it in `X-Hub-Signature-256`, Jira in
+    `X-Hub-Signature`.
+
+    Args:
+        secret (str): The shared secret the webhook was registered with.
+        body (bytes): The raw request body.
+        signature (str | None): The signature header, if any.
+
+    Returns:
+        bool: True if the signature matches.
+    """
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature.removeprefix("sha256="), expected)
+
+
+def verify_token(secret: str, token: str | None) -> bool:
+    """
+    Checks a shared webhook token, such as GitLab's `X-Gitlab-Token`, in constant time.
+
+    Args:
+        secret (str): The token the webhook was registered with.
+        token (str | None): The token header, if any.
+
+    Returns:
+        bool: True if the token matches.
+    """
+    return token is not None and hmac.compare_digest(token.encode(), secret.encode())
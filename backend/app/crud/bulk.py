@@ -0,0 +1,402 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Type
+from sqlalchemy import ColumnElement, all_, bindparam, delete, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlmodel import SQLModel
+from app.core.config import settings
+from app.core.events import TABLE_SOURCES, record_changes
+from app.core.metrics import SYNC_ROWS
+from app.crud.sync_state import bump_data_version
+from app.models import SyncCounts, WebhookDeletion
+
+# Columns that keep the value of the first insert when a row is upserted again
+IMMUTABLE_COLUMNS = ("id", "created_at")
+
+# Columns that do not describe upstream content, so they are left out of the fingerprint.
+# `updated_at` is upstream's own timestamp and stays in: a change that only moves it,
+# such as a new comment, still has to be written
+UNFINGERPRINTED_COLUMNS = ("id", "created_at", "fingerprint", "owner_id")
+
+_PENDING_ROW_COUNTS = "pending_row_counts"
+
+def fingerprint(row: Dict[str, Any]) -> str:
+    """
+    Computes a compact hash of the upstream content of a row.
+
+    Args:
+        row (Dict[str, Any]): The row.
+
+    Returns:
+        str: A 32 character hex digest.
+    """
+    content = {column: value for column, value in row.items() if column not in UNFINGERPRINTED_COLUMNS}
+    encoded = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+# Dialect-specific INSERT constructs, all supporting ON CONFLICT ... DO UPDATE and RETURNING
+INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def get_fingerprints(db: Session, model: Type[SQLModel], key: str, keys: List[Any], owner_id: int) -> Dict[Any, str]:
+    """
+    Returns the stored fingerprints of the rows of a user with the given keys.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        keys (List[Any]): The keys of the rows.
+        owner_id (int): The user the rows belong to.
+
+    Returns:
+        Dict[Any, str]: The fingerprints, by key, of the rows that are stored.
+    """
+    table = model.__table__
+    return dict(
+        db.execute(
+            select(table.c[key], table.c.fingerprint).where(table.c.owner_id == owner_id, table.c[key].in_(keys))
+        ).all()
+    )
+
+def bulk_upsert(
+    db: Session,
+    model: Type[SQLModel],
+    key: str,
+    rows: List[Dict[str, Any]],
+    owner_id: int,
+    newer_only: bool = False,
+) -> SyncCounts:
+    """
+    Inserts new rows of a user and updates changed ones in a single executemany of
+    `INSERT ... ON CONFLICT(owner_id, key) DO UPDATE`, on SQLite and Postgres alike.
+
+    Rows whose fingerprint matches the stored one are not written at all, so a
+    sync where nothing changed upstream issues no writes. Python-side defaults of
+    the model (`id`, `created_at`, `updated_at`) are filled in for rows that lack
+    them, since a Core insert does not apply them. The rows as stored are recorded
+    for the dashboard event stream and the data version of the source is bumped.
+    Nothing is committed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        rows (List[Dict[str, Any]]): The rows to upsert, all with the same columns.
+        owner_id (int): The user the rows belong to.
+        newer_only (bool): Leave stored rows that upstream changed later than the new
+            ones alone, for changes that may arrive out of order, such as webhooks.
+
+    Returns:
+        SyncCounts: How many rows were inserted, updated or left unchanged.
+    """
+    if not rows:
+        return SyncCounts()
+
+    # Postgres refuses to update the same row twice in one statement, so a key that
+    # shows up twice, such as an item that moved between pages, keeps its last row
+    rows = list({row[key]: row for row in rows}.values())
+    table = model.__table__
+    stored_fingerprints = get_fingerprints(db, model, key, [row[key] for row in rows], owner_id)
+
+    now = datetime.utcnow()
+    changed_rows = []
+    for row in rows:
+        row_fingerprint = fingerprint(row)
+        if stored_fingerprints.get(row[key]) != row_fingerprint:
+            changed_rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "created_at": now,
+                    "updated_at": now,
+                    **row,
+                    "owner_id": owner_id,
+                    "fingerprint": row_fingerprint,
+                }
+            )
+
+    if not changed_rows:
+        count_rows(db, model, unchanged=len(rows))
+        return SyncCounts(unchanged=len(rows))
+
+    stmt = INSERTS[db.get_bind().dialect.name](table)
+    changed = table.c.fingerprint != stmt.excluded.fingerprint
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.owner_id, table.c[key]],
+        set_={
+            column: stmt.excluded[column]
+            for column in changed_rows[0]
+            if column not in (key, "owner_id") and column not in IMMUTABLE_COLUMNS
+        },
+        where=(changed & (table.c.updated_at <= stmt.excluded.updated_at)) if newer_only else changed,
+    )
+    stored_rows = db.execute(
+        stmt.returning(*(column for column in table.c if column.key not in ("fingerprint", "owner_id"))), changed_rows
+    ).mappings().all()
+
+    inserted = sum(1 for row in stored_rows if row[key] not in stored_fingerprints)
+    counts = SyncCounts(
+        inserted=inserted,
+        updated=len(stored_rows) - inserted,
+        unchanged=len(rows) - len(stored_rows),
+    )
+    count_rows(db, model, inserted=counts.inserted, updated=counts.updated, unchanged=counts.unchanged)
+    if not stored_rows:
+        return counts
+    record_changes(
+        db,
+        table.name,
+        owner_id,
+        added=[dict(row) for row in stored_rows if row[key] not in stored_fingerprints],
+        updated=[dict(row) for row in stored_rows if row[key] in stored_fingerprints],
+    )
+    mark_changed(db, model, owner_id)
+    return counts
+
+def count_rows(db: Session, model: Type[SQLModel], **changes: int) -> None:
+    """
+    Remembers the rows written to a synced table in the current transaction, by change.
+
+    They are added to the metrics of the table's source once the session commits,
+    and dropped if it rolls back, so failed writes are not counted.
+
+    Args:
+        db (Session): The session the rows were written in.
+        model (Type[SQLModel]): The table model.
+        **changes (int): The number of rows, by change (inserted, updated, unchanged or deleted).
+    """
+    if model.__table__.name in TABLE_SOURCES:
+        source, _ = TABLE_SOURCES[model.__table__.name]
+        pending = db.info.setdefault(_PENDING_ROW_COUNTS, {})
+        for change, count in changes.items():
+            pending[(source, change)] = pending.get((source, change), 0) + count
+
+@event.listens_for(Session, "after_commit")
+def _count_committed_rows(db: Session) -> None:
+    for (source, change), count in db.info.pop(_PENDING_ROW_COUNTS, {}).items():
+        SYNC_ROWS.inc(count, source=source, change=change)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_row_counts(db: Session) -> None:
+    db.info.pop(_PENDING_ROW_COUNTS, None)
+
+def mark_changed(db: Session, model: Type[SQLModel], owner_id: int) -> None:
+    """
+    Bumps the data version of the user's items of the source the table holds.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        owner_id (int): The user whose items changed.
+    """
+    if model.__table__.name in TABLE_SOURCES:
+        source, _ = TABLE_SOURCES[model.__table__.name]
+        bump_data_version(db, source, owner_id)
+
+def not_in_keys(db: Session, column: ColumnElement, keys: List[Any]) -> ColumnElement:
+    """
+    Builds `column NOT IN keys` with every key bound in a single parameter, so it
+    holds however many keys a sync saw: the databases cap the number of bound
+    parameters of a statement, at 65535 for Postgres and 32766 for SQLite.
+
+    Postgres compares to an array, `column != ALL(:keys)`; SQLite reads the keys
+    from a JSON array, `column NOT IN (SELECT value FROM json_each(:keys))`.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        column (ColumnElement): The compared column.
+        keys (List[Any]): The keys.
+
+    Returns:
+        ColumnElement: The condition.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return column != all_(bindparam("keys", keys, type_=postgresql.ARRAY(column.type)))
+    values = func.json_each(bindparam("keys", json.dumps(keys))).table_valued("value")
+    return column.not_in(select(values.c.value))
+
+def delete_missing(db: Session, model: Type[SQLModel], key: str, keys: Iterable[Any], owner_id: int) -> int:
+    """
+    Deletes, in a single `DELETE ... WHERE key NOT IN`, every row of a user whose key is not in `keys`.
+
+    The keys are bound as one parameter, see `not_in_keys`. The deleted keys are
+    recorded for the dashboard event stream and the data version of the source is
+    bumped. Nothing is committed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        keys (Iterable[Any]): The keys of the rows to keep.
+        owner_id (int): The user whose rows are deleted.
+
+    Returns:
+        int: The number of deleted rows.
+    """
+    table = model.__table__
+    column = table.c[key]
+    deleted = db.execute(
+        delete(table).where(table.c.owner_id == owner_id, not_in_keys(db, column, list(keys))).returning(column)
+    ).scalars().all()
+    record_changes(db, table.name, owner_id, removed=deleted)
+    count_rows(db, model, deleted=len(deleted))
+    if deleted:
+        mark_changed(db, model, owner_id)
+    return len(deleted)
+
+def delete_keys(
+    db: Session,
+    model: Type[SQLModel],
+    key: str,
+    keys: Iterable[Any],
+    owner_id: int,
+    updated_before: datetime | None = None,
+) -> int:
+    """
+    Deletes, in a single `DELETE ... WHERE key IN`, every row of a user whose key is in `keys`.
+
+    The deleted keys are recorded for the dashboard event stream and the data
+    version of the source is bumped. Nothing is committed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        keys (Iterable[Any]): The keys of the rows to delete.
+        owner_id (int): The user whose rows are deleted.
+        updated_before (datetime | None): Leave the rows that upstream changed later than this alone.
+
+    Returns:
+        int: The number of deleted rows.
+    """
+    keys = list(keys)
+    if not keys:
+        return 0
+
+    table = model.__table__
+    column = table.c[key]
+    condition = (table.c.owner_id == owner_id) & column.in_(keys)
+    if updated_before is not None:
+        condition &= table.c.updated_at <= updated_before
+    deleted = db.execute(delete(table).where(condition).returning(column)).scalars().all()
+    record_changes(db, table.name, owner_id, removed=deleted)
+    count_rows(db, model, deleted=len(deleted))
+    if deleted:
+        mark_changed(db, model, owner_id)
+    return len(deleted)
+
+def upsert_or_delete(
+    db: Session,
+    model: Type[SQLModel],
+    key: str,
+    item_key: Any,
+    owner_ids: Iterable[int],
+    rows_by_owner: Dict[int, List[Dict[str, Any]]],
+    updated_at: datetime | None = None,
+) -> Dict[int, SyncCounts]:
+    """
+    Applies a change to one upstream item, as reported by a webhook, to every user it may concern.
+
+    The item is upserted for the users that have a row for it in `rows_by_owner`
+    and deleted for the other users in `owner_ids`, such as a reviewer whose
+    review is no longer requested. Nothing is committed.
+
+    Deliveries may arrive late or out of order. Given `updated_at`, the time
+    upstream last changed the item, a user's row that was changed later is left
+    alone, and so is a later deletion. Deletions are remembered for
+    `WEBHOOK_RECONCILE_INTERVAL_SECONDS`; by then, the reconciling sync has
+    corrected whatever an older delivery could still undo.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        item_key (Any): The key of the item.
+        owner_ids (Iterable[int]): The users the change may concern.
+        rows_by_owner (Dict[int, List[Dict[str, Any]]]): The rows of the item, per user it belongs to.
+        updated_at (datetime | None): When upstream last changed the item, or None to apply the change regardless.
+
+    Returns:
+        Dict[int, SyncCounts]: How many rows were inserted, updated, deleted or left unchanged, per user.
+    """
+    owner_ids = list(owner_ids)
+    deleted_at = {}
+    if updated_at is not None:
+        deleted_at = get_webhook_deletions(db, model, item_key, owner_ids)
+
+    counts = {}
+    for owner_id in owner_ids:
+        if owner_id in rows_by_owner:
+            rows = rows_by_owner[owner_id]
+            if owner_id in deleted_at and deleted_at[owner_id] > updated_at:
+                counts[owner_id] = SyncCounts(unchanged=len(rows))
+            else:
+                counts[owner_id] = bulk_upsert(db, model, key, rows, owner_id, newer_only=updated_at is not None)
+        else:
+            deleted = delete_keys(db, model, key, [item_key], owner_id, updated_before=updated_at)
+            counts[owner_id] = SyncCounts(deleted=deleted)
+            if updated_at is not None:
+                record_webhook_deletion(db, model, item_key, owner_id, updated_at)
+    return counts
+
+def get_webhook_deletions(
+    db: Session, model: Type[SQLModel], item_key: Any, owner_ids: List[int]
+) -> Dict[int, datetime]:
+    """
+    Returns when upstream last changed an item that webhooks removed from users.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        item_key (Any): The key of the item.
+        owner_ids (List[int]): The users.
+
+    Returns:
+        Dict[int, datetime]: The time of the item when it was removed, by the user it was removed from.
+    """
+    return dict(
+        db.execute(
+            select(WebhookDeletion.owner_id, WebhookDeletion.updated_at).where(
+                WebhookDeletion.table_name == model.__table__.name,
+                WebhookDeletion.item_key == str(item_key),
+                WebhookDeletion.owner_id.in_(owner_ids),
+            )
+        ).all()
+    )
+
+def record_webhook_deletion(
+    db: Session, model: Type[SQLModel], item_key: Any, owner_id: int, updated_at: datetime
+) -> None:
+    """
+    Remembers that a webhook removed an item from a user, and forgets the
+    deletions older than `WEBHOOK_RECONCILE_INTERVAL_SECONDS`. Nothing is committed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        item_key (Any): The key of the item.
+        owner_id (int): The user the item was removed from.
+        updated_at (datetime): When upstream last changed the item.
+    """
+    table = WebhookDeletion.__table__
+    now = datetime.utcnow()
+    db.execute(delete(table).where(
+        table.c.recorded_at < now - timedelta(seconds=settings.WEBHOOK_RECONCILE_INTERVAL_SECONDS)
+    ))
+    stmt = INSERTS[db.get_bind().dialect.name](table).values(
+        table_name=model.__table__.name,
+        owner_id=owner_id,
+        item_key=str(item_key),
+        updated_at=updated_at,
+        recorded_at=now,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.table_name, table.c.owner_id, table.c.item_key],
+        set_={"updated_at": stmt.excluded.updated_at, "recorded_at": stmt.excluded.recorded_at},
+        where=table.c.updated_at < stmt.excluded.updated_at,
+    ))
@@ -1,141 +1,663 @@
-from typing import List, Tuple, Set
+from typing import Any, AsyncIterator, Dict, Iterator, List, Set, Tuple
+import asyncio
+from datetime import datetime
+import httpx
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from app.crud.settings import get_settings_value
-from app.models import GithubPullRequest
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+from app.core.db import db_writer
+from app.core.metrics import SYNC_PAGES
+from app.core.rate_limit import RateLimitExceeded, is_rate_limited, rate_limits
+from app.core.timestamps import parse_timestamp
+from app.crud.listing import list_items, stream_items
+from app.crud.bulk import bulk_upsert, delete_missing, upsert_or_delete
+from app.crud.settings import get_all_settings
+from app.models import GithubPullRequest, Settings, SyncCounts
 import logging
 
-def get_github_pull_requests(db: Session) -> Tuple[List[GithubPullRequest], int]:
+GITHUB_GRAPHQL_URL = 'https://api.github.com/graphql'
+
+PAGE_SIZE = 100
+
+# GitHub search returns at most this many results, however many match
+SEARCH_RESULTS_LIMIT = 1000
+
+PULL_REQUESTS_QUERY_TEMPLATE = '''
+query($search: String!, $first: Int!, $after: String) {
+  rateLimit {
+    cost
+    limit
+    remaining
+    resetAt
+  }
+  search(query: $search, type: ISSUE, first: $first, after: $after) {
+    issueCount
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes {
+      ... on PullRequest {
+        number
+        title
+        body
+        state
+        url
+        createdAt
+        updatedAt
+        repository {
+          name
+        }%s
+      }
+    }
+  }
+}
+'''
+
+PULL_REQUESTS_QUERY = PULL_REQUESTS_QUERY_TEMPLATE % ''
+
+# The organization scan has to tell whose pull requests it found; the per-user
+# searches already filter on author and reviewer, so they leave out these
+# connections and the query cost they add
+ORG_PULL_REQUESTS_QUERY = PULL_REQUESTS_QUERY_TEMPLATE % '''
+        author {
+          login
+        }
+        reviewRequests(first: 25) {
+          nodes {
+            requestedReviewer {
+              ... on User {
+                login
+              }
+            }
+          }
+        }'''
+
+# The OAuth scopes of each user's access token, as reported with the last
+# response, or None for tokens that report none, such as fine-grained ones, with
+# the settings version they were reported for. Keyed by user id alone, so a new
+# version replaces the old entry
+known_token_scopes: Dict[int, Tuple[int, frozenset[str] | None]] = {}
+
+class GithubRateLimitExceeded(RateLimitExceeded):
+    pass
+
+class GithubSearchIncomplete(RuntimeError):
+    pass
+
+def get_github_pull_requests(
+    db: Session,
+    owner_id: int,
+    status: str | None = None,
+    repository: str | None = None,
+    is_assigned: bool | None = None,
+    fields: List[str] | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> Tuple[List[GithubPullRequest], int, str | None]:
     """
-    Fetches open GitHub pull requests where the user is an author or reviewer,
-    updates the local database accordingly, and returns the list of pull requests.
+    Returns the pull requests of a user stored by the last sync, one page at a time.
 
     Args:
         db (Session): SQLAlchemy database session.
+        owner_id (int): The user whose pull requests are listed.
+        status (str | None): Only list the pull requests with this status.
+        repository (str | None): Only list the pull requests of this repository.
+        is_assigned (bool | None): Only list the pull requests assigned to the user (True) or awaiting their review (False).
+        fields (List[str] | None): The fields to load, or None for all of them.
+        limit (int | None): The page size, or None for every remaining pull request.
+        cursor (str | None): The cursor of the next page, as returned by the previous one.
 
     Returns:
-        Tuple[List[GithubPullRequest], int]: A tuple containing the list of pull requests and the count.
+        Tuple[List[GithubPullRequest], int, str | None]: The pull requests of the page, the count of
+            matching pull requests and the cursor of the next page, if there is one.
+
+    Raises:
+        ValueError: If a field or the cursor is invalid.
     """
-    transport = RequestsHTTPTransport(
-        url='https://api.github.com/graphql',
-        headers={'Authorization': f'Bearer {get_settings_value(db, "github_access_token")}'},
-        retries=3,  # Added retry mechanism
+    return list_items(
+        db,
+        GithubPullRequest,
+        "reference",
+        owner_id,
+        {"status": status, "repository": repository, "is_assigned": is_assigned},
+        fields=fields,
+        limit=limit,
+        cursor=cursor,
     )
-    client = Client(transport=transport, fetch_schema_from_transport=False)
 
-    query = gql('''
-    query($org: String!) {
-      organization(login: $org) {
-        repositories(first: 100) {
-          nodes {
-            name
-            pullRequests(states: OPEN, first: 100) {
-              nodes {
-                number
-                title
-                body
-                state
-                url
-                author {
-                  login
-                }
-                reviewRequests(first: 10) {
-                  nodes {
-                    requestedReviewer {
-                      ... on User {
-                        login
-                      }
-                    }
-                  }
-                }
-              }
-            }
-          }
-        }
-      }
-    }
-    ''')
+def stream_github_pull_requests(
+    db: Session,
+    owner_id: int,
+    status: str | None = None,
+    repository: str | None = None,
+    is_assigned: bool | None = None,
+    fields: List[str] | None = None,
+) -> Iterator[List[GithubPullRequest]]:
+    """
+    Reads every pull request of a user stored by the last sync, in batches, for a streaming export.
 
-    try:
-        result = client.execute(query, variable_values={'org': get_settings_value(db, "github_org")})
-    except Exception as e:
-        if 'API rate limit exceeded' in str(e):
-            logging.error(f"GitHub API rate limit exceeded: {e}")
-            issues = db.query(GithubPullRequest).all()
-            count = len(issues)
-            return issues, count
+    Args:
+        db (Session): SQLAlchemy database session, kept open while the batches are read.
+        owner_id (int): The user whose pull requests are exported.
+        status (str | None): Only export the pull requests with this status.
+        repository (str | None): Only export the pull requests of this repository.
+        is_assigned (bool | None): Only export the pull requests assigned to the user (True) or awaiting their review (False).
+        fields (List[str] | None): The fields to load, or None for all of them.
+
+    Returns:
+        Iterator[List[GithubPullRequest]]: The pull requests, in batches, ordered by their reference.
+
+    Raises:
+        ValueError: If a field is invalid.
+    """
+    return stream_items(db, GithubPullRequest, "reference", owner_id, {"status": status, "repository": repository, "is_assigned": is_assigned}, fields=fields)
+
+def is_github_configured(settings: Settings) -> bool:
+    """
+    Tells whether a user configured GitHub.
+
+    Args:
+        settings (Settings): The user settings.
+
+    Returns:
+        bool: True if the pull requests of the user can be synced.
+    """
+    return bool(settings.github_access_token and settings.github_org and settings.github_user)
+
+async def sync_github_pull_requests(db: Session, client: httpx.AsyncClient, settings: Settings) -> SyncCounts:
+    """
+    Fetches open GitHub pull requests where a user is an author or reviewer
+    and updates the local database accordingly.
+
+    Pages are upserted as they arrive, through the database writer, so memory
+    stays bounded by the page size; stale pull requests are only deleted once
+    every page was fetched.
+
+    Args:
+        db (Session): SQLAlchemy database session, used for reads.
+        client (httpx.AsyncClient): Shared HTTP client for the GitHub API.
+        settings (Settings): The settings of the user to sync.
+
+    Returns:
+        SyncCounts: How many pull requests were inserted, updated, deleted or left unchanged.
+
+    Raises:
+        RuntimeError: If GitHub is not configured or cannot be reached.
+        RateLimitExceeded: If the rate limit runs out before the last page. The pages
+            stored so far are kept, and no pull request is deleted.
+    """
+    if not is_github_configured(settings):
+        raise RuntimeError("GitHub settings are not configured")
+
+    counts = SyncCounts()
+    current_pr_references: Set[str] = set()
+    async for pr_data_list in fetch_github_pull_request_pages(client, settings):
+        # A pull request the user authored and was asked to review shows up in both searches; it counts as authored
+        pr_data_list = [pr for pr in pr_data_list if pr['reference'] not in current_pr_references]
+        current_pr_references.update(pr['reference'] for pr in pr_data_list)
+        counts.add(await db_writer.write(store_github_pull_requests_page, settings.id, pr_data_list))
+
+    counts.deleted = await db_writer.write(delete_stale_github_pull_requests, settings.id, current_pr_references)
+    return counts
+
+async def sync_github_org_pull_requests(
+    db: Session, client: httpx.AsyncClient, users: List[Settings]
+) -> Dict[int, SyncCounts]:
+    """
+    Fetches the open pull requests of an organization once and distributes them
+    to the users of that organization.
+
+    Instead of two searches per user, a single `org:` search lists every open
+    pull request, and each one is stored for its author (as assigned) and for the
+    users whose review it requests. Only users whose access tokens have the same
+    known scopes share a search, run with the token of the first of them, since
+    what a search finds depends on the token. The others, and every user of a
+    search that GitHub truncated, are synced with their own searches.
+
+    Args:
+        db (Session): SQLAlchemy database session, used for reads.
+        client (httpx.AsyncClient): Shared HTTP client for the GitHub API.
+        users (List[Settings]): The settings of the users to sync, all in the same organization.
+
+    Returns:
+        Dict[int, SyncCounts]: How many pull requests were inserted, updated, deleted or left unchanged, per user.
+
+    Raises:
+        RuntimeError: If GitHub is not configured or cannot be reached.
+        RateLimitExceeded: If the rate limit runs out before the last page. The pages
+            stored so far are kept, and no pull request is deleted.
+    """
+    users = [settings for settings in users if is_github_configured(settings)]
+    if not users:
+        raise RuntimeError("GitHub settings are not configured")
+
+    counts = {settings.id: SyncCounts() for settings in users}
+    groups, own_searches = group_github_users_by_token_scopes(users)
+    for group in groups:
+        try:
+            await scan_github_org_pull_requests(client, group, counts)
+        except GithubSearchIncomplete as e:
+            logging.warning(f"{e}; syncing its users with their own searches")
+            own_searches.extend(group)
+
+    for settings in own_searches:
+        counts[settings.id].add(await sync_github_pull_requests(db, client, settings))
+    return counts
+
+def group_github_users_by_token_scopes(users: List[Settings]) -> Tuple[List[List[Settings]], List[Settings]]:
+    """
+    Splits the users of an organization into those that can share an organization
+    search, because their access tokens have the same known scopes, and the others.
+
+    Args:
+        users (List[Settings]): The settings of the users, all in the same organization.
+
+    Returns:
+        Tuple[List[List[Settings]], List[Settings]]: The groups of at least two users
+            sharing a search, and the users to sync with their own searches.
+    """
+    groups: Dict[frozenset[str], List[Settings]] = {}
+    own_searches = []
+    for settings in users:
+        version, scopes = known_token_scopes.get(settings.id, (None, None))
+        if version != settings.version or scopes is None:
+            own_searches.append(settings)
         else:
-            logging.error(f"Failed to fetch pull requests from GitHub: {e}")
-            raise RuntimeError("GitHub API request failed") from e
+            groups.setdefault(scopes, []).append(settings)
 
-    current_pr_numbers: Set[int] = set()
-    github_user = get_settings_value(db, "github_user")
-    pr_data_list = []
+    shared = []
+    for group in groups.values():
+        if len(group) > 1:
+            shared.append(group)
+        else:
+            own_searches.extend(group)
+    return shared, own_searches
+
+async def scan_github_org_pull_requests(
+    client: httpx.AsyncClient, users: List[Settings], counts: Dict[int, SyncCounts]
+) -> None:
+    """
+    Stores the open pull requests of one organization search for the users of a
+    group and deletes their stale ones, adding to their counts.
 
-    for repo in result.get('organization', {}).get('repositories', {}).get('nodes', []):
-        repo_name = repo.get('name')
-        for pr in repo.get('pullRequests', {}).get('nodes', []):
-            pr_number = pr.get('number')
-            if pr_number is None:
-                continue
-
-            pr_author_login = pr.get('author', {}).get('login', '')
-            is_author = pr_author_login == github_user
-
-            review_requests = pr.get('reviewRequests', {}).get('nodes', [])
-            is_reviewer = any(
-                rr.get('requestedReviewer', {}).get('login') == github_user
-                for rr in review_requests
-                if rr.get('requestedReviewer')
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the GitHub API.
+        users (List[Settings]): The settings of the users sharing the search; the token of the first one is used.
+        counts (Dict[int, SyncCounts]): The counts of every user, updated as pages are stored.
+
+    Raises:
+        GithubSearchIncomplete: If the search did not list every open pull request. The
+            pages stored so far are kept, and no pull request is deleted.
+    """
+    users_by_login = {settings.github_user.lower(): settings.id for settings in users}
+    current_pr_references: Dict[int, Set[str]] = {settings.id: set() for settings in users}
+    async for nodes in fetch_github_org_pull_request_pages(client, users[0]):
+        for owner_id, pr_data_list in assign_github_pull_requests(nodes, users_by_login).items():
+            current_pr_references[owner_id].update(pr['reference'] for pr in pr_data_list)
+            counts[owner_id].add(
+                await db_writer.write(store_github_pull_requests_page, owner_id, pr_data_list)
             )
 
-            if is_author or is_reviewer:
-                current_pr_numbers.add(pr_number)
+    for owner_id, pr_references in current_pr_references.items():
+        counts[owner_id].deleted += await db_writer.write(delete_stale_github_pull_requests, owner_id, pr_references)
+
+async def fetch_github_org_pull_request_pages(
+    client: httpx.AsyncClient, settings: Settings
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Streams every open pull request of the organization, one page of search nodes at a time.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the GitHub API.
+        settings (Settings): The settings whose organization and access token are used.
+
+    Yields:
+        List[Dict[str, Any]]: The pull request nodes of one page.
+
+    Raises:
+        GithubSearchIncomplete: If more pull requests match than GitHub search returns,
+            or the pages ended before every match was listed.
+    """
+    search = f'is:pr is:open org:{settings.github_org}'
+    cursor = None
+    listed = 0
+    issue_count = None
+    while True:
+        result = await execute_github_query(
+            client, settings, ORG_PULL_REQUESTS_QUERY, {'search': search, 'first': PAGE_SIZE, 'after': cursor}
+        )
+        page = result.get('search') or {}
+        issue_count = page.get('issueCount')
+        if issue_count is not None and issue_count > SEARCH_RESULTS_LIMIT:
+            raise GithubSearchIncomplete(
+                f"'{search}' matches {issue_count} pull requests, more than the {SEARCH_RESULTS_LIMIT} GitHub search returns"
+            )
+        SYNC_PAGES.inc(source='github')
+        nodes = page.get('nodes', [])
+        listed += len(nodes)
+        yield nodes
+
+        page_info = page.get('pageInfo') or {}
+        if not page_info.get('hasNextPage'):
+            break
+        cursor = page_info.get('endCursor')
+        if cursor is None:
+            raise GithubSearchIncomplete(f"'{search}' ended after {listed} pull requests")
+
+    if issue_count is not None and listed < issue_count:
+        raise GithubSearchIncomplete(f"'{search}' listed {listed} of {issue_count} pull requests")
+
+def assign_github_pull_requests(
+    nodes: List[Dict[str, Any]], users_by_login: Dict[str, int]
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Maps the pull request nodes of an organization search to the rows of each user.
+
+    A pull request belongs to its author, as assigned, and to every user whose
+    review it requests; when a user is both, it counts as assigned.
+
+    Args:
+        nodes (List[Dict[str, Any]]): The search result nodes.
+        users_by_login (Dict[str, int]): The user ids, by lower-cased GitHub login.
+
+    Returns:
+        Dict[int, List[Dict[str, Any]]]: The pull request rows, per user id.
+    """
+    rows_by_user: Dict[int, List[Dict[str, Any]]] = {}
+    for pr in nodes:
+        author = ((pr.get('author') or {}).get('login') or '').lower()
+        reviewers = {
+            ((request.get('requestedReviewer') or {}).get('login') or '').lower()
+            for request in (pr.get('reviewRequests') or {}).get('nodes') or []
+        }
+        if author in users_by_login:
+            rows_by_user.setdefault(users_by_login[author], []).extend(parse_github_pull_requests([pr], True))
+        for login in reviewers - {author}:
+            if login in users_by_login:
+                rows_by_user.setdefault(users_by_login[login], []).extend(parse_github_pull_requests([pr], False))
 
-                pr_data = {
-                    'pull_request': pr_number,
-                    'title': pr.get('title', ''),
-                    'description': pr.get('body', ''),
-                    'status': pr.get('state', ''),
-                    'repository': repo_name,
-                    'url': pr.get('url', ''),
-                    'is_assigned': is_author,
-                }
-                pr_data_list.append(pr_data)
+    return rows_by_user
 
+async def fetch_github_pull_request_pages(
+    client: httpx.AsyncClient, settings: Settings
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Streams the open pull requests the user authored or was asked to review, one page at a time.
+
+    Uses the GraphQL `search` API scoped to the organization, so only the user's
+    pull requests are transferred, and follows `pageInfo.endCursor` until the last page.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the GitHub API.
+        settings (Settings): The user settings.
+
+    Yields:
+        List[Dict[str, Any]]: The pull request rows of one page.
+    """
+    searches = (
+        (f'is:pr is:open org:{settings.github_org} author:{settings.github_user}', True),
+        (f'is:pr is:open org:{settings.github_org} review-requested:{settings.github_user}', False),
+    )
+
+    for search, is_assigned in searches:
+        cursor = None
+        while True:
+            result = await execute_github_query(
+                client,
+                settings,
+                PULL_REQUESTS_QUERY,
+                {'search': search, 'first': PAGE_SIZE, 'after': cursor},
+            )
+            page = result.get('search') or {}
+            SYNC_PAGES.inc(source='github')
+            yield parse_github_pull_requests(page.get('nodes', []), is_assigned)
+
+            page_info = page.get('pageInfo') or {}
+            if not page_info.get('hasNextPage'):
+                break
+            cursor = page_info.get('endCursor')
+
+async def execute_github_query(
+    client: httpx.AsyncClient, settings: Settings, query: str, variables: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Executes a GraphQL query against the GitHub API with a user's access token.
+
+    The `rateLimit` the query selects, if any, updates the rate limit budget of the
+    token, and the `X-OAuth-Scopes` of the response the known scopes of the token.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the GitHub API.
+        settings (Settings): The settings whose access token is used.
+        query (str): The GraphQL query.
+        variables (Dict[str, Any]): The query variables.
+
+    Returns:
+        Dict[str, Any]: The `data` member of the GraphQL response.
+
+    Raises:
+        RateLimitExceeded: If the rate limit budget of the token is used up.
+        GithubRateLimitExceeded: If GitHub reports the rate limit was exceeded.
+        RuntimeError: If the request or the query failed.
+    """
+    token = settings.github_access_token
     try:
-        existing_pr_numbers = set(
-            pr[0] for pr in db.query(GithubPullRequest.pull_request).all()
+        response = await client.post(
+            GITHUB_GRAPHQL_URL,
+            headers={'Authorization': f'Bearer {token}'},
+            json={'query': query, 'variables': variables},
+        )
+        response.raise_for_status()
+        payload = response.json()
+        scopes = response.headers.get('X-OAuth-Scopes')
+        known_token_scopes[settings.id] = (
+            settings.version,
+            frozenset(scope.strip() for scope in scopes.split(',') if scope.strip()) if scopes is not None else None,
         )
+    except httpx.HTTPStatusError as e:
+        if is_rate_limited(e.response):
+            raise GithubRateLimitExceeded(str(e)) from e
+        logging.error(f"Failed to fetch pull requests from GitHub: {e}")
+        raise RuntimeError("GitHub API request failed") from e
+    except httpx.HTTPError as e:
+        logging.error(f"Failed to fetch pull requests from GitHub: {e}")
+        raise RuntimeError("GitHub API request failed") from e
+
+    rate_limit = (payload.get('data') or {}).get('rateLimit')
+    if rate_limit:
+        rate_limits.observe_graphql('github', f'Bearer {token}', rate_limit)
+
+    errors = payload.get('errors') or []
+    if any(error.get('type') == 'RATE_LIMITED' for error in errors):
+        raise GithubRateLimitExceeded(str(errors))
+    if errors:
+        logging.error(f"Failed to fetch pull requests from GitHub: {errors}")
+        raise RuntimeError("GitHub API request failed")
+
+    return payload.get('data') or {}
+
+def parse_github_pull_requests(nodes: List[Dict[str, Any]], is_assigned: bool) -> List[Dict[str, Any]]:
+    """
+    Maps the pull request nodes of a search page to pull request rows.
+
+    Args:
+        nodes (List[Dict[str, Any]]): The search result nodes.
+        is_assigned (bool): Whether the user authored the pull requests, as opposed to reviewing them.
+
+    Returns:
+        List[Dict[str, Any]]: The pull request rows.
+    """
+    pr_data_list = []
+
+    for pr in nodes:
+        pr_number = pr.get('number')
+        if pr_number is None:
+            continue
+
+        pr_data = {
+            'reference': github_pull_request_reference(pr),
+            'pull_request': pr_number,
+            'title': pr.get('title', ''),
+            'description': pr.get('body', ''),
+            'status': pr.get('state', ''),
+            'repository': (pr.get('repository') or {}).get('name', ''),
+            'url': pr.get('url', ''),
+            'is_assigned': is_assigned,
+            'created_at': parse_timestamp(pr['createdAt']),
+            'updated_at': parse_timestamp(pr['updatedAt']),
+        }
+        pr_data_list.append(pr_data)
+
+    return pr_data_list
+
+def github_pull_request_reference(pr: Dict[str, Any]) -> str:
+    """
+    Returns the reference identifying a pull request among those of the organization, `<repository>#<number>`.
+
+    Args:
+        pr (Dict[str, Any]): The pull request search node.
+
+    Returns:
+        str: The reference.
+    """
+    return f"{(pr.get('repository') or {}).get('name', '')}#{pr['number']}"
+
+def store_github_pull_requests_page(db: Session, owner_id: int, pr_data_list: List[Dict[str, Any]]) -> SyncCounts:
+    """
+    Inserts or updates one page of pull requests fetched from GitHub.
+
+    Nothing is committed; the database writer commits the page.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user the pull requests belong to.
+        pr_data_list (List[Dict[str, Any]]): The pull request rows of the page.
+
+    Returns:
+        SyncCounts: How many pull requests were inserted, updated or left unchanged.
+    """
+    try:
+        return bulk_upsert(db, GithubPullRequest, 'reference', pr_data_list, owner_id)
+    except SQLAlchemyError as e:
+        logging.error(f"Database operation failed: {e}")
+        db.rollback()
+        raise RuntimeError("Database operation failed") from e
+
+def github_webhook_node(pull_request: Dict[str, Any], repository: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Maps the pull request of a `pull_request` webhook payload to the shape of a
+    pull request search node, so it goes through the same mapping as synced ones.
+
+    Args:
+        pull_request (Dict[str, Any]): The `pull_request` member of the payload.
+        repository (Dict[str, Any]): The `repository` member of the payload.
+
+    Returns:
+        Dict[str, Any]: The pull request as an organization search node.
+    """
+    if pull_request.get('state') == 'open':
+        state = 'OPEN'
+    else:
+        state = 'MERGED' if pull_request.get('merged') else 'CLOSED'
+
+    return {
+        'number': pull_request['number'],
+        'title': pull_request.get('title', ''),
+        'body': pull_request.get('body') or '',
+        'state': state,
+        'url': pull_request.get('html_url', ''),
+        'createdAt': pull_request['created_at'],
+        'updatedAt': pull_request['updated_at'],
+        'repository': {'name': repository.get('name', '')},
+        'author': {'login': (pull_request.get('user') or {}).get('login')},
+        'reviewRequests': {
+            'nodes': [{'requestedReviewer': reviewer} for reviewer in pull_request.get('requested_reviewers') or []]
+        },
+    }
 
-        pr_numbers_to_update = existing_pr_numbers & current_pr_numbers
-        pr_numbers_to_add = current_pr_numbers - existing_pr_numbers
-        pr_numbers_to_delete = existing_pr_numbers - current_pr_numbers
-
-        for pr_data in pr_data_list:
-            pr_number = pr_data['pull_request']
-            if pr_number in pr_numbers_to_update:
-                db.query(GithubPullRequest).filter(
-                    GithubPullRequest.pull_request == pr_number
-                ).update(pr_data)
-            elif pr_number in pr_numbers_to_add:
-                db_pr = GithubPullRequest(**pr_data)
-                db.add(db_pr)
-
-        if pr_numbers_to_delete:
-            db.query(GithubPullRequest).filter(
-                GithubPullRequest.pull_request.in_(pr_numbers_to_delete)
-            ).delete(synchronize_session=False)
+async def apply_github_pull_request_event(db: Session, payload: Dict[str, Any]) -> Dict[int, SyncCounts]:
+    """
+    Applies a `pull_request` webhook to the stored pull requests of the users of its organization.
+
+    An open pull request is stored for its author and the users whose review it
+    requests, as a sync would, and removed from the other users of the
+    organization, such as a reviewer whose request was withdrawn; a closed or
+    merged one is removed from all of them.
+
+    Args:
+        db (Session): SQLAlchemy database session, used for reads.
+        payload (Dict[str, Any]): The webhook payload.
 
+    Returns:
+        Dict[int, SyncCounts]: How many pull requests were inserted, updated or deleted, per user.
+    """
+    node = github_webhook_node(payload['pull_request'], payload.get('repository') or {})
+    org = ((payload.get('organization') or {}).get('login') or '').lower()
+    users = [
+        settings for settings in await asyncio.to_thread(get_all_settings, db)
+        if is_github_configured(settings) and settings.github_org.lower() == org
+    ]
+    rows_by_user = {}
+    if node['state'] == 'OPEN':
+        users_by_login = {settings.github_user.lower(): settings.id for settings in users}
+        rows_by_user = assign_github_pull_requests([node], users_by_login)
+
+    return await db_writer.write(
+        store_github_pull_request_event,
+        github_pull_request_reference(node),
+        [settings.id for settings in users],
+        rows_by_user,
+        parse_timestamp(node['updatedAt']),
+    )
+
+def store_github_pull_request_event(
+    db: Session,
+    pr_reference: str,
+    owner_ids: List[int],
+    rows_by_user: Dict[int, List[Dict[str, Any]]],
+    updated_at: datetime,
+) -> Dict[int, SyncCounts]:
+    """
+    Stores the pull request of a webhook for the users it belongs to, deletes it
+    for the other users and commits. Users whose pull request is newer than the
+    webhook's, such as after a delivery that arrived earlier, are left alone.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        pr_reference (str): The pull request reference, `<repository>#<number>`.
+        owner_ids (List[int]): The users the webhook concerns.
+        rows_by_user (Dict[int, List[Dict[str, Any]]]): The pull request row, per user it belongs to.
+        updated_at (datetime): When GitHub last changed the pull request, as of the webhook.
+
+    Returns:
+        Dict[int, SyncCounts]: How many pull requests were inserted, updated or deleted, per user.
+    """
+    try:
+        counts = upsert_or_delete(db, GithubPullRequest, 'reference', pr_reference, owner_ids, rows_by_user, updated_at)
         db.commit()
+        return counts
     except SQLAlchemyError as e:
         logging.error(f"Database operation failed: {e}")
         db.rollback()
         raise RuntimeError("Database operation failed") from e
 
-    issues = db.query(GithubPullRequest).all()
-    count = len(issues)
+def delete_stale_github_pull_requests(db: Session, owner_id: int, current_pr_references: Set[str]) -> int:
+    """
+    Deletes the pull requests that are no longer open and commits the sync.
 
-    return issues, count
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user whose pull requests were synced.
+        current_pr_references (Set[str]): The references of the pull requests seen in this sync.
+
+    Returns:
+        int: The number of deleted pull requests.
+    """
+    try:
+        deleted = delete_missing(db, GithubPullRequest, 'reference', current_pr_references, owner_id)
+        db.commit()
+        return deleted
+    except SQLAlchemyError as e:
+        logging.error(f"Database operation failed: {e}")
+        db.rollback()
+        raise RuntimeError("Database operation failed") from e
@@ -1,89 +1,523 @@
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Set, Tuple
+import asyncio
+import httpx
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from app.models import GitlabMergeRequest, Settings
-import requests
+from app.core.config import settings as app_settings
+from app.core.db import db_writer
+from app.core.http import conditional_cache, conditional_get
+from app.core.metrics import SYNC_PAGES
+from app.core.timestamps import parse_timestamp
+from app.crud.listing import list_items, stream_items
+from app.crud.bulk import bulk_upsert, delete_keys, delete_missing, fingerprint, get_fingerprints, upsert_or_delete
+from app.crud.settings import get_all_settings
+from app.crud.sync_state import get_sync_state, needs_full_sync, update_sync_cursor
+from app.models import GitlabMergeRequest, Settings, SyncCounts
 from datetime import datetime
+from urllib.parse import urlsplit
 import logging
 
-def get_gitlab_merge_requests(db: Session):
-    settings = db.query(Settings).first()
-    if not settings or not settings.gitlab_access_token or not settings.gitlab_api_url:
+PER_PAGE = 100
+
+# The GitLab username of each user, with the settings version it was looked up
+# for, so webhooks can tell whose merge request they carry without asking GitLab
+# again. Keyed by user id alone, so a new version replaces the old entry
+known_usernames: Dict[int, Tuple[int, str]] = {}
+
+def get_gitlab_merge_requests(
+    db: Session,
+    owner_id: int,
+    status: str | None = None,
+    repository: str | None = None,
+    is_assigned: bool | None = None,
+    fields: List[str] | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> Tuple[List[GitlabMergeRequest], int, str | None]:
+    """
+    Returns the merge requests of a user stored by the last sync, one page at a time.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user whose merge requests are listed.
+        status (str | None): Only list the merge requests with this status.
+        repository (str | None): Only list the merge requests of this repository.
+        is_assigned (bool | None): Only list the merge requests assigned to the user (True) or awaiting their review (False).
+        fields (List[str] | None): The fields to load, or None for all of them.
+        limit (int | None): The page size, or None for every remaining merge request.
+        cursor (str | None): The cursor of the next page, as returned by the previous one.
+
+    Returns:
+        Tuple[List[GitlabMergeRequest], int, str | None]: The merge requests of the page, the count of
+            matching merge requests and the cursor of the next page, if there is one.
+
+    Raises:
+        ValueError: If a field or the cursor is invalid.
+    """
+    return list_items(
+        db,
+        GitlabMergeRequest,
+        "reference",
+        owner_id,
+        {"status": status, "repository": repository, "is_assigned": is_assigned},
+        fields=fields,
+        limit=limit,
+        cursor=cursor,
+    )
+
+def stream_gitlab_merge_requests(
+    db: Session,
+    owner_id: int,
+    status: str | None = None,
+    repository: str | None = None,
+    is_assigned: bool | None = None,
+    fields: List[str] | None = None,
+) -> Iterator[List[GitlabMergeRequest]]:
+    """
+    Reads every merge request of a user stored by the last sync, in batches, for a streaming export.
+
+    Args:
+        db (Session): SQLAlchemy database session, kept open while the batches are read.
+        owner_id (int): The user whose merge requests are exported.
+        status (str | None): Only export the merge requests with this status.
+        repository (str | None): Only export the merge requests of this repository.
+        is_assigned (bool | None): Only export the merge requests assigned to the user (True) or awaiting their review (False).
+        fields (List[str] | None): The fields to load, or None for all of them.
+
+    Returns:
+        Iterator[List[GitlabMergeRequest]]: The merge requests, in batches, ordered by their key.
+
+    Raises:
+        ValueError: If a field is invalid.
+    """
+    return stream_items(db, GitlabMergeRequest, "reference", owner_id, {"status": status, "repository": repository, "is_assigned": is_assigned}, fields=fields)
+
+def is_gitlab_configured(settings: Settings) -> bool:
+    """
+    Tells whether a user configured GitLab.
+
+    Args:
+        settings (Settings): The user settings.
+
+    Returns:
+        bool: True if the merge requests of the user can be synced.
+    """
+    return bool(settings.gitlab_access_token and settings.gitlab_api_url)
+
+async def sync_gitlab_merge_requests(db: Session, client: httpx.AsyncClient, settings: Settings) -> SyncCounts:
+    """
+    Fetches the open GitLab merge requests assigned to a user or awaiting their review
+    and updates the local database accordingly.
+
+    A full sync fetches every open merge request and deletes the ones that are gone.
+    In between, incremental syncs only request merge requests updated since the
+    high-water mark of the previous sync, in any state, and drop the ones that were
+    merged or closed meanwhile. Pages GitLab reports as not modified are neither
+    parsed nor written; the others are written as soon as they arrive, through
+    the database writer.
+
+    Args:
+        db (Session): SQLAlchemy database session, used for reads.
+        client (httpx.AsyncClient): Shared HTTP client for the GitLab API.
+        settings (Settings): The settings of the user to sync.
+
+    Returns:
+        SyncCounts: How many merge requests were inserted, updated, deleted or left unchanged.
+    """
+    if not is_gitlab_configured(settings):
         raise RuntimeError("GitLab settings are not configured")
 
+    state = await asyncio.to_thread(get_sync_state, db, "gitlab", settings.id)
+    full_sync = needs_full_sync(state, app_settings.GITLAB_FULL_SYNC_INTERVAL_SECONDS)
+    updated_after = None if full_sync else state.high_water_mark
+    high_water_mark = None if state is None else state.high_water_mark
+
+    counts = SyncCounts()
+    current_mr_references: Set[str] = set()
+    async for mr_data_list, mr_references, remember in fetch_gitlab_merge_request_pages(db, client, settings, updated_after):
+        mr_data_list = [mr for mr in mr_data_list if mr['reference'] not in current_mr_references]
+        current_mr_references.update(mr_references)
+        if remember is None:
+            continue
+        if mr_data_list:
+            for mr_data in mr_data_list:
+                if high_water_mark is None or mr_data['updated_at'] > high_water_mark:
+                    high_water_mark = mr_data['updated_at']
+            counts.add(await db_writer.write(store_gitlab_merge_requests_page, settings.id, mr_data_list))
+        # Only once the page is stored may a later `304 Not Modified` for it stand in for its rows
+        remember(stored_gitlab_merge_request_fingerprints(mr_data_list))
+
+    counts.deleted += await db_writer.write(
+        finish_gitlab_merge_requests_sync, settings.id, current_mr_references, high_water_mark, full_sync
+    )
+    return counts
+
+def stored_gitlab_merge_request_fingerprints(mr_data_list: List[Dict[str, Any]]) -> Dict[str, str | None]:
+    """
+    Returns what storing a page of merge requests leaves in the database: the
+    fingerprint of each open merge request, and None for merged or closed ones,
+    which are deleted.
+
+    Args:
+        mr_data_list (List[Dict[str, Any]]): The merge request rows of the page.
+
+    Returns:
+        Dict[str, str | None]: The stored fingerprint of each merge request, by reference.
+    """
+    return {
+        mr_data['reference']: fingerprint(mr_data) if mr_data['status'] == 'opened' else None
+        for mr_data in mr_data_list
+    }
+
+def gitlab_merge_requests_match(db: Session, owner_id: int, fingerprints: Dict[str, str | None]) -> bool:
+    """
+    Checks that the stored merge requests of a user are still the ones a page left.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user the merge requests belong to.
+        fingerprints (Dict[str, str | None]): The fingerprint of each merge request of the
+            page by reference, None for those that are not stored.
+
+    Returns:
+        bool: Whether every merge request is stored as the page left it.
+    """
+    stored = get_fingerprints(db, GitlabMergeRequest, 'reference', list(fingerprints), owner_id)
+    return all(stored.get(reference) == mr_fingerprint for reference, mr_fingerprint in fingerprints.items())
+
+async def fetch_gitlab_merge_request_pages(
+    db: Session, client: httpx.AsyncClient, settings: Settings, updated_after: datetime | None
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], List[str], Callable[[Dict[str, str | None]], None] | None]]:
+    """
+    Streams the merge requests assigned to the user or awaiting their review, one page at a time.
+
+    Follows the `X-Next-Page` header until the last page. Pages are requested
+    conditionally, with the validators of the last response the caller stored.
+    For a page GitLab answers with `304 Not Modified`, no rows are yielded, only
+    the references it held, and only when its merge requests are still stored the way
+    it left them; otherwise the page is fetched again in full.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        client (httpx.AsyncClient): Shared HTTP client for the GitLab API.
+        settings (Settings): The user settings.
+        updated_after (datetime | None): Only fetch merge requests updated since then,
+            in any state. Fetches every open merge request when None.
+
+    Yields:
+        Tuple[List[Dict[str, Any]], List[str], Callable[[Dict[str, str | None]], None] | None]:
+            The merge request rows of one page, the references of every merge request on the
+            page, and, for a page that was fetched in full, a function to call with the
+            fingerprints of its merge requests once they are stored, which keeps its
+            validators for the next sync.
+    """
     headers = {
         "Authorization": f"Bearer {settings.gitlab_access_token}",
         "Content-Type": "application/json",
     }
 
-    try:
-        response = requests.get(
-            f"{settings.gitlab_api_url}/merge_requests?state=opened",
-            headers=headers
-        )
-        response.raise_for_status()
-        merge_requests_data = response.json()
-    except requests.RequestException as e:
-        logging.error(f"Error fetching GitLab merge requests: {e}")
-        raise RuntimeError(f"Failed to fetch GitLab merge requests: {str(e)}")
-
-    merge_requests = []
-    for mr_data in merge_requests_data:
-        merge_request = GitlabMergeRequest(
-            title=mr_data['title'],
-            description=mr_data['description'],
-            status=mr_data['state'],
-            created_at=datetime.strptime(mr_data['created_at'], "%Y-%m-%dT%H:%M:%S.%fZ"),
-            updated_at=datetime.strptime(mr_data['updated_at'], "%Y-%m-%dT%H:%M:%S.%fZ"),
-            merge_request=mr_data['iid'],
-            repository=mr_data['references']['full'].split('!')[0],
-            url=mr_data['web_url'],
-        )
-        merge_requests.append(merge_request)
+    params: Dict[str, Any] = {"per_page": PER_PAGE}
+    if updated_after is None:
+        params["state"] = "opened"
+    else:
+        params["state"] = "all"
+        params["updated_after"] = f"{updated_after.isoformat()}Z"
 
-    try:
-        # Get existing merge requests from the database
-        existing_mrs = db.query(GitlabMergeRequest).all()
-        existing_mr_dict = {mr.merge_request: mr for mr in existing_mrs}
-
-        # Update or add new merge requests
-        for mr_data in merge_requests_data:
-            mr_iid = mr_data['iid']
-            if mr_iid in existing_mr_dict:
-                # Update existing merge request
-                existing_mr = existing_mr_dict[mr_iid]
-                existing_mr.title = mr_data['title']
-                existing_mr.description = mr_data['description']
-                existing_mr.status = mr_data['state']
-                existing_mr.updated_at = datetime.strptime(mr_data['updated_at'], "%Y-%m-%dT%H:%M:%S.%fZ")
-                existing_mr.repository = mr_data['references']['full'].split('!')[0]
-                existing_mr.url = mr_data['web_url']
-            else:
-                # Add new merge request
-                new_mr = GitlabMergeRequest(
-                    title=mr_data['title'],
-                    description=mr_data['description'],
-                    status=mr_data['state'],
-                    created_at=datetime.strptime(mr_data['created_at'], "%Y-%m-%dT%H:%M:%S.%fZ"),
-                    updated_at=datetime.strptime(mr_data['updated_at'], "%Y-%m-%dT%H:%M:%S.%fZ"),
-                    merge_request=mr_iid,
-                    repository=mr_data['references']['full'].split('!')[0],
-                    url=mr_data['web_url'],
+    username = await get_gitlab_username(client, settings, headers)
+    scopes = (
+        ({"scope": "assigned_to_me"}, True),
+        ({"scope": "all", "reviewer_username": username}, False),
+    )
+
+    for scope, is_assigned in scopes:
+        page = "1"
+        while page:
+            try:
+                response, cached = await conditional_get(
+                    client,
+                    f"{settings.gitlab_api_url}/merge_requests",
+                    headers=headers,
+                    params={**params, **scope, "page": page},
                 )
-                db.add(new_mr)
+                if cached is not None:
+                    mr_references, fingerprints, next_page = cached.data
+                    if not await asyncio.to_thread(gitlab_merge_requests_match, db, settings.id, fingerprints):
+                        # The stored rows changed since, so the page's rows are needed again
+                        conditional_cache.forget(response.request)
+                        continue
+                    page = next_page
+                    SYNC_PAGES.inc(source="gitlab")
+                    yield [], mr_references, None
+                    continue
+                response.raise_for_status()
+                merge_requests_data = response.json()
+            except httpx.HTTPError as e:
+                logging.error(f"Error fetching GitLab merge requests: {e}")
+                raise RuntimeError(f"Failed to fetch GitLab merge requests: {str(e)}")
+
+            mr_data_list = [parse_gitlab_merge_request(mr_data, is_assigned) for mr_data in merge_requests_data]
+            mr_references = [mr_data['reference'] for mr_data in mr_data_list]
+            page = response.headers.get("X-Next-Page")
+
+            def remember(fingerprints, response=response, mr_references=mr_references, next_page=page):
+                conditional_cache.remember(response, (mr_references, fingerprints, next_page))
+
+            SYNC_PAGES.inc(source="gitlab")
+            yield mr_data_list, mr_references, remember
+
+async def get_gitlab_username(client: httpx.AsyncClient, settings: Settings, headers: Dict[str, str]) -> str:
+    """
+    Looks up the username the GitLab access token belongs to.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the GitLab API.
+        settings (Settings): The user settings.
+        headers (Dict[str, str]): The authenticated request headers.
+
+    Returns:
+        str: The GitLab username.
+    """
+    try:
+        response, cached = await conditional_get(client, f"{settings.gitlab_api_url}/user", headers=headers)
+        if cached is not None:
+            username = cached.data
+        else:
+            response.raise_for_status()
+            username = response.json()["username"]
+            conditional_cache.remember(response, username)
+        known_usernames[settings.id] = (settings.version, username)
+        return username
+    except httpx.HTTPError as e:
+        logging.error(f"Error fetching GitLab user: {e}")
+        raise RuntimeError(f"Failed to fetch GitLab user: {str(e)}")
+
+def parse_gitlab_merge_request(mr_data: Dict[str, Any], is_assigned: bool) -> Dict[str, Any]:
+    """
+    Maps a merge request returned by the GitLab API to a merge request row.
+
+    Args:
+        mr_data (Dict[str, Any]): The merge request returned by the GitLab API.
+        is_assigned (bool): Whether the merge request is assigned to the user, as opposed to awaiting their review.
 
-        # Delete merge requests that no longer exist in GitLab
-        current_mr_iids = {mr['iid'] for mr in merge_requests_data}
-        for mr_iid, mr in existing_mr_dict.items():
-            if mr_iid not in current_mr_iids:
-                db.delete(mr)
+    Returns:
+        Dict[str, Any]: The merge request row.
+    """
+    return {
+        'reference': gitlab_merge_request_reference(mr_data),
+        'merge_request': mr_data['iid'],
+        'title': mr_data['title'],
+        'description': mr_data['description'] or '',
+        'status': mr_data['state'],
+        'created_at': parse_timestamp(mr_data['created_at']),
+        'updated_at': parse_timestamp(mr_data['updated_at']),
+        'repository': mr_data['references']['full'].split('!')[0],
+        'url': mr_data['web_url'],
+        'is_assigned': is_assigned,
+    }
+
+def gitlab_merge_request_reference(mr_data: Dict[str, Any]) -> str:
+    """
+    Returns the reference identifying a merge request on the GitLab instance,
+    `<project path>!<iid>`: iids are only unique within a project.
+
+    Args:
+        mr_data (Dict[str, Any]): The merge request returned by the GitLab API.
+
+    Returns:
+        str: The reference.
+    """
+    return f"{mr_data['references']['full'].split('!')[0]}!{mr_data['iid']}"
+
+def normalize_gitlab_webhook_timestamp(value: str) -> str:
+    """
+    Rewrites the older webhook timestamp format, `2024-01-02 03:04:05 UTC`, as
+    ISO 8601; timestamps already in ISO 8601 are returned unchanged. Either way
+    it is parsed once, with the synced merge requests' timestamps.
+
+    Args:
+        value (str): The webhook timestamp.
+
+    Returns:
+        str: The timestamp in ISO 8601.
+    """
+    return value.replace(" UTC", "Z").replace(" ", "T")
+
+def gitlab_webhook_merge_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Maps the merge request of a `merge_request` webhook payload to the shape
+    the merge requests API returns, so it goes through the same mapping as synced ones.
+
+    Args:
+        payload (Dict[str, Any]): The webhook payload.
+
+    Returns:
+        Dict[str, Any]: The merge request as the API returns it.
+    """
+    attributes = payload['object_attributes']
+    project = payload.get('project') or {}
+    return {
+        'iid': attributes['iid'],
+        'title': attributes.get('title', ''),
+        'description': attributes.get('description'),
+        'state': attributes['state'],
+        'created_at': normalize_gitlab_webhook_timestamp(attributes['created_at']),
+        'updated_at': normalize_gitlab_webhook_timestamp(attributes['updated_at']),
+        'references': {'full': f"{project.get('path_with_namespace', '')}!{attributes['iid']}"},
+        'web_url': attributes.get('url', ''),
+    }
+
+async def get_gitlab_usernames(client: httpx.AsyncClient, users: List[Settings]) -> Dict[str, int]:
+    """
+    Returns the user ids by GitLab username, looking up the usernames no sync recorded yet.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the GitLab API.
+        users (List[Settings]): The settings of the users.
+
+    Returns:
+        Dict[str, int]: The user ids, by GitLab username.
+    """
+    usernames = {}
+    for settings in users:
+        version, username = known_usernames.get(settings.id, (None, None))
+        if version != settings.version:
+            headers = {"Authorization": f"Bearer {settings.gitlab_access_token}"}
+            username = await get_gitlab_username(client, settings, headers)
+        usernames[username] = settings.id
+    return usernames
+
+async def apply_gitlab_merge_request_event(
+    db: Session, client: httpx.AsyncClient, payload: Dict[str, Any]
+) -> Dict[int, SyncCounts]:
+    """
+    Applies a `merge_request` webhook to the stored merge requests of the users of its GitLab instance.
+
+    An open merge request is stored for its assignees, as assigned, and for its
+    reviewers, and removed from the other users of the instance; a merged or
+    closed one is removed from all of them.
+
+    Args:
+        db (Session): SQLAlchemy database session, used for reads.
+        client (httpx.AsyncClient): Shared HTTP client for the GitLab API, to look up usernames.
+        payload (Dict[str, Any]): The webhook payload.
+
+    Returns:
+        Dict[int, SyncCounts]: How many merge requests were inserted, updated or deleted, per user.
+    """
+    mr_data = gitlab_webhook_merge_request(payload)
+    host = urlsplit((payload.get('project') or {}).get('web_url', '')).netloc
+    users = [
+        settings for settings in await asyncio.to_thread(get_all_settings, db)
+        if is_gitlab_configured(settings) and urlsplit(settings.gitlab_api_url).netloc == host
+    ]
+
+    rows_by_user: Dict[int, List[Dict[str, Any]]] = {}
+    if mr_data['state'] == 'opened':
+        usernames = await get_gitlab_usernames(client, users)
+        scopes = ((payload.get('assignees'), True), (payload.get('reviewers'), False))
+        for people, is_assigned in scopes:
+            for person in people or []:
+                owner_id = usernames.get(person.get('username'))
+                if owner_id is not None and owner_id not in rows_by_user:
+                    rows_by_user[owner_id] = [parse_gitlab_merge_request(mr_data, is_assigned)]
+
+    return await db_writer.write(
+        store_gitlab_merge_request_event,
+        gitlab_merge_request_reference(mr_data),
+        [settings.id for settings in users],
+        rows_by_user,
+        parse_timestamp(mr_data['updated_at']),
+    )
+
+def store_gitlab_merge_request_event(
+    db: Session,
+    mr_reference: str,
+    owner_ids: List[int],
+    rows_by_user: Dict[int, List[Dict[str, Any]]],
+    updated_at: datetime,
+) -> Dict[int, SyncCounts]:
+    """
+    Stores the merge request of a webhook for the users it belongs to, deletes it
+    for the other users and commits. Users whose merge request is newer than the
+    webhook's, such as after a delivery that arrived earlier, are left alone.
 
+    Args:
+        db (Session): SQLAlchemy database session.
+        mr_reference (str): The merge request reference, `<project path>!<iid>`.
+        owner_ids (List[int]): The users the webhook concerns.
+        rows_by_user (Dict[int, List[Dict[str, Any]]]): The merge request row, per user it belongs to.
+        updated_at (datetime): When GitLab last changed the merge request, as of the webhook.
+
+    Returns:
+        Dict[int, SyncCounts]: How many merge requests were inserted, updated or deleted, per user.
+    """
+    try:
+        counts = upsert_or_delete(db, GitlabMergeRequest, 'reference', mr_reference, owner_ids, rows_by_user, updated_at)
         db.commit()
+        return counts
+    except SQLAlchemyError as e:
+        logging.error(f"Database operation failed: {e}")
+        db.rollback()
+        raise RuntimeError("Database operation failed") from e
+
+def store_gitlab_merge_requests_page(db: Session, owner_id: int, mr_data_list: List[Dict[str, Any]]) -> SyncCounts:
+    """
+    Applies one page of merge requests fetched from GitLab.
+
+    Open merge requests are inserted or updated; merged or closed ones, which only
+    show up in incremental syncs, are deleted. Nothing is committed; the database
+    writer commits the page.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user the merge requests belong to.
+        mr_data_list (List[Dict[str, Any]]): The merge request rows of the page.
+
+    Returns:
+        SyncCounts: How many merge requests were inserted, updated, deleted or left unchanged.
+    """
+    open_mrs = [mr_data for mr_data in mr_data_list if mr_data['status'] == 'opened']
+    closed_mr_references = [mr_data['reference'] for mr_data in mr_data_list if mr_data['status'] != 'opened']
+
+    try:
+        counts = bulk_upsert(db, GitlabMergeRequest, 'reference', open_mrs, owner_id)
+        counts.deleted = delete_keys(db, GitlabMergeRequest, 'reference', closed_mr_references, owner_id)
+        return counts
     except SQLAlchemyError as e:
         logging.error(f"Database operation failed: {e}")
         db.rollback()
         raise RuntimeError("Database operation failed") from e
 
-    issues = db.query(GitlabMergeRequest).all()
-    count = len(issues)
+def finish_gitlab_merge_requests_sync(
+    db: Session,
+    owner_id: int,
+    current_mr_references: Set[str],
+    high_water_mark: datetime | None,
+    full_sync: bool,
+) -> int:
+    """
+    Deletes the merge requests that are gone after a full sync, moves the
+    high-water mark forward and commits the sync.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user whose merge requests were synced.
+        current_mr_references (Set[str]): The references of the merge requests seen in this sync.
+        high_water_mark (datetime | None): The newest `updated_at` seen so far.
+        full_sync (bool): Whether this sync fetched every open merge request.
+
+    Returns:
+        int: The number of deleted merge requests.
+    """
+    try:
+        deleted = 0
+        if full_sync:
+            deleted = delete_missing(db, GitlabMergeRequest, 'reference', current_mr_references, owner_id)
 
-    return issues, count
+        update_sync_cursor(db, "gitlab", owner_id, high_water_mark, full_sync)
+        db.commit()
+        return deleted
+    except SQLAlchemyError as e:
+        logging.error(f"Database operation failed: {e}")
+        db.rollback()
+        raise RuntimeError("Database operation failed") from e
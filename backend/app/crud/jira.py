@@ -1,74 +1,407 @@
-from typing import List, Tuple
-import requests
+from typing import Any, AsyncIterator, Dict, Iterator, List, Set, Tuple
+import asyncio
+import itertools
+import math
+import httpx
 from sqlalchemy.orm import Session
-from app.crud.settings import get_settings_value
-from app.models import JiraIssue
+from app.core.config import settings as app_settings
+from app.core.db import db_writer
+from app.core.metrics import SYNC_PAGES
+from app.core.timestamps import parse_timestamp
+from app.crud.listing import list_items, stream_items
+from app.crud.bulk import bulk_upsert, delete_missing, upsert_or_delete
+from app.crud.settings import get_all_settings
+from app.crud.sync_state import get_sync_state, needs_full_sync, update_sync_cursor
+from app.models import JiraIssue, Settings, SyncCounts
 from datetime import datetime
 import base64
-from fastapi import HTTPException
-from requests.exceptions import RequestException
 from sqlalchemy.exc import SQLAlchemyError
+import logging
 
-def get_jira_issues(db: Session) -> Tuple[List[JiraIssue], int]:
-    try:
-        url = f"{get_settings_value(db, 'jira_api_url')}search"
-        
-        auth_string = f"{get_settings_value(db, 'jira_api_email')}:{get_settings_value(db, 'jira_api_key')}"
-        encoded_auth = base64.b64encode(auth_string.encode()).decode()
-        
-        headers = {
-            "Authorization": f"Basic {encoded_auth}",
-            "Accept": "application/json"
-        }
+MAX_RESULTS = 100
+
+JQL = "assignee=currentUser() AND statusCategory!=Done"
+
+# Pages are fetched by offset, several at once, so the issues need an order that
+# holds between requests, or they could shift between pages and be missed
+JQL_ORDER = "ORDER BY key ASC"
+
+# The Jira account id of each user, with the settings version it was looked up
+# for, so webhooks can tell whose issue they carry when Jira hides the assignee's
+# email address. Keyed by user id alone, so a new version replaces the old entry
+known_account_ids: Dict[int, Tuple[int, str]] = {}
+
+def get_jira_issues(
+    db: Session,
+    owner_id: int,
+    status: str | None = None,
+    fields: List[str] | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> Tuple[List[JiraIssue], int, str | None]:
+    """
+    Returns the issues of a user stored by the last sync, one page at a time.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user whose issues are listed.
+        status (str | None): Only list the issues with this status.
+        fields (List[str] | None): The fields to load, or None for all of them.
+        limit (int | None): The page size, or None for every remaining issue.
+        cursor (str | None): The cursor of the next page, as returned by the previous one.
+
+    Returns:
+        Tuple[List[JiraIssue], int, str | None]: The issues of the page, the count of
+            matching issues and the cursor of the next page, if there is one.
+
+    Raises:
+        ValueError: If a field or the cursor is invalid.
+    """
+    return list_items(
+        db,
+        JiraIssue,
+        "issue",
+        owner_id,
+        {"status": status},
+        fields=fields,
+        limit=limit,
+        cursor=cursor,
+    )
+
+def stream_jira_issues(
+    db: Session,
+    owner_id: int,
+    status: str | None = None,
+    fields: List[str] | None = None,
+) -> Iterator[List[JiraIssue]]:
+    """
+    Reads every issue of a user stored by the last sync, in batches, for a streaming export.
+
+    Args:
+        db (Session): SQLAlchemy database session, kept open while the batches are read.
+        owner_id (int): The user whose issues are exported.
+        status (str | None): Only export the issues with this status.
+        fields (List[str] | None): The fields to load, or None for all of them.
+
+    Returns:
+        Iterator[List[JiraIssue]]: The issues, in batches, ordered by their key.
+
+    Raises:
+        ValueError: If a field is invalid.
+    """
+    return stream_items(db, JiraIssue, "issue", owner_id, {"status": status}, fields=fields)
+
+def is_jira_configured(settings: Settings) -> bool:
+    """
+    Tells whether a user configured Jira.
+
+    Args:
+        settings (Settings): The user settings.
+
+    Returns:
+        bool: True if the issues of the user can be synced.
+    """
+    return bool(settings.jira_api_url)
+
+async def sync_jira_issues(db: Session, client: httpx.AsyncClient, settings: Settings) -> SyncCounts:
+    """
+    Fetches the open Jira issues assigned to a user and updates the local database accordingly.
+
+    A full sync fetches every open issue and deletes the ones that were resolved,
+    unassigned or removed. In between, incremental syncs only request the issues
+    updated since the previous sync started. Each page is written as soon as it
+    arrives, through the database writer.
+
+    Args:
+        db (Session): SQLAlchemy database session, used for reads.
+        client (httpx.AsyncClient): Shared HTTP client for the Jira API.
+        settings (Settings): The settings of the user to sync.
+
+    Returns:
+        SyncCounts: How many issues were inserted, updated, deleted or left unchanged.
+    """
+    if not is_jira_configured(settings):
+        raise RuntimeError("Jira settings are not configured")
+
+    state = await asyncio.to_thread(get_sync_state, db, "jira", settings.id)
+    full_sync = needs_full_sync(state, app_settings.JIRA_FULL_SYNC_INTERVAL_SECONDS)
+    sync_started_at = datetime.utcnow()
+
+    jql = f'{JQL} {JQL_ORDER}'
+    if not full_sync:
+        # Relative dates sidestep the timezone of the Jira user, which absolute JQL dates are read in
+        minutes = math.ceil((sync_started_at - state.high_water_mark).total_seconds() / 60) + 1
+        jql = f'{JQL} AND updated >= "-{minutes}m" {JQL_ORDER}'
+
+    browse_url = settings.jira_api_url.rsplit('/', 4)[0]
+    counts = SyncCounts()
+    current_issue_keys: Set[str] = set()
+    async for jira_issues in fetch_jira_issue_pages(client, settings, jql):
+        issue_data_list = [parse_jira_issue(issue, browse_url) for issue in jira_issues]
+        current_issue_keys.update(issue_data['issue'] for issue_data in issue_data_list)
+        counts.add(await db_writer.write(store_jira_issues_page, settings.id, issue_data_list))
+
+    counts.deleted = await db_writer.write(
+        finish_jira_issues_sync, settings.id, current_issue_keys, sync_started_at, full_sync
+    )
+    return counts
+
+async def fetch_jira_issue_pages(
+    client: httpx.AsyncClient, settings: Settings, jql: str
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Streams the issues matching a JQL query, one page at a time.
+
+    The first page tells how many issues match; the remaining pages are then
+    requested concurrently and yielded in the order they arrive. At most as many
+    pages as the connection pool holds are requested or waiting to be consumed at
+    a time, and the next one is only requested once one was consumed, so memory
+    does not grow with the number of issues when writing pages is slower than
+    fetching them.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the Jira API.
+        settings (Settings): The user settings.
+        jql (str): The JQL query.
+
+    Yields:
+        List[Dict[str, Any]]: The issues of one page, as returned by the Jira search API.
+    """
+    url = f"{settings.jira_api_url}search"
+    headers = jira_headers(settings)
+
+    async def fetch_page(start_at: int) -> Dict[str, Any]:
         params = {
-            "jql": "assignee=currentUser() AND statusCategory!=Done",
-            "fields": "summary,status,created,updated"
+            "jql": jql,
+            "fields": "summary,status,created,updated",
+            "startAt": start_at,
+            "maxResults": MAX_RESULTS,
         }
+        try:
+            response = await client.get(url, headers=headers, params=params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logging.error(f"Error fetching Jira issues: {e}")
+            raise RuntimeError(f"Jira API error: {str(e)}") from e
 
-        response = requests.get(url, headers=headers, params=params)
+    first_page = await fetch_page(0)
+    SYNC_PAGES.inc(source="jira")
+    yield first_page.get("issues", [])
+
+    # Jira may cap maxResults below what was asked for, so page by what it returned
+    page_size = first_page.get("maxResults") or MAX_RESULTS
+    total = first_page.get("total", 0)
+    start_ats = iter(range(page_size, total, page_size))
+    pages = {
+        asyncio.ensure_future(fetch_page(start_at))
+        for start_at in itertools.islice(start_ats, app_settings.UPSTREAM_MAX_CONNECTIONS)
+    }
+    try:
+        while pages:
+            done, pages = await asyncio.wait(pages, return_when=asyncio.FIRST_COMPLETED)
+            for page in done:
+                issues = page.result().get("issues", [])
+                SYNC_PAGES.inc(source="jira")
+                yield issues
+                start_at = next(start_ats, None)
+                if start_at is not None:
+                    pages.add(asyncio.ensure_future(fetch_page(start_at)))
+    finally:
+        for page in pages:
+            page.cancel()
+
+def jira_headers(settings: Settings) -> Dict[str, str]:
+    """
+    Returns the headers authenticating requests to the Jira API as a user.
+
+    Args:
+        settings (Settings): The user settings.
+
+    Returns:
+        Dict[str, str]: The request headers.
+    """
+    auth_string = f"{settings.jira_api_email}:{settings.jira_api_key}"
+    encoded_auth = base64.b64encode(auth_string.encode()).decode()
+
+    return {
+        "Authorization": f"Basic {encoded_auth}",
+        "Accept": "application/json"
+    }
+
+def parse_jira_issue(issue: Dict[str, Any], browse_url: str) -> Dict[str, Any]:
+    """
+    Maps an issue returned by the Jira search API to an issue row.
+
+    Args:
+        issue (Dict[str, Any]): The issue returned by the Jira search API.
+        browse_url (str): The base URL of the Jira site.
+
+    Returns:
+        Dict[str, Any]: The issue row.
+    """
+    issue_key = issue["key"]
+    return {
+        "issue": issue_key,
+        "title": issue["fields"]["summary"],
+        "url": f"{browse_url}/browse/{issue_key}",
+        "description": issue["self"],
+        "status": issue["fields"]["status"]["name"],
+        "created_at": parse_timestamp(issue["fields"]["created"]),
+        "updated_at": parse_timestamp(issue["fields"]["updated"])
+    }
+
+async def get_jira_account_id(client: httpx.AsyncClient, settings: Settings) -> str:
+    """
+    Looks up the account id of a user's Jira credentials, once per settings version.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client for the Jira API.
+        settings (Settings): The user settings.
+
+    Returns:
+        str: The Jira account id.
+    """
+    version, account_id = known_account_ids.get(settings.id, (None, None))
+    if version == settings.version:
+        return account_id
+
+    try:
+        response = await client.get(f"{settings.jira_api_url}myself", headers=jira_headers(settings))
         response.raise_for_status()
-        data = response.json()
+        account_id = response.json()["accountId"]
+    except httpx.HTTPError as e:
+        logging.error(f"Error fetching Jira user: {e}")
+        raise RuntimeError(f"Jira API error: {str(e)}") from e
+    known_account_ids[settings.id] = (settings.version, account_id)
+    return account_id
+
+async def apply_jira_issue_event(db: Session, client: httpx.AsyncClient, payload: Dict[str, Any]) -> Dict[int, SyncCounts]:
+    """
+    Applies a `jira:issue_created`, `jira:issue_updated` or `jira:issue_deleted`
+    webhook to the stored issues of the users of its Jira site.
 
-        api_issues = set()
+    An issue that is not done is stored for its assignee, matched by email
+    address or account id, and removed from the other users of the site, as
+    when it was reassigned; a done or deleted issue is removed from all of them.
 
-        for issue in data.get("issues", []):
-            issue_key = issue["key"]
-            api_issues.add(issue_key)
+    Args:
+        db (Session): SQLAlchemy database session, used for reads.
+        client (httpx.AsyncClient): Shared HTTP client for the Jira API, to look up account ids.
+        payload (Dict[str, Any]): The webhook payload.
 
-            existing_issue = db.query(JiraIssue).filter(JiraIssue.issue == issue_key).first()
+    Returns:
+        Dict[int, SyncCounts]: How many issues were inserted, updated or deleted, per user.
+    """
+    issue = payload['issue']
+    # The issue's `self` is its REST URL, such as https://x.atlassian.net/rest/api/2/issue/10002
+    browse_url = issue['self'].split('/rest/')[0]
+    users = [
+        settings for settings in await asyncio.to_thread(get_all_settings, db)
+        if is_jira_configured(settings) and settings.jira_api_url.rsplit('/', 4)[0] == browse_url
+    ]
 
-            issue_data = {
-                "issue": issue_key,
-                "title": issue["fields"]["summary"],
-                "url": f"{get_settings_value(db, 'jira_api_url').rsplit('/', 4)[0]}/browse/{issue_key}",
-                "description": issue["self"],
-                "status": issue["fields"]["status"]["name"],
-                "created_at": datetime.strptime(issue["fields"]["created"], "%Y-%m-%dT%H:%M:%S.%f%z"),
-                "updated_at": datetime.strptime(issue["fields"]["updated"], "%Y-%m-%dT%H:%M:%S.%f%z")
-            }
+    rows_by_user: Dict[int, List[Dict[str, Any]]] = {}
+    fields = issue.get('fields') or {}
+    status_category = ((fields.get('status') or {}).get('statusCategory') or {}).get('key')
+    assignee = fields.get('assignee') or {}
+    if payload.get('webhookEvent') != 'jira:issue_deleted' and status_category != 'done' and assignee:
+        email = (assignee.get('emailAddress') or '').lower()
+        for settings in users:
+            if (
+                (email and (settings.jira_api_email or '').lower() == email)
+                or await get_jira_account_id(client, settings) == assignee.get('accountId')
+            ):
+                rows_by_user[settings.id] = [parse_jira_issue(issue, browse_url)]
 
-            if not existing_issue:
-                db.add(JiraIssue(**issue_data))
-            else:
-                for key, value in issue_data.items():
-                    setattr(existing_issue, key, value)
+    # Deletion payloads may leave out the fields; the time of the event stands in for the change
+    updated = fields.get('updated')
+    if updated is not None:
+        updated_at = parse_timestamp(updated)
+    else:
+        updated_at = datetime.utcfromtimestamp(payload['timestamp'] / 1000) if payload.get('timestamp') else None
+    return await db_writer.write(
+        store_jira_issue_event, issue['key'], [settings.id for settings in users], rows_by_user, updated_at
+    )
 
-        db_issues = db.query(JiraIssue).all()
-        for db_issue in db_issues:
-            if db_issue.issue not in api_issues:
-                db.delete(db_issue)
+def store_jira_issue_event(
+    db: Session,
+    issue_key: str,
+    owner_ids: List[int],
+    rows_by_user: Dict[int, List[Dict[str, Any]]],
+    updated_at: datetime | None,
+) -> Dict[int, SyncCounts]:
+    """
+    Stores the issue of a webhook for its assignee, deletes it for the other users
+    and commits. Users whose issue is newer than the webhook's, such as after a
+    delivery that arrived earlier, are left alone.
 
+    Args:
+        db (Session): SQLAlchemy database session.
+        issue_key (str): The issue key.
+        owner_ids (List[int]): The users the webhook concerns.
+        rows_by_user (Dict[int, List[Dict[str, Any]]]): The issue row, per user it belongs to.
+        updated_at (datetime | None): When Jira last changed the issue, as of the webhook, if known.
+
+    Returns:
+        Dict[int, SyncCounts]: How many issues were inserted, updated or deleted, per user.
+    """
+    try:
+        counts = upsert_or_delete(db, JiraIssue, "issue", issue_key, owner_ids, rows_by_user, updated_at)
         db.commit()
+        return counts
+    except SQLAlchemyError as e:
+        logging.error(f"Database operation failed: {e}")
+        db.rollback()
+        raise RuntimeError("Database operation failed") from e
+
+def store_jira_issues_page(db: Session, owner_id: int, issue_data_list: List[Dict[str, Any]]) -> SyncCounts:
+    """
+    Inserts or updates one page of issues fetched from Jira.
+
+    Nothing is committed; the database writer commits the page.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user the issues belong to.
+        issue_data_list (List[Dict[str, Any]]): The issue rows of the page.
 
-        issues = db.query(JiraIssue).all()
-        count = len(issues)
+    Returns:
+        SyncCounts: How many issues were inserted, updated or left unchanged.
+    """
+    try:
+        return bulk_upsert(db, JiraIssue, "issue", issue_data_list, owner_id)
+    except SQLAlchemyError as e:
+        logging.error(f"Database operation failed: {e}")
+        db.rollback()
+        raise RuntimeError("Database operation failed") from e
+
+def finish_jira_issues_sync(
+    db: Session, owner_id: int, current_issue_keys: Set[str], sync_started_at: datetime, full_sync: bool
+) -> int:
+    """
+    Deletes the issues that are gone after a full sync, moves the high-water mark
+    forward and commits the sync.
 
-        return issues, count
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user whose issues were synced.
+        current_issue_keys (Set[str]): The issue keys seen in this sync.
+        sync_started_at (datetime): When this sync started; the next incremental sync starts from there.
+        full_sync (bool): Whether this sync fetched every open issue.
 
-    except RequestException as e:
-        raise HTTPException(status_code=503, detail=f"Jira API error: {str(e)}")
+    Returns:
+        int: The number of deleted issues.
+    """
+    try:
+        deleted = 0
+        if full_sync:
+            deleted = delete_missing(db, JiraIssue, "issue", current_issue_keys, owner_id)
+
+        update_sync_cursor(db, "jira", owner_id, sync_started_at, full_sync)
+        db.commit()
+        return deleted
     except SQLAlchemyError as e:
+        logging.error(f"Database operation failed: {e}")
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
\ No newline at end of file
+        raise RuntimeError("Database operation failed") from e
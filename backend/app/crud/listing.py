@@ -0,0 +1,192 @@
+import base64
+import json
+from typing import Any, Dict, Iterator, List, Tuple, Type
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session, load_only
+from sqlmodel import SQLModel
+from app.core.config import settings as app_settings
+
+# Columns that are internal to the sync and never listed
+HIDDEN_COLUMNS = ("fingerprint", "owner_id")
+
+def encode_cursor(value: Any) -> str:
+    """
+    Encodes the key of the last listed item as an opaque cursor.
+
+    Args:
+        value (Any): The key value.
+
+    Returns:
+        str: The cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Any:
+    """
+    Decodes a cursor returned by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        Any: The key value.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def resolve_fields(model: Type[SQLModel], key: str, fields: List[str] | None) -> List[str] | None:
+    """
+    Validates a field projection; the primary key and the item key are always included.
+
+    Args:
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        fields (List[str] | None): The requested fields, or None for all of them.
+
+    Returns:
+        List[str] | None: The columns to load, or None for all of them.
+
+    Raises:
+        ValueError: If a field is not a listed column of the model.
+    """
+    if fields is None:
+        return None
+
+    columns = [column.key for column in model.__table__.columns if column.key not in HIDDEN_COLUMNS]
+    unknown = [field for field in fields if field not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [column for column in columns if column in fields or column in ("id", key)]
+
+def item_conditions(model: Type[SQLModel], owner_id: int, filters: Dict[str, Any]) -> List[Any]:
+    """
+    Returns the conditions matching the items of a user with the given column values.
+
+    Args:
+        model (Type[SQLModel]): The table model.
+        owner_id (int): The user whose items are matched.
+        filters (Dict[str, Any]): Column values to match; None values are ignored.
+
+    Returns:
+        List[Any]: The SQL conditions.
+    """
+    table = model.__table__
+    conditions = [table.c.owner_id == owner_id]
+    conditions += [table.c[column] == value for column, value in filters.items() if value is not None]
+    return conditions
+
+def select_items(
+    model: Type[SQLModel], key: str, owner_id: int, filters: Dict[str, Any], fields: List[str] | None = None
+) -> Select:
+    """
+    Builds the query selecting the items of a user, filtered, projected and ordered by their unique key.
+
+    Args:
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        owner_id (int): The user whose items are selected.
+        filters (Dict[str, Any]): Column values to match; None values are ignored.
+        fields (List[str] | None): The columns to load, or None for all of them.
+
+    Returns:
+        Select: The query.
+
+    Raises:
+        ValueError: If a field is invalid.
+    """
+    stmt = select(model).where(*item_conditions(model, owner_id, filters)).order_by(model.__table__.c[key])
+    columns = resolve_fields(model, key, fields)
+    if columns is not None:
+        stmt = stmt.options(load_only(*(getattr(model, column) for column in columns)))
+    return stmt
+
+def list_items(
+    db: Session,
+    model: Type[SQLModel],
+    key: str,
+    owner_id: int,
+    filters: Dict[str, Any],
+    fields: List[str] | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> Tuple[List[SQLModel], int, str | None]:
+    """
+    Lists the stored items of a user one page at a time, filtered and projected in SQL.
+
+    Items are ordered by their unique key, and a page continues after the key the
+    cursor holds, so pages stay stable while rows are added or removed. The count
+    covers every item matching the filters, not only the page.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item.
+        owner_id (int): The user whose items are listed.
+        filters (Dict[str, Any]): Column values to match; None values are ignored.
+        fields (List[str] | None): The columns to load, or None for all of them.
+        limit (int | None): The page size, or None for every remaining item.
+        cursor (str | None): The `next_cursor` of the previous page.
+
+    Returns:
+        Tuple[List[SQLModel], int, str | None]: The items of the page, the count of
+            matching items and the cursor of the next page, if there is one.
+
+    Raises:
+        ValueError: If a field or the cursor is invalid.
+    """
+    table = model.__table__
+    key_column = table.c[key]
+    conditions = item_conditions(model, owner_id, filters)
+    count = db.execute(select(func.count()).select_from(table).where(*conditions)).scalar_one()
+
+    stmt = select_items(model, key, owner_id, filters, fields)
+    if cursor is not None:
+        stmt = stmt.where(key_column > decode_cursor(cursor))
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    items = db.execute(stmt).scalars().all()
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(getattr(items[-1], key))
+    return items, count, next_cursor
+
+def stream_items(
+    db: Session,
+    model: Type[SQLModel],
+    key: str,
+    owner_id: int,
+    filters: Dict[str, Any],
+    fields: List[str] | None = None,
+) -> Iterator[List[SQLModel]]:
+    """
+    Reads every stored item of a user matching the filters, in batches, through a
+    server-side cursor.
+
+    Unlike `list_items`, nothing is counted and the items are never held all at
+    once: each batch is fetched from the cursor as the previous one is consumed,
+    so memory stays flat however many items match. The query runs, and the fields
+    are validated, when this is called; the batches are read as they are iterated.
+
+    Args:
+        db (Session): SQLAlchemy database session, kept open while the batches are read.
+        model (Type[SQLModel]): The table model.
+        key (str): The unique column identifying an upstream item; items are ordered by it.
+        owner_id (int): The user whose items are read.
+        filters (Dict[str, Any]): Column values to match; None values are ignored.
+        fields (List[str] | None): The columns to load, or None for all of them.
+
+    Returns:
+        Iterator[List[SQLModel]]: The batches of items, of `EXPORT_BATCH_SIZE` items each.
+
+    Raises:
+        ValueError: If a field is invalid.
+    """
+    stmt = select_items(model, key, owner_id, filters, fields)
+    return db.execute(stmt.execution_options(yield_per=app_settings.EXPORT_BATCH_SIZE)).scalars().partitions()
@@ -0,0 +1,126 @@
+import re
+from typing import Dict, List, Tuple, Type
+from sqlalchemy import Column, Select, func, literal_column, select
+from sqlalchemy import column as sa_column, table as sa_table
+from sqlalchemy.orm import Session
+from sqlmodel import SQLModel
+from app.models import GithubPullRequest, GitlabMergeRequest, JiraIssue, SearchResult
+
+# The searched table of each source, its item key and its searched columns, in the
+# order of the search index, with their weight: A ranks above B, B above C
+SEARCH_SOURCES: Dict[str, Tuple[Type[SQLModel], str, Tuple[Tuple[str, str], ...]]] = {
+    "jira": (JiraIssue, "issue", (("title", "A"), ("issue", "A"), ("description", "C"))),
+    "github": (
+        GithubPullRequest,
+        "reference",
+        (("title", "A"), ("pull_request", "A"), ("repository", "B"), ("description", "C")),
+    ),
+    "gitlab": (
+        GitlabMergeRequest,
+        "reference",
+        (("title", "A"), ("merge_request", "A"), ("repository", "B"), ("description", "C")),
+    ),
+}
+
+# Column weights of the SQLite bm25 ranking; Postgres applies the weights stored in the vector
+BM25_WEIGHTS = {"A": 10.0, "B": 5.0, "C": 1.0}
+
+def search_terms(query: str) -> List[str]:
+    """
+    Splits a search query into the words it searches for, the way the index splits text.
+
+    Args:
+        query (str): The search query.
+
+    Returns:
+        List[str]: The lowercased words.
+    """
+    return re.findall(r"[^\W_]+", query.lower())
+
+def result_columns(model: Type[SQLModel], key: str) -> List[Column]:
+    table = model.__table__
+    return [table.c[column] for column in ("id", key, "title", "status", "url", "repository", "updated_at") if column in table.c]
+
+def select_sqlite_matches(
+    model: Type[SQLModel], key: str, columns: Tuple[Tuple[str, str], ...], terms: List[str]
+) -> Select:
+    table = model.__table__
+    # The FTS5 index of the table, whose rowids are the `search_rowid` of the rows they index
+    index = sa_table(f"{table.name}_fts", sa_column("rowid"))
+    index_name = literal_column(index.name)
+    match = " ".join(f'"{term}"' for term in terms) + "*"
+    # bm25 is lower for better matches
+    rank = -func.bm25(index_name, *(BM25_WEIGHTS[weight] for _, weight in columns))
+    return (
+        select(*result_columns(model, key), rank.label("rank"))
+        .select_from(table.join(index, literal_column(f"{table.name}.search_rowid") == index.c.rowid))
+        .where(index_name.op("MATCH")(match))
+    )
+
+def select_postgresql_matches(model: Type[SQLModel], key: str, terms: List[str]) -> Select:
+    table = model.__table__
+    vector = literal_column(f"{table.name}.search_vector")
+    query = func.to_tsquery("simple", " & ".join(terms) + ":*")
+    rank = func.ts_rank(vector, query)
+    return select(*result_columns(model, key), rank.label("rank")).where(vector.op("@@")(query))
+
+def search_items(db: Session, owner_id: int, query: str, source: str | None = None, limit: int = 20) -> List[SearchResult]:
+    """
+    Searches the stored issues, pull requests and merge requests of a user by title,
+    description, repository and key, best matches first.
+
+    Every word of the query must appear; the last one may be the start of a word,
+    so results show up while it is still being typed. Matches in the title or key
+    rank above matches in the repository, which rank above matches in the
+    description. Runs on the full-text index: FTS5 on SQLite, a `tsvector` column
+    on Postgres, both kept up to date by the database as rows are written. Ranks
+    are computed per source, so results of different sources are only roughly
+    comparable.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): The user whose items are searched.
+        query (str): The words to search for.
+        source (str | None): Only search this source (jira, github or gitlab); every source when None.
+        limit (int): The maximum number of results.
+
+    Returns:
+        List[SearchResult]: The matching items, best first.
+
+    Raises:
+        ValueError: If the query has no words or the source is unknown.
+    """
+    terms = search_terms(query)
+    if not terms:
+        raise ValueError("The search query has no words")
+    if source is not None and source not in SEARCH_SOURCES:
+        raise ValueError(f"Unknown source: {source}")
+
+    dialect = db.get_bind().dialect.name
+    results = []
+    for name, (model, key, columns) in SEARCH_SOURCES.items():
+        if source is not None and name != source:
+            continue
+        if dialect == "postgresql":
+            stmt = select_postgresql_matches(model, key, terms)
+        else:
+            stmt = select_sqlite_matches(model, key, columns, terms)
+        table = model.__table__
+        stmt = stmt.where(table.c.owner_id == owner_id).order_by(literal_column("rank").desc()).limit(limit)
+        for row in db.execute(stmt).mappings():
+            results.append(
+                SearchResult(
+                    source=name,
+                    id=row["id"],
+                    key=str(row[key]),
+                    title=row["title"],
+                    status=row["status"],
+                    url=row["url"],
+                    repository=row.get("repository"),
+                    updated_at=row["updated_at"],
+                    rank=row["rank"],
+                )
+            )
+
+    results.sort(key=lambda result: result.rank, reverse=True)
+    return results[:limit]
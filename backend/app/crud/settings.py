@@ -1,65 +1,189 @@
+import hmac
+import threading
+import time
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from app.core.auth import AuthenticationError, hash_api_token, new_api_token, verify_api_token
+from app.core.config import settings as app_settings
+from app.core.metrics import CACHE_LOOKUPS
 from app.models import Settings
-from typing import Any
+from typing import Any, Dict, List
 
-def get_settings(db: Session) -> Settings:
+
+class SettingsCache:
+    """
+    In-memory snapshot of the settings rows, one per user.
+
+    A row's snapshot is reused until its `version` changes. Writes through
+    `create_or_update_settings` and `create_settings` invalidate the cache right
+    away; changes made by other workers are picked up by re-reading the id and
+    version columns, at most once every `check_interval` seconds, and reloading
+    only the rows whose version moved.
+    """
+
+    def __init__(self, check_interval: float) -> None:
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshots: Dict[int, Settings] = {}
+        self._checked_at: float | None = None
+
+    def all(self, db: Session) -> List[Settings]:
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < self._check_interval:
+                CACHE_LOOKUPS.inc(cache="settings", result="hit")
+                return list(self._snapshots.values())
+
+            CACHE_LOOKUPS.inc(cache="settings", result="miss")
+
+            versions = dict(db.execute(select(Settings.id, Settings.version).order_by(Settings.id)).all())
+            stale = [
+                user_id for user_id, version in versions.items()
+                if user_id not in self._snapshots or self._snapshots[user_id].version != version
+            ]
+            reloaded = {}
+            if stale:
+                for row in db.execute(select(Settings).where(Settings.id.in_(stale))).scalars():
+                    reloaded[row.id] = Settings(**row.model_dump())
+            self._snapshots = {
+                user_id: reloaded.get(user_id) or self._snapshots[user_id]
+                for user_id in versions
+                if user_id in reloaded or user_id in self._snapshots
+            }
+            self._checked_at = now
+            return list(self._snapshots.values())
+
+    def get(self, db: Session, user_id: int | None = None) -> Settings | None:
+        snapshots = self.all(db)
+        if user_id is None:
+            return snapshots[0] if snapshots else None
+        return next((snapshot for snapshot in snapshots if snapshot.id == user_id), None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._checked_at = None
+
+
+settings_cache = SettingsCache(app_settings.SETTINGS_VERSION_CHECK_SECONDS)
+
+
+def get_all_settings(db: Session) -> List[Settings]:
     """
-    Retrieve the last (most recent) configuration from the database.
+    Retrieve the configuration of every user, served from the in-memory snapshot.
 
     Args:
-        db (Session): The database session.
+        db (Session): The database session, used only when the snapshot has to be refreshed.
+
+    Returns:
+        List[models.Settings]: Detached copies of the configuration objects, ordered by id.
+    """
+    return settings_cache.all(db)
+
+
+def get_settings(db: Session, user_id: int | None = None) -> Settings:
+    """
+    Retrieve the configuration of a user, served from the in-memory snapshot.
+
+    Args:
+        db (Session): The database session, used only when the snapshot has to be refreshed.
+        user_id (int | None): The id of the user's settings row, or None for the first user.
 
     Returns:
-        models.Config: The last configuration object.
-        None: If no configuration exists in the database.
+        models.Settings: A detached copy of the configuration object.
+        None: If no configuration exists in the database for the user.
     """
-    return db.query(Settings).first()
+    return settings_cache.get(db, user_id)
 
 
-def get_settings_value(db:Session, field: str) -> Any:
+def authenticate_user(db: Session, api_token: str | None, user_id: int | None = None) -> int:
     """
-    Retrieve a specific configuration field from the database.
+    Resolve the user a request acts for from its API token.
+
+    A user's token acts for that user; the admin token (`ADMIN_TOKEN`) acts for
+    any user, the first one unless `user_id` names another. A request without a
+    token acts for the only user as long as no token was issued to them, so a
+    single-user setup keeps working without tokens; once a second user was added
+    or a token issued, every request needs one.
 
     Args:
         db (Session): The database session.
-        field (str): The name of the configuration field to retrieve.
+        api_token (str | None): The API token sent with the request, if any.
+        user_id (int | None): The user id sent with the request, if any; it must be the token's user.
 
     Returns:
-        Any: The value of the requested configuration field.
+        int: The user id, or 0 if no user is configured yet.
 
     Raises:
-        AttributeError: If the specified field does not exist in the Config model.
+        AuthenticationError: If the token is unknown, or missing while there are several users.
+        PermissionError: If `user_id` is not the user the token acts for.
     """
-    settings = db.query(Settings).first()
-    if settings is None:
-        return None
-    
-    if hasattr(settings, field):
-        return getattr(settings, field)
+    users = get_all_settings(db)
+    if api_token is not None and app_settings.ADMIN_TOKEN and hmac.compare_digest(api_token, app_settings.ADMIN_TOKEN):
+        if user_id is None:
+            return users[0].id if users else 0
+        if not any(user.id == user_id for user in users):
+            raise PermissionError(f"User {user_id} not found")
+        return user_id
+
+    if api_token is not None:
+        user = next((user for user in users if verify_api_token(user.api_token_hash, api_token)), None)
+        if user is None:
+            raise AuthenticationError("Invalid API token")
+    elif len(users) > 1 or any(user.api_token_hash is not None for user in users):
+        raise AuthenticationError("An API token is required")
     else:
-        raise AttributeError(f"Settings model has no attribute '{field}'")
+        user = users[0] if users else None
 
-def create_or_update_settings(db: Session, **kwargs) -> Settings:
+    if user_id is not None and (user is None or user.id != user_id):
+        raise PermissionError(f"Not allowed to act for user {user_id}")
+    return user.id if user is not None else 0
+
+def issue_api_token(db: Session, user_id: int) -> str:
     """
-    Create or update the single settings entry in the database.
+    Issue a new API token to a user, replacing the previous one, and commit it.
+
+    Only the hash of the token is stored, so it cannot be shown again.
 
     Args:
         db (Session): The database session.
-        **kwargs: Keyword arguments representing the fields and values for the settings.
+        user_id (int): The id of the user's settings row.
 
     Returns:
-        models.Settings: The created or updated settings object.
+        str: The token.
 
     Raises:
-        ValueError: If no valid fields are provided in kwargs.
+        LookupError: If the user does not exist.
     """
-    settings = db.query(Settings).first()
-
+    settings = db.get(Settings, user_id)
     if settings is None:
-        settings = Settings()
-        db.add(settings)
+        raise LookupError(f"Settings of user {user_id} not found")
+
+    api_token = new_api_token()
+    settings.api_token_hash = hash_api_token(api_token)
+    settings.version = (settings.version or 0) + 1
+    db.commit()
+    settings_cache.invalidate()
+    return api_token
+
+
+def apply_settings(db: Session, settings: Settings, kwargs: Dict[str, Any]) -> Settings:
+    """
+    Copy the given fields onto a settings row, bump its version and commit it.
+
+    Args:
+        db (Session): The database session.
+        settings (Settings): The settings row.
+        kwargs (Dict[str, Any]): The fields and values to set; unknown fields are ignored.
+
+    Returns:
+        models.Settings: The committed settings row.
 
-    valid_fields = [column.key for column in Settings.__table__.columns if column.key != 'id']
+    Raises:
+        ValueError: If no valid fields are provided in kwargs.
+    """
+    valid_fields = [
+        column.key for column in Settings.__table__.columns if column.key not in ('id', 'version', 'api_token_hash')
+    ]
     updated = False
 
     for field, value in kwargs.items():
@@ -70,7 +194,59 @@ def create_or_update_settings(db: Session, **kwargs) -> Settings:
     if not updated:
         raise ValueError("No valid fields provided for updating settings.")
 
+    settings.version = (settings.version or 0) + 1
     db.commit()
     db.refresh(settings)
+    settings_cache.invalidate()
 
     return settings
+
+def create_or_update_settings(db: Session, user_id: int | None = None, **kwargs) -> Settings:
+    """
+    Create or update the settings entry of a user in the database.
+
+    Every write bumps the settings version, so the cached snapshots of all
+    workers are refreshed.
+
+    Args:
+        db (Session): The database session.
+        user_id (int | None): The id of the user's settings row, or None for the first user,
+            which is created if there is none.
+        **kwargs: Keyword arguments representing the fields and values for the settings.
+
+    Returns:
+        models.Settings: The created or updated settings object.
+
+    Raises:
+        ValueError: If no valid fields are provided in kwargs.
+        LookupError: If `user_id` names a user that does not exist.
+    """
+    if user_id is None:
+        settings = db.query(Settings).order_by(Settings.id).first()
+        if settings is None:
+            settings = Settings()
+            db.add(settings)
+    else:
+        settings = db.get(Settings, user_id)
+        if settings is None:
+            raise LookupError(f"Settings of user {user_id} not found")
+
+    return apply_settings(db, settings, kwargs)
+
+def create_settings(db: Session, **kwargs) -> Settings:
+    """
+    Create the settings entry of a new user.
+
+    Args:
+        db (Session): The database session.
+        **kwargs: Keyword arguments representing the fields and values for the settings.
+
+    Returns:
+        models.Settings: The created settings object; its id identifies the user.
+
+    Raises:
+        ValueError: If no valid fields are provided in kwargs.
+    """
+    settings = Settings()
+    db.add(settings)
+    return apply_settings(db, settings, kwargs)
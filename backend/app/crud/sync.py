@@ -0,0 +1,321 @@
+from typing import Callable, Dict, Hashable, List
+from datetime import datetime
+import asyncio
+import time
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlmodel import Session as SQLModelSession
+from app.core.circuit import circuit_breakers
+from app.core.config import settings
+from app.core.db import db_writer, read_engine
+from app.core.events import change_broker
+from app.core.http import UpstreamClients
+from app.core.metrics import SYNC_RUNS, SYNC_SECONDS
+from app.core.rate_limit import RateLimitExceeded, rate_limits
+from app.core.singleflight import SingleFlight
+from app.crud.github import is_github_configured, sync_github_org_pull_requests, sync_github_pull_requests
+from app.crud.gitlab import is_gitlab_configured, sync_gitlab_merge_requests
+from app.crud.jira import is_jira_configured, sync_jira_issues
+from app.crud.settings import get_all_settings
+from app.crud.sync_state import record_sync
+from app.models import Settings, SourceHealth, SourceStatus, SyncState
+import logging
+
+# Syncs the items of one user: (db, client, settings) -> SyncCounts
+SYNC_FUNCTIONS = {
+    "jira": sync_jira_issues,
+    "github": sync_github_pull_requests,
+    "gitlab": sync_gitlab_merge_requests,
+}
+
+# Syncs the items of several users from one shared upstream scan: (db, client, users) -> {user id: SyncCounts}
+GROUP_SYNC_FUNCTIONS = {
+    "github": sync_github_org_pull_requests,
+}
+
+# What users must share for a source to sync them together
+GROUP_KEYS: Dict[str, Callable[[Settings], Hashable]] = {
+    "github": lambda user: user.github_org,
+}
+
+CONFIGURED = {
+    "jira": is_jira_configured,
+    "github": is_github_configured,
+    "gitlab": is_gitlab_configured,
+}
+
+SYNC_TIMEOUTS = {
+    "jira": settings.JIRA_SYNC_TIMEOUT_SECONDS,
+    "github": settings.GITHUB_SYNC_TIMEOUT_SECONDS,
+    "gitlab": settings.GITLAB_SYNC_TIMEOUT_SECONDS,
+}
+
+# Concurrent refreshes of the same source for the same user share one sync, and
+# a successful one is reused for a while; keyed by source, user and settings version
+refresh_flights = SingleFlight(
+    settings.SYNC_MIN_REFRESH_SECONDS, reusable=lambda status: status.status == "ok", name="refresh"
+)
+
+# The recovery probe of each source whose circuit is open
+_probes: dict[str, asyncio.Task] = {}
+
+async def run_sync(source: str, client: httpx.AsyncClient, users: List[Settings]) -> Dict[int, SourceStatus]:
+    """
+    Sync a source for a group of users, record the outcome of every user and
+    announce it on their dashboard event streams.
+
+    A single user is synced on their own; several users are synced from one
+    shared upstream scan, where the source supports it. The sync reads through
+    its own session from the read pool and sends its writes to the database writer.
+
+    Args:
+        source (str): The source name.
+        client (httpx.AsyncClient): The shared HTTP client for the source.
+        users (List[Settings]): The settings of the users to sync.
+
+    Returns:
+        Dict[int, SourceStatus]: The outcome of the sync, per user id.
+    """
+    started_at = time.perf_counter()
+    with SQLModelSession(read_engine) as db:
+        try:
+            if len(users) > 1:
+                counts_by_user = await GROUP_SYNC_FUNCTIONS[source](db, client, users)
+            else:
+                counts_by_user = {users[0].id: await SYNC_FUNCTIONS[source](db, client, users[0])}
+        except Exception as e:
+            logging.error(f"{source} sync failed: {e}")
+            # A sync cut short by the rate limit keeps the pages it stored, but the rest
+            # of the data is as old as the last complete sync
+            status = "stale" if isinstance(e, RateLimitExceeded) else "error"
+            SYNC_SECONDS.observe(time.perf_counter() - started_at, source=source)
+            SYNC_RUNS.inc(len(users), source=source, status=status)
+            if not circuit_breakers[source].is_closed:
+                start_probe(source, client)
+            statuses = {}
+            for user in users:
+                await db_writer.write(record_sync, source, user.id, str(e))
+                statuses[user.id] = SourceStatus(status=status, message=str(e))
+                change_broker.publish("sync", {"source": source, **statuses[user.id].model_dump()}, user.id)
+            return statuses
+
+        SYNC_SECONDS.observe(time.perf_counter() - started_at, source=source)
+        SYNC_RUNS.inc(len(counts_by_user), source=source, status="ok")
+        statuses = {}
+        for owner_id, counts in counts_by_user.items():
+            logging.info(
+                f"{source} sync of user {owner_id}: {counts.inserted} inserted, {counts.updated} updated, "
+                f"{counts.deleted} deleted, {counts.unchanged} unchanged"
+            )
+            await db_writer.write(record_sync, source, owner_id, None, counts)
+            statuses[owner_id] = SourceStatus(status="ok", counts=counts)
+            change_broker.publish("sync", {"source": source, **statuses[owner_id].model_dump()}, owner_id)
+        return statuses
+
+
+def group_users(source: str, users: List[Settings]) -> List[List[Settings]]:
+    """
+    Split the users that configured a source into the groups it syncs together.
+
+    Args:
+        source (str): The source name.
+        users (List[Settings]): The settings of every user.
+
+    Returns:
+        List[List[Settings]]: The groups; users of sources without shared scans are on their own.
+    """
+    users = [user for user in users if CONFIGURED[source](user)]
+    if source not in GROUP_KEYS:
+        return [[user] for user in users]
+
+    groups: Dict[Hashable, List[Settings]] = {}
+    for user in users:
+        groups.setdefault(GROUP_KEYS[source](user), []).append(user)
+    return list(groups.values())
+
+
+async def sync_all_users(source: str, client: httpx.AsyncClient) -> Dict[int, SourceStatus]:
+    """
+    Sync a source for every user that configured it; this is the scheduled sync job.
+
+    Users that share an upstream scan are synced together, and at most
+    `SYNC_MAX_CONCURRENT_GROUPS` groups run at once, so many users neither run
+    one after the other nor flood the upstream API. What the run costs each
+    access token is recorded, so the scheduler can pace the next runs. Nothing
+    is synced while the circuit of the source is open; its probe takes over.
+
+    Args:
+        source (str): The source name.
+        client (httpx.AsyncClient): The shared HTTP client for the source.
+
+    Returns:
+        Dict[int, SourceStatus]: The outcome of the sync, per user id.
+    """
+    if not circuit_breakers[source].is_available:
+        start_probe(source, client)
+        return {}
+
+    with SQLModelSession(read_engine) as db:
+        users = await asyncio.to_thread(get_all_settings, db)
+
+    concurrency = asyncio.Semaphore(settings.SYNC_MAX_CONCURRENT_GROUPS)
+
+    async def sync_group(group: List[Settings]) -> Dict[int, SourceStatus]:
+        async with concurrency:
+            return await run_sync(source, client, group)
+
+    rate_limits.start_run(source)
+    try:
+        results = await asyncio.gather(*(sync_group(group) for group in group_users(source, users)))
+    finally:
+        rate_limits.finish_run(source)
+
+    users_by_id = {user.id: user for user in users}
+    statuses = {}
+    for group_statuses in results:
+        statuses.update(group_statuses)
+    for user_id, status in statuses.items():
+        refresh_flights.remember((source, user_id, users_by_id[user_id].version), status)
+    return statuses
+
+
+async def probe_source(source: str, client: httpx.AsyncClient) -> None:
+    """
+    Wait for the open circuit of a source to allow a trial, then sync every user
+    as the trial, until the circuit closes.
+
+    The probe gives up when a sync sent no request at all, for example when no
+    user configured the source, since nothing would then ever close the circuit.
+
+    Args:
+        source (str): The source name.
+        client (httpx.AsyncClient): The shared HTTP client for the source.
+    """
+    breaker = circuit_breakers[source]
+    while not breaker.is_closed:
+        # A circuit whose trial is in flight has nothing to wait for, so poll it
+        await asyncio.sleep(max(breaker.seconds_until_retry(), 1.0))
+        await sync_all_users(source, client)
+        if breaker.is_available and not breaker.is_closed:
+            return
+    logging.info(f"{source} is available again")
+
+
+def start_probe(source: str, client: httpx.AsyncClient) -> None:
+    """
+    Start the recovery probe of a source, unless it is already running.
+
+    Args:
+        source (str): The source name.
+        client (httpx.AsyncClient): The shared HTTP client for the source.
+    """
+    task = _probes.get(source)
+    if task is None or task.done():
+        _probes[source] = asyncio.create_task(probe_source(source, client), name=f"probe-{source}")
+
+
+async def stop_probes() -> None:
+    """
+    Cancel the recovery probes still running and wait for them to end, so none
+    outlives the HTTP clients they sync with.
+    """
+    probes = [task for task in _probes.values() if not task.done()]
+    for task in probes:
+        task.cancel()
+    await asyncio.gather(*probes, return_exceptions=True)
+    _probes.clear()
+
+
+async def refresh_source(source: str, clients: UpstreamClients, user: Settings | None) -> SourceStatus:
+    """
+    Sync a single source for a user, giving up waiting once its timeout is reached.
+
+    Concurrent refreshes of the source for the same user wait for the same sync,
+    and a refresh within `SYNC_MIN_REFRESH_SECONDS` of a successful sync reuses
+    its outcome instead of syncing again. A refresh that times out is not
+    cancelled: it keeps running in the background and stores its result for
+    later reads, while the caller moves on. While the
+    circuit of the source is open, nothing is refreshed and the stored data is
+    reported stale right away.
+
+    Args:
+        source (str): The source name.
+        clients (UpstreamClients): The shared upstream HTTP clients.
+        user (Settings | None): The settings of the user, or None if no user is configured.
+
+    Returns:
+        SourceStatus: The outcome of the refresh.
+    """
+    if user is None:
+        return SourceStatus(status="error", message="Settings are not configured")
+
+    if not circuit_breakers[source].is_available:
+        start_probe(source, clients[source])
+        return SourceStatus(status="stale", message=f"{source} is unavailable; serving the last synced data")
+
+    async def refresh() -> SourceStatus:
+        return (await run_sync(source, clients[source], [user]))[user.id]
+
+    try:
+        return await asyncio.wait_for(
+            refresh_flights.run((source, user.id, user.version), refresh), SYNC_TIMEOUTS[source]
+        )
+    except asyncio.TimeoutError:
+        return SourceStatus(status="timeout", message=f"{source} did not respond within {SYNC_TIMEOUTS[source]}s")
+
+
+async def refresh_sources(clients: UpstreamClients, user: Settings | None) -> dict[str, SourceStatus]:
+    """
+    Sync all sources of a user concurrently, so the total wait is bounded by the slowest
+    source's timeout rather than the sum of all of them.
+
+    Args:
+        clients (UpstreamClients): The shared upstream HTTP clients.
+        user (Settings | None): The settings of the user, or None if no user is configured.
+
+    Returns:
+        dict[str, SourceStatus]: The outcome of the refresh per source.
+    """
+    statuses = await asyncio.gather(*(refresh_source(source, clients, user) for source in SYNC_FUNCTIONS))
+    return dict(zip(SYNC_FUNCTIONS, statuses))
+
+
+def get_sources_health(db: Session) -> Dict[str, SourceHealth]:
+    """
+    Report, for every source some user configured, how old its data is.
+
+    A source is as fresh as its least recently synced user: the age is that of
+    the oldest last successful sync, and unknown while any user never synced.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        Dict[str, SourceHealth]: The health of each configured source.
+    """
+    users = get_all_settings(db)
+    now = datetime.utcnow()
+    health = {}
+    for source, configured in CONFIGURED.items():
+        owner_ids = [user.id for user in users if configured(user)]
+        if not owner_ids:
+            continue
+
+        synced_at = dict(
+            db.execute(
+                select(SyncState.owner_id, SyncState.last_synced_at).where(
+                    SyncState.source == source, SyncState.owner_id.in_(owner_ids)
+                )
+            ).all()
+        )
+        oldest = None
+        if all(synced_at.get(owner_id) is not None for owner_id in owner_ids):
+            oldest = min(synced_at[owner_id] for owner_id in owner_ids)
+        health[source] = SourceHealth(
+            users=len(owner_ids),
+            last_synced_at=oldest,
+            age_seconds=None if oldest is None else (now - oldest).total_seconds(),
+            circuit=circuit_breakers[source].state,
+        )
+    return health
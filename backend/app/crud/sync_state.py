@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.models import SyncCounts, SyncState
+
+def get_sync_state(db: Session, source: str, owner_id: int) -> SyncState | None:
+    """
+    Retrieve the sync state of a source for a user.
+
+    Args:
+        db (Session): The database session.
+        source (str): The source name (jira, github or gitlab).
+        owner_id (int): The user the state belongs to.
+
+    Returns:
+        SyncState | None: The sync state, or None if the source never synced.
+    """
+    return db.get(SyncState, (source, owner_id))
+
+
+def get_last_synced_at(db: Session, source: str, owner_id: int) -> datetime | None:
+    """
+    Retrieve the time of the last successful sync for a source.
+
+    Args:
+        db (Session): The database session.
+        source (str): The source name (jira, github or gitlab).
+        owner_id (int): The user the state belongs to.
+
+    Returns:
+        datetime | None: The last successful sync time, or None if the source never synced.
+    """
+    state = get_sync_state(db, source, owner_id)
+    if state is None:
+        return None
+    return state.last_synced_at
+
+
+def get_data_version(db: Session, source: str, owner_id: int) -> tuple[int, datetime | None]:
+    """
+    Retrieve what the stored items of a source and their sync time were built from.
+
+    Args:
+        db (Session): The database session.
+        source (str): The source name (jira, github or gitlab).
+        owner_id (int): The user the state belongs to.
+
+    Returns:
+        tuple[int, datetime | None]: The data version and the last successful sync time.
+            Both change whenever a response listing the items would change.
+    """
+    state = get_sync_state(db, source, owner_id)
+    if state is None:
+        return 0, None
+    return state.data_version, state.last_synced_at
+
+
+def record_sync(
+    db: Session, source: str, owner_id: int, error: str | None = None, counts: SyncCounts | None = None
+) -> SyncState:
+    """
+    Record the outcome of a sync run for a source.
+
+    A successful run moves `last_synced_at` forward; a failed run only stores the error,
+    so readers keep seeing the age of the last good data.
+
+    Args:
+        db (Session): The database session.
+        source (str): The source name.
+        owner_id (int): The user the state belongs to.
+        error (str | None): The error message if the sync failed.
+        counts (SyncCounts | None): How many rows the sync wrote or skipped.
+
+    Returns:
+        SyncState: The updated sync state.
+    """
+    state = db.get(SyncState, (source, owner_id))
+    if state is None:
+        state = SyncState(source=source, owner_id=owner_id)
+        db.add(state)
+
+    if error is None:
+        state.last_synced_at = datetime.utcnow()
+    state.last_error = error
+
+    if counts is not None:
+        state.last_inserted = counts.inserted
+        state.last_updated = counts.updated
+        state.last_deleted = counts.deleted
+        state.last_unchanged = counts.unchanged
+
+    db.commit()
+    db.refresh(state)
+    return state
+
+
+def update_sync_cursor(db: Session, source: str, owner_id: int, high_water_mark: datetime | None, full_sync: bool) -> None:
+    """
+    Store the incremental sync position of a source.
+
+    Nothing is committed, so the cursor moves in the same transaction as the synced rows.
+
+    Args:
+        db (Session): The database session.
+        source (str): The source name.
+        owner_id (int): The user the state belongs to.
+        high_water_mark (datetime | None): The newest upstream `updated_at` seen so far.
+        full_sync (bool): Whether this sync was a full reconcile.
+    """
+    state = get_sync_state(db, source, owner_id)
+    if state is None:
+        state = SyncState(source=source, owner_id=owner_id)
+        db.add(state)
+
+    if high_water_mark is not None:
+        state.high_water_mark = high_water_mark
+    if full_sync:
+        state.last_full_sync_at = datetime.utcnow()
+
+
+def bump_data_version(db: Session, source: str, owner_id: int) -> None:
+    """
+    Mark the stored items of a source as changed, so cached responses built from
+    them are rebuilt.
+
+    Nothing is committed, so the version moves in the same transaction as the rows.
+
+    Args:
+        db (Session): The database session.
+        source (str): The source name.
+        owner_id (int): The user the state belongs to.
+    """
+    state = get_sync_state(db, source, owner_id)
+    if state is None:
+        state = SyncState(source=source, owner_id=owner_id)
+        db.add(state)
+
+    state.data_version = (state.data_version or 0) + 1
+
+
+def needs_full_sync(state: SyncState | None, full_sync_interval: float) -> bool:
+    """
+    Decide whether the next sync of a source has to be a full reconcile.
+
+    Args:
+        state (SyncState | None): The sync state of the source.
+        full_sync_interval (float): Seconds between full reconciles.
+
+    Returns:
+        bool: True if the source never fully synced or its last full sync is too old.
+    """
+    if state is None or state.high_water_mark is None or state.last_full_sync_at is None:
+        return True
+    return datetime.utcnow() - state.last_full_sync_at >= timedelta(seconds=full_sync_interval)
@@ -1,17 +1,52 @@
+from contextlib import asynccontextmanager
+from functools import partial
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.http import UpstreamClients
+from app.core.middleware import CompressionMiddleware, MetricsMiddleware
+from app.core.rate_limit import rate_limits
+from app.core.scheduler import SyncScheduler
+from app.crud.sync import stop_probes, sync_all_users
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+def sync_interval(interval: int, webhook_secret: str | None) -> int:
+    # A source that pushes its changes by webhook is only polled to reconcile missed deliveries
+    if webhook_secret:
+        return max(interval, settings.WEBHOOK_RECONCILE_INTERVAL_SECONDS)
+    return interval
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    clients = UpstreamClients()
+    app.state.upstream_clients = clients
+
+    scheduler = SyncScheduler()
+    app.state.scheduler = scheduler
+    scheduler.add_job("jira", partial(sync_all_users, "jira", clients["jira"]), sync_interval(settings.JIRA_SYNC_INTERVAL_SECONDS, settings.JIRA_WEBHOOK_SECRET), rate_limits.next_interval)
+    scheduler.add_job("github", partial(sync_all_users, "github", clients["github"]), sync_interval(settings.GITHUB_SYNC_INTERVAL_SECONDS, settings.GITHUB_WEBHOOK_SECRET), rate_limits.next_interval)
+    scheduler.add_job("gitlab", partial(sync_all_users, "gitlab", clients["gitlab"]), sync_interval(settings.GITLAB_SYNC_INTERVAL_SECONDS, settings.GITLAB_WEBHOOK_TOKEN), rate_limits.next_interval)
+    if settings.SYNC_ENABLED:
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    # The scheduled syncs may have started probes; stop them before closing their clients
+    await stop_probes()
+    await clients.aclose()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
 )
@@ -28,5 +63,8 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
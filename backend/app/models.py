@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 from sqlmodel import Field, SQLModel
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseModel
 
@@ -14,37 +14,131 @@ class BaseModel(SQLModel):
     status: str = Field(index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    fingerprint: str = Field(default="", exclude=True)
+    owner_id: int = Field(default=0, exclude=True)
 
 class JiraIssue(BaseModel, table=True):
     __tablename__ = "jira_issues"
-    issue: str = Field(index=True, unique=True)
+    __table_args__ = (
+        Index("ix_jira_issues_owner_id_issue", "owner_id", "issue", unique=True),
+        Index("ix_jira_issues_owner_id_status", "owner_id", "status"),
+    )
+    issue: str = Field(index=True)
     url: str = Field(nullable=False)
 
 class GithubPullRequest(BaseModel, table=True):
     __tablename__ = "github_pull_requests"
-    pull_request: int = Field(index=True, unique=True)
+    __table_args__ = (
+        Index("ix_github_pull_requests_owner_id_reference", "owner_id", "reference", unique=True),
+        Index("ix_github_pull_requests_owner_id_status", "owner_id", "status"),
+    )
+    # Pull request numbers are only unique within a repository: `<repository>#<number>` identifies one
+    reference: str = Field(index=True)
+    pull_request: int = Field(index=True)
     repository: str = Field(nullable=False)
     url: str = Field(nullable=False)
     is_assigned: bool = Field(default=False)
 
 class GitlabMergeRequest(BaseModel, table=True):
     __tablename__ = "gitlab_merge_requests"
-    merge_request: int = Field(index=True, unique=True)
+    __table_args__ = (
+        Index("ix_gitlab_merge_requests_owner_id_reference", "owner_id", "reference", unique=True),
+        Index("ix_gitlab_merge_requests_owner_id_status", "owner_id", "status"),
+    )
+    # Merge request iids are only unique within a project: `<project path>!<iid>` identifies one
+    reference: str = Field(index=True)
+    merge_request: int = Field(index=True)
     repository: str = Field(nullable=False)
     url: str = Field(nullable=False)
     is_assigned: bool = Field(default=True)
 
+class SyncState(SQLModel, table=True):
+    __tablename__ = "sync_state"
+    source: str = Field(primary_key=True)
+    owner_id: int = Field(default=0, primary_key=True)
+    last_synced_at: datetime | None = Field(default=None, nullable=True)
+    last_error: str | None = Field(default=None, nullable=True)
+    high_water_mark: datetime | None = Field(default=None, nullable=True)
+    last_full_sync_at: datetime | None = Field(default=None, nullable=True)
+    last_inserted: int = Field(default=0)
+    last_updated: int = Field(default=0)
+    last_deleted: int = Field(default=0)
+    last_unchanged: int = Field(default=0)
+    data_version: int = Field(default=0)
+
+class WebhookDeletion(SQLModel, table=True):
+    __tablename__ = "webhook_deletions"
+    # An item a webhook removed from a user, with when upstream last changed it, so
+    # a delivery about an older state that arrives late does not bring it back
+    table_name: str = Field(primary_key=True)
+    owner_id: int = Field(primary_key=True)
+    item_key: str = Field(primary_key=True)
+    updated_at: datetime
+    recorded_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
 class JiraIssueResponse(SQLModel):
     issues: list[JiraIssue]
     count: int
+    last_synced_at: datetime | None = None
+    next_cursor: str | None = None
+    stale: bool = False
 
 class GithubPullRequestResponse(SQLModel):
     pull_requests: list[GithubPullRequest]
     count: int
+    last_synced_at: datetime | None = None
+    next_cursor: str | None = None
+    stale: bool = False
 
 class GitlabMergeRequestResponse(SQLModel):
     merge_requests: list[GitlabMergeRequest]
     count: int
+    last_synced_at: datetime | None = None
+    next_cursor: str | None = None
+    stale: bool = False
+
+class SyncCounts(SQLModel):
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    def add(self, other: "SyncCounts") -> None:
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.deleted += other.deleted
+        self.unchanged += other.unchanged
+
+class SourceStatus(SQLModel):
+    status: str
+    message: str | None = None
+    counts: SyncCounts | None = None
+    age_seconds: float | None = None
+
+class WebhookResponse(SQLModel):
+    event: str
+    applied: bool
+    counts: dict[int, SyncCounts] = {}
+
+class SearchResult(SQLModel):
+    source: str
+    id: uuid.UUID
+    key: str
+    title: str
+    status: str
+    url: str
+    repository: str | None = None
+    updated_at: datetime
+    rank: float
+
+class SearchResponse(SQLModel):
+    results: list[SearchResult]
+
+class DashboardResponse(SQLModel):
+    issues: JiraIssueResponse
+    pull_requests: GithubPullRequestResponse
+    merge_requests: GitlabMergeRequestResponse
+    sources: dict[str, SourceStatus]
 
 class Settings(SQLModel, table=True):
     __tablename__ = "settings"
@@ -60,8 +154,12 @@ class Settings(SQLModel, table=True):
     gitlab_access_token: str | None = Field(nullable=True)
     gitlab_api_url: str | None = Field(nullable=True)
     user_name: str
+    # SHA-256 of the user's API token, see app.core.auth
+    api_token_hash: str | None = Field(default=None, nullable=True)
+    version: int = Field(default=0)
 
 class SettingsResponse(SQLModel):
+    id: int
     jira_api_email: str | None = None
     jira_api_url: str | None = None
     github_api_url: str | None = None
@@ -70,6 +168,34 @@ class SettingsResponse(SQLModel):
     gitlab_api_url: str | None = None
     user_name: str
 
+class ApiTokenResponse(SQLModel):
+    user_id: int
+    api_token: str
+
+class RateLimitBudgetStatus(SQLModel):
+    source: str
+    token: str
+    limit: int | None = None
+    remaining: int | None = None
+    reset_at: datetime | None = None
+    retry_at: datetime | None = None
+    last_cost: int | None = None
+    run_cost: int | None = None
+
+class RateLimitsResponse(SQLModel):
+    budgets: list[RateLimitBudgetStatus]
+    next_syncs: dict[str, datetime]
+
+class SourceHealth(SQLModel):
+    users: int
+    last_synced_at: datetime | None = None
+    age_seconds: float | None = None
+    circuit: str
+
+class HealthResponse(SQLModel):
+    status: str
+    sources: dict[str, SourceHealth]
+
 class ErrorResponse(BaseModel):
     message: str
 
@@ -0,0 +1,88 @@
+"""
+Compares the per-row ORM reconcile the sync paths used to run with the bulk
+upsert helpers, on a scratch SQLite database.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bulk_upsert [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.crud.bulk import bulk_upsert, delete_missing
+from app.models import JiraIssue
+
+OWNER_ID = 1
+
+
+def make_rows(count: int, revision: int) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "issue": f"DEV-{i}",
+            "title": f"Issue {i} rev {revision}",
+            "url": f"https://example.atlassian.net/browse/DEV-{i}",
+            "description": f"https://example.atlassian.net/rest/api/2/issue/{i}",
+            "status": "In Progress" if revision % 2 else "To Do",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def orm_reconcile(db: Session, rows: list[dict]) -> None:
+    keys = set()
+    for row in rows:
+        keys.add(row["issue"])
+        existing = db.query(JiraIssue).filter(JiraIssue.issue == row["issue"]).first()
+        if not existing:
+            db.add(JiraIssue(**row))
+        else:
+            for key, value in row.items():
+                setattr(existing, key, value)
+    for existing in db.query(JiraIssue).all():
+        if existing.issue not in keys:
+            db.delete(existing)
+    db.commit()
+
+
+def bulk_reconcile(db: Session, rows: list[dict]) -> None:
+    bulk_upsert(db, JiraIssue, "issue", rows, OWNER_ID)
+    delete_missing(db, JiraIssue, "issue", [row["issue"] for row in rows], OWNER_ID)
+    db.commit()
+
+
+def run(reconcile, count: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        timings = []
+        for revision in range(2):
+            rows = make_rows(count, revision)
+            with Session(engine) as db:
+                started = time.perf_counter()
+                reconcile(db, rows)
+                timings.append(time.perf_counter() - started)
+        engine.dispose()
+    return timings[0], timings[1]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    results = {name: run(reconcile, count) for name, reconcile in (("orm", orm_reconcile), ("bulk", bulk_reconcile))}
+
+    print(f"{'rows':>8} {'mode':>6} {'insert (s)':>12} {'update (s)':>12}")
+    for name, (insert_time, update_time) in results.items():
+        print(f"{count:>8} {name:>6} {insert_time:>12.3f} {update_time:>12.3f}")
+    orm_total, bulk_total = sum(results["orm"]), sum(results["bulk"])
+    print(f"speedup: {orm_total / bulk_total:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
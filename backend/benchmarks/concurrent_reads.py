@@ -0,0 +1,143 @@
+"""
+Measures how list reads behave while syncs write, on a scratch SQLite database.
+
+Two syncs run at once, each writing pages of issues with a simulated upstream
+round trip between pages, while reader threads list issues the way the GET
+handlers do. The "default" setup is the one the app used to run: a plain engine
+in rollback journal mode, with each sync holding one transaction across all of
+its pages. The "tuned" setup uses the WAL engines and the serialized writer.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.concurrent_reads [rows_per_sync] [readers]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import Engine, func, select
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.db import DatabaseWriter, create_db_engine
+from app.crud.bulk import bulk_upsert
+from app.models import JiraIssue
+
+PAGE_SIZE = 500
+UPSTREAM_LATENCY_SECONDS = 0.05
+OWNER_ID = 1
+
+
+def make_pages(sync: int, count: int) -> list[list[dict]]:
+    now = datetime.utcnow()
+    rows = [
+        {
+            "issue": f"S{sync}-{i}",
+            "title": f"Issue {i} of sync {sync}",
+            "url": f"https://example.atlassian.net/browse/S{sync}-{i}",
+            "description": "x" * 1024,
+            "status": "To Do",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+    return [rows[start:start + PAGE_SIZE] for start in range(0, count, PAGE_SIZE)]
+
+
+def read_issues(engine: Engine) -> None:
+    with Session(engine) as db:
+        db.execute(select(func.count()).select_from(JiraIssue)).scalar_one()
+        db.execute(select(JiraIssue).order_by(JiraIssue.issue).limit(100)).scalars().all()
+
+
+async def default_sync(engine: Engine, pages: list[list[dict]]) -> None:
+    with Session(engine) as db:
+        for page in pages:
+            await asyncio.sleep(UPSTREAM_LATENCY_SECONDS)
+            await asyncio.to_thread(bulk_upsert, db, JiraIssue, "issue", page, OWNER_ID)
+        await asyncio.to_thread(db.commit)
+
+
+async def tuned_sync(writer: DatabaseWriter, pages: list[list[dict]]) -> None:
+    for page in pages:
+        await asyncio.sleep(UPSTREAM_LATENCY_SECONDS)
+        await writer.write(bulk_upsert, JiraIssue, "issue", page, OWNER_ID)
+
+
+def run(setup: str, rows: int, readers: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        if setup == "default":
+            read_engine = write_engine = create_engine(url)
+        else:
+            read_engine = create_db_engine(url, read_only=True, pool_size=readers, max_overflow=0)
+            write_engine = create_db_engine(url, pool_size=1, max_overflow=0)
+        SQLModel.metadata.create_all(write_engine)
+
+        latencies: list[float] = []
+        read_errors = 0
+        stop = threading.Event()
+
+        def reader() -> None:
+            nonlocal read_errors
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    read_issues(read_engine)
+                    latencies.append(time.perf_counter() - started)
+                except Exception:
+                    read_errors += 1
+
+        async def syncs() -> list:
+            if setup == "default":
+                jobs = [default_sync(write_engine, make_pages(sync, rows)) for sync in range(2)]
+            else:
+                writer = DatabaseWriter(write_engine)
+                jobs = [tuned_sync(writer, make_pages(sync, rows)) for sync in range(2)]
+            return await asyncio.gather(*jobs, return_exceptions=True)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        outcomes = asyncio.run(syncs())
+        sync_time = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        read_engine.dispose()
+        write_engine.dispose()
+
+    latencies.sort()
+    return {
+        "sync_s": sync_time,
+        "sync_errors": sum(isinstance(outcome, Exception) for outcome in outcomes),
+        "reads": len(latencies),
+        "read_errors": read_errors,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan"),
+        "max_ms": latencies[-1] * 1000 if latencies else float("nan"),
+    }
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    print(f"{'setup':>8} {'sync (s)':>9} {'sync err':>9} {'reads':>7} {'read err':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+    for setup in ("default", "tuned"):
+        result = run(setup, rows, readers)
+        print(
+            f"{setup:>8} {result['sync_s']:>9.2f} {result['sync_errors']:>9} {result['reads']:>7} "
+            f"{result['read_errors']:>9} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['max_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Stub GitHub, GitLab and Jira APIs that serve any number of items offline.
+
+Each item is a copy of the one in the recorded pages in `fixtures/upstream`,
+with its own number, iid or key. The pages a source serves are encoded in
+`prepare`, before a measured run, so serving them costs a lookup rather than
+JSON encoding, much as if they came from another machine. Requests are
+answered through an `httpx.MockTransport`, which `UpstreamClients` accepts in
+place of the network.
+"""
+import copy
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from app.crud.github import PAGE_SIZE as GITHUB_PAGE_SIZE
+from app.crud.gitlab import PER_PAGE as GITLAB_PAGE_SIZE
+from app.crud.jira import MAX_RESULTS as JIRA_PAGE_SIZE
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "upstream"
+
+GITHUB_HOST = "api.github.com"
+GITLAB_HOST = "gitlab.example.com"
+JIRA_HOST = "acme.atlassian.net"
+
+# The share of the pull and merge requests that await the user's review rather than being theirs
+REVIEW_SHARE = 0.1
+
+# Settings of a user whose every source points at the stubs
+USER_SETTINGS = {
+    "user_name": "carol",
+    "github_access_token": "stub-github-token",
+    "github_org": "acme",
+    "github_user": "carol",
+    "gitlab_access_token": "stub-gitlab-token",
+    "gitlab_api_url": f"https://{GITLAB_HOST}/api/v4",
+    "jira_api_url": f"https://{JIRA_HOST}/rest/api/2/",
+    "jira_api_email": "carol@acme.com",
+    "jira_api_key": "stub-jira-key",
+}
+
+
+def load_fixture(name: str) -> Any:
+    return json.loads((FIXTURES_DIR / name).read_text())
+
+
+def paginate(items: List[Any], page_size: int) -> List[List[Any]]:
+    return [items[start:start + page_size] for start in range(0, len(items), page_size)] or [[]]
+
+
+def github_pages(count: int, first_number: int) -> List[bytes]:
+    recorded = load_fixture("github_search.json")
+    template = recorded["data"]["search"]["nodes"][0]
+    nodes = []
+    for number in range(first_number, first_number + count):
+        node = copy.deepcopy(template)
+        node.update(number=number, title=f"{template['title']} #{number}", url=f"https://github.com/acme/notifier/pull/{number}")
+        nodes.append(node)
+
+    pages = paginate(nodes, GITHUB_PAGE_SIZE)
+    encoded = []
+    for index, page in enumerate(pages):
+        body = copy.deepcopy(recorded)
+        body["data"]["search"] = {
+            "pageInfo": {"hasNextPage": index + 1 < len(pages), "endCursor": str(index + 1)},
+            "nodes": page,
+        }
+        encoded.append(json.dumps(body).encode())
+    return encoded
+
+
+def gitlab_pages(count: int, first_iid: int) -> List[bytes]:
+    template = load_fixture("gitlab_merge_requests.json")[0]
+    merge_requests = []
+    for iid in range(first_iid, first_iid + count):
+        merge_request = copy.deepcopy(template)
+        merge_request.update(
+            id=iid + 1000,
+            iid=iid,
+            title=f"{template['title']} !{iid}",
+            reference=f"!{iid}",
+            references={"short": f"!{iid}", "relative": f"!{iid}", "full": f"acme/notifier!{iid}"},
+            web_url=f"https://{GITLAB_HOST}/acme/notifier/-/merge_requests/{iid}",
+        )
+        merge_requests.append(merge_request)
+    return [json.dumps(page).encode() for page in paginate(merge_requests, GITLAB_PAGE_SIZE)]
+
+
+def jira_pages(count: int) -> List[bytes]:
+    recorded = load_fixture("jira_search.json")
+    template = recorded["issues"][0]
+    issues = []
+    for number in range(1, count + 1):
+        issue = copy.deepcopy(template)
+        issue.update(id=str(10000 + number), key=f"NOT-{number}", self=f"https://{JIRA_HOST}/rest/api/2/issue/{10000 + number}")
+        issue["fields"]["summary"] = f"{template['fields']['summary']} ({number})"
+        issues.append(issue)
+
+    encoded = []
+    for index, page in enumerate(paginate(issues, JIRA_PAGE_SIZE)):
+        body = {**recorded, "startAt": index * JIRA_PAGE_SIZE, "maxResults": JIRA_PAGE_SIZE, "total": count, "issues": page}
+        encoded.append(json.dumps(body).encode())
+    return encoded
+
+
+def json_response(body: bytes, headers: Dict[str, str] | None = None) -> httpx.Response:
+    return httpx.Response(200, content=body, headers={"Content-Type": "application/json", **(headers or {})})
+
+
+class StubUpstreams:
+    """
+    Serves `items` pull requests, merge requests or issues for the source last
+    prepared, and counts the requests it answered.
+
+    Incremental syncs find nothing changed: every item was last updated when the
+    recorded one was, which is what the previous sync's high-water mark holds.
+    """
+
+    def __init__(self, items: int) -> None:
+        self.items = items
+        self.requests = 0
+        self._pages: Dict[str, List[bytes]] = {}
+
+    def prepare(self, source: str) -> None:
+        """
+        Encodes the pages of a source, dropping those of the previous one.
+        """
+        reviews = int(self.items * REVIEW_SHARE)
+        builders: Dict[str, Callable[[], Dict[str, List[bytes]]]] = {
+            "github": lambda: {
+                "authored": github_pages(self.items - reviews, 1),
+                "review": github_pages(reviews, self.items - reviews + 1),
+            },
+            "gitlab": lambda: {
+                "assigned": gitlab_pages(self.items - reviews, 1),
+                "review": gitlab_pages(reviews, self.items - reviews + 1),
+            },
+            "jira": lambda: {"search": jira_pages(self.items)},
+        }
+        # Release the previous pages before encoding the next ones, so only one source's are held at a time
+        self._pages = {}
+        self._pages = builders[source]()
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if request.url.host == GITHUB_HOST:
+            return self._github(request)
+        if request.url.host == GITLAB_HOST:
+            return self._gitlab(request)
+        if request.url.host == JIRA_HOST:
+            return self._jira(request)
+        return httpx.Response(404)
+
+    def _github(self, request: httpx.Request) -> httpx.Response:
+        variables = json.loads(request.content)["variables"]
+        pages = self._pages["authored" if "author:" in variables["search"] else "review"]
+        return json_response(pages[int(variables["after"] or 0)])
+
+    def _gitlab(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/user"):
+            return json_response(json.dumps({"username": USER_SETTINGS["user_name"]}).encode())
+
+        params = request.url.params
+        if "updated_after" in params:
+            return json_response(b"[]")
+        pages = self._pages["assigned" if params["scope"] == "assigned_to_me" else "review"]
+        page = int(params["page"])
+        next_page = str(page + 1) if page < len(pages) else ""
+        return json_response(pages[page - 1], {"X-Next-Page": next_page})
+
+    def _jira(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if "updated >=" in params["jql"]:
+            return json_response(json.dumps({"startAt": 0, "maxResults": JIRA_PAGE_SIZE, "total": 0, "issues": []}).encode())
+        return json_response(self._pages["search"][int(params["startAt"]) // JIRA_PAGE_SIZE])
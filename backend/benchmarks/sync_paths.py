@@ -0,0 +1,267 @@
+"""
+Benchmarks the GitHub, GitLab and Jira sync paths end to end, offline, and the
+list endpoints serving what they stored.
+
+For each size and source, the stub upstreams in `benchmarks.stub_upstreams`
+serve that many items to the real sync job, `sync_all_users`, writing to a
+scratch database migrated to the current schema. Measured:
+
+- a full sync into an empty database, then an incremental one right after
+  (GitHub has no incremental sync, so it fetches everything again): wall time,
+  SQL statements executed and upstream requests sent
+- the peak Python memory (tracemalloc) of another full sync; allocations made
+  by SQLite itself are not traced
+- the latency of the list endpoint of the source under concurrent requests,
+  sent to the FastAPI app in-process, with the response cache in use and
+  cleared before every request
+- the latency of the search endpoint for a word every item of the source
+  holds, the worst case for ranking
+
+Results are written as JSON, to stdout or `--output`, so runs of different
+versions can be compared; a summary table goes to stderr.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.sync_paths [--sizes 1000,10000,100000] [--sources jira,github,gitlab]
+        [--concurrency 20] [--requests 500] [--output results.json]
+
+Set `BENCH_DATABASE_URL` to benchmark another database, such as a scratch
+Postgres database, instead of a temporary SQLite file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# The app creates its engines on import, so point them at the scratch database first
+SCRATCH_DIR = tempfile.mkdtemp(prefix="sync-bench-")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{SCRATCH_DIR}/bench.db"
+os.environ["SYNC_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import delete, event  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.api.cache import response_cache  # noqa: E402
+from app.core.db import read_engine, write_engine  # noqa: E402
+from app.core.http import UpstreamClients  # noqa: E402
+from app.crud.settings import create_settings  # noqa: E402
+from app.crud.sync import sync_all_users  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import GithubPullRequest, GitlabMergeRequest, JiraIssue, SyncState  # noqa: E402
+from benchmarks.stub_upstreams import USER_SETTINGS, StubUpstreams  # noqa: E402
+
+SOURCES = ("jira", "github", "gitlab")
+
+TABLES = {"jira": JiraIssue, "github": GithubPullRequest, "gitlab": GitlabMergeRequest}
+
+ENDPOINTS = {
+    "jira": "/api/v1/issues?limit=100",
+    "github": "/api/v1/pull-requests?limit=100",
+    "gitlab": "/api/v1/merge-requests?limit=100",
+}
+
+# A word of the title of every stub item of the source
+SEARCHES = {
+    "jira": "/api/v1/search?q=polling&source=jira",
+    "github": "/api/v1/search?q=dashboard&source=github",
+    "gitlab": "/api/v1/search?q=webhook&source=gitlab",
+}
+
+
+class StatementCounter:
+    """
+    Counts the SQL statements sent by the read and write engines; an executemany counts once.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        for engine in {read_engine, write_engine}:
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+
+def reset(source: str) -> None:
+    with Session(write_engine) as db:
+        db.execute(delete(TABLES[source]))
+        db.execute(delete(SyncState).where(SyncState.source == source))
+        db.commit()
+    response_cache.clear()
+
+
+async def timed_sync(source: str, client: httpx.AsyncClient, stub: StubUpstreams, statements: StatementCounter) -> dict:
+    stub.requests = 0
+    statements.count = 0
+    started = time.perf_counter()
+    statuses = await sync_all_users(source, client)
+    seconds = time.perf_counter() - started
+
+    status = next(iter(statuses.values()))
+    if status.status != "ok":
+        raise RuntimeError(f"{source} sync failed: {status.message}")
+    return {
+        "seconds": seconds,
+        "sql_statements": statements.count,
+        "upstream_requests": stub.requests,
+        "counts": status.counts.model_dump(),
+    }
+
+
+async def peak_memory(source: str, client: httpx.AsyncClient) -> int:
+    tracemalloc.start()
+    try:
+        await sync_all_users(source, client)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def request_latency(path: str, concurrency: int, requests: int, cached: bool) -> dict:
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def worker() -> None:
+            for _ in remaining:
+                if not cached:
+                    response_cache.clear()
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": path,
+        "cached": cached,
+        "concurrency": concurrency,
+        "requests": requests,
+        "requests_per_second": requests / seconds,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+async def run(sizes: list[int], sources: list[str], concurrency: int, requests: int) -> list[dict]:
+    statements = StatementCounter()
+    results = []
+    for size in sizes:
+        stub = StubUpstreams(size)
+        clients = UpstreamClients(transport=stub.transport())
+        for source in sources:
+            stub.prepare(source)
+            reset(source)
+            full = await timed_sync(source, clients[source], stub, statements)
+            incremental = await timed_sync(source, clients[source], stub, statements)
+            latency = [
+                await request_latency(ENDPOINTS[source], concurrency, requests, cached)
+                for cached in (True, False)
+            ]
+            search = await request_latency(SEARCHES[source], concurrency, requests, cached=False)
+            reset(source)
+            results.append({
+                "source": source,
+                "items": size,
+                "full_sync": full,
+                "incremental_sync": incremental,
+                "peak_memory_bytes": await peak_memory(source, clients[source]),
+                "latency": latency,
+                "search_latency": search,
+            })
+            print_result(results[-1])
+        await clients.aclose()
+    return results
+
+
+def print_result(result: dict) -> None:
+    full, incremental = result["full_sync"], result["incremental_sync"]
+    cached, uncached = result["latency"]
+    search = result["search_latency"]
+    print(
+        f"{result['source']:>7} {result['items']:>7} {full['seconds']:>9.2f} {full['sql_statements']:>8} "
+        f"{incremental['seconds']:>9.2f} {incremental['sql_statements']:>8} {result['peak_memory_bytes'] / 2**20:>8.1f} "
+        f"{cached['p50_ms']:>8.1f} {cached['p99_ms']:>8.1f} {uncached['p50_ms']:>8.1f} {uncached['p99_ms']:>8.1f} "
+        f"{search['p50_ms']:>8.1f} {search['p99_ms']:>8.1f}",
+        file=sys.stderr,
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the sync paths against stub upstreams.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated item counts per source")
+    parser.add_argument("--sources", default=",".join(SOURCES), help="Comma-separated sources to benchmark")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients of the list endpoints")
+    parser.add_argument("--requests", type=int, default=500, help="Requests sent to each list endpoint")
+    parser.add_argument("--output", help="File to write the JSON results to; stdout by default")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    sources = [source.strip() for source in args.sources.split(",")]
+
+    try:
+        command.upgrade(Config("alembic.ini"), "head")
+        with Session(write_engine) as db:
+            create_settings(db, **USER_SETTINGS)
+
+        print(
+            f"{'source':>7} {'items':>7} {'full (s)':>9} {'full sql':>8} {'incr (s)':>9} {'incr sql':>8} {'peak MiB':>8} "
+            f"{'hit p50':>8} {'hit p99':>8} {'miss p50':>8} {'miss p99':>8} {'srch p50':>8} {'srch p99':>8}",
+            file=sys.stderr,
+        )
+        results = asyncio.run(run(sizes, sources, args.concurrency, args.requests))
+    finally:
+        read_engine.dispose()
+        write_engine.dispose()
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    report = {
+        "benchmark": "sync_paths",
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": write_engine.dialect.name,
+        "sqlite": sqlite3.sqlite_version,
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
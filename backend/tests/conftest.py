@@ -0,0 +1,91 @@
+import os
+import tempfile
+from pathlib import Path
+
+# The app creates its engines on import, so point them at a scratch database first
+SCRATCH_DIR = tempfile.mkdtemp(prefix="notifier-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DIR}/test.db"
+os.environ["SYNC_ENABLED"] = "false"
+
+import pytest  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app.api.cache import response_cache  # noqa: E402
+from app.core.circuit import circuit_breakers  # noqa: E402
+from app.core.db import db_writer, read_engine, write_engine  # noqa: E402
+from app.core.http import conditional_cache  # noqa: E402
+from app.core.rate_limit import rate_limits  # noqa: E402
+from app.crud.github import known_token_scopes  # noqa: E402
+from app.crud.gitlab import known_usernames  # noqa: E402
+from app.crud.jira import known_account_ids  # noqa: E402
+from app.crud.settings import create_settings, settings_cache  # noqa: E402
+from app.crud.sync import _probes  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Settings  # noqa: E402
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+GITLAB_API_URL = "https://gitlab.example.com/api/v4"
+
+# Settings of a user whose every source is configured
+USER_SETTINGS = {
+    "user_name": "carol",
+    "github_access_token": "test-github-token",
+    "github_org": "acme",
+    "github_user": "carol",
+    "gitlab_access_token": "test-gitlab-token",
+    "gitlab_api_url": GITLAB_API_URL,
+    "jira_api_url": "https://acme.atlassian.net/rest/api/2/",
+    "jira_api_email": "carol@acme.com",
+    "jira_api_key": "test-jira-key",
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "app" / "alembic"))
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(autouse=True)
+def clean_state(migrated_database):
+    """
+    Empties every table and the in-process caches, so each test starts from scratch.
+    """
+    yield
+    with Session(write_engine) as db:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            db.execute(delete(table))
+        db.commit()
+    conditional_cache._entries.clear()
+    response_cache.clear()
+    settings_cache._snapshots.clear()
+    settings_cache.invalidate()
+    circuit_breakers._breakers.clear()
+    rate_limits._budgets.clear()
+    rate_limits._run_marks.clear()
+    known_account_ids.clear()
+    known_usernames.clear()
+    known_token_scopes.clear()
+    _probes.clear()
+
+
+@pytest.fixture
+def user() -> Settings:
+    return db_writer.write_blocking(create_settings, **USER_SETTINGS)
+
+
+@pytest.fixture
+def db():
+    with Session(read_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(app)
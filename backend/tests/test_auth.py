@@ -0,0 +1,136 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings as app_settings
+from app.core.db import db_writer
+from app.core.rate_limit import rate_limits
+from app.crud.settings import create_or_update_settings, create_settings, issue_api_token
+from app.main import app
+
+from tests.conftest import USER_SETTINGS
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(app_settings, "ADMIN_TOKEN", ADMIN_TOKEN)
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def other_user():
+    return db_writer.write_blocking(create_settings, **{**USER_SETTINGS, "user_name": "dave"})
+
+
+def test_a_single_user_without_a_token_needs_none(client, user):
+    response = client.get("/api/v1/settings")
+
+    assert response.status_code == 200
+    assert response.json()["user_name"] == "carol"
+
+
+def test_requests_without_a_token_are_refused_once_there_are_several_users(client, user, other_user):
+    response = client.get("/api/v1/settings", headers={"X-User-Id": str(other_user.id)})
+
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_requests_without_a_token_are_refused_once_a_token_was_issued(client, user):
+    db_writer.write_blocking(issue_api_token, user.id)
+
+    assert client.get("/api/v1/settings").status_code == 401
+
+
+def test_a_token_acts_for_its_user(client, user, other_user):
+    api_token = db_writer.write_blocking(issue_api_token, other_user.id)
+
+    response = client.get("/api/v1/settings", headers=bearer(api_token))
+
+    assert response.status_code == 200
+    assert response.json()["user_name"] == "dave"
+
+
+def test_a_token_cannot_act_for_another_user(client, user, other_user):
+    api_token = db_writer.write_blocking(issue_api_token, other_user.id)
+
+    response = client.put(
+        "/api/v1/settings",
+        headers={**bearer(api_token), "X-User-Id": str(user.id)},
+        json={"user_name": "mallory"},
+    )
+
+    assert response.status_code == 403
+    assert client.get("/api/v1/settings", headers=bearer(ADMIN_TOKEN)).json()["user_name"] == "carol"
+
+
+def test_unknown_tokens_are_refused(client, user):
+    assert client.get("/api/v1/settings", headers=bearer("not-a-token")).status_code == 401
+
+
+def test_events_are_refused_without_the_users_token(client, user, other_user):
+    response = client.get("/api/v1/events", params={"user_id": user.id})
+
+    assert response.status_code == 401
+
+
+def test_only_the_admin_token_adds_users(client, user):
+    api_token = db_writer.write_blocking(issue_api_token, user.id)
+
+    assert client.post("/api/v1/settings", json={"user_name": "mallory"}).status_code == 403
+    assert client.post("/api/v1/settings", headers=bearer(api_token), json={"user_name": "mallory"}).status_code == 403
+
+    response = client.post("/api/v1/settings", headers=bearer(ADMIN_TOKEN), json={"user_name": "dave"})
+    assert response.status_code == 200
+    new_user_id = response.json()["id"]
+
+    response = client.post("/api/v1/settings/token", headers={**bearer(ADMIN_TOKEN), "X-User-Id": str(new_user_id)})
+    assert response.status_code == 200
+    assert client.get("/api/v1/settings", headers=bearer(response.json()["api_token"])).json()["user_name"] == "dave"
+
+
+def test_users_cannot_be_added_while_no_admin_token_is_set(client, user, monkeypatch):
+    monkeypatch.setattr(app_settings, "ADMIN_TOKEN", None)
+
+    assert client.post("/api/v1/settings", headers=bearer(""), json={"user_name": "mallory"}).status_code == 403
+
+
+def test_issuing_a_token_replaces_the_previous_one(client, user):
+    first = client.post("/api/v1/settings/token").json()["api_token"]
+    second = client.post("/api/v1/settings/token", headers=bearer(first)).json()["api_token"]
+
+    assert client.get("/api/v1/settings", headers=bearer(first)).status_code == 401
+    assert client.get("/api/v1/settings", headers=bearer(second)).status_code == 200
+
+
+def test_the_api_token_hash_cannot_be_set_through_the_settings(client, user):
+    response = client.put("/api/v1/settings", json={"user_name": "carol", "api_token_hash": "0" * 64})
+
+    assert response.status_code == 200
+    assert client.get("/api/v1/settings").status_code == 200
+
+
+def observe_budget(token: str, remaining: int) -> None:
+    request = httpx.Request("POST", "https://api.github.com/graphql", headers={"Authorization": f"Bearer {token}"})
+    rate_limits.observe("github", httpx.Response(
+        200, request=request, headers={"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": str(remaining)}
+    ))
+
+
+def test_rate_limits_only_list_the_budgets_of_the_users_tokens(user, other_user):
+    db_writer.write_blocking(create_or_update_settings, other_user.id, github_access_token="dave-github-token")
+    observe_budget("test-github-token", 4000)
+    observe_budget("dave-github-token", 3000)
+    api_token = db_writer.write_blocking(issue_api_token, other_user.id)
+
+    with TestClient(app) as client:
+        assert client.get("/api/v1/rate-limits").status_code == 401
+        response = client.get("/api/v1/rate-limits", headers=bearer(api_token))
+
+    assert response.status_code == 200
+    assert [(budget["source"], budget["remaining"]) for budget in response.json()["budgets"]] == [("github", 3000)]
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.core.db import db_writer
+from app.crud.bulk import bulk_upsert, delete_missing
+from app.models import GitlabMergeRequest
+
+UPDATED_AT = datetime(2024, 1, 2, 3, 4, 5)
+
+
+def merge_request(iid: int) -> dict:
+    return {
+        'reference': f"acme/notifier!{iid}",
+        'merge_request': iid,
+        'title': f"Merge request !{iid}",
+        'description': '',
+        'status': 'opened',
+        'created_at': UPDATED_AT,
+        'updated_at': UPDATED_AT,
+        'repository': 'acme/notifier',
+        'url': f"https://gitlab.example.com/acme/notifier/-/merge_requests/{iid}",
+        'is_assigned': True,
+    }
+
+
+def stored_iids(db, owner_id):
+    db.rollback()
+    return db.execute(
+        select(GitlabMergeRequest.merge_request).where(GitlabMergeRequest.owner_id == owner_id)
+    ).scalars().all()
+
+
+def test_delete_missing_keeps_more_keys_than_a_statement_has_parameters(db, user):
+    db_writer.write_blocking(bulk_upsert, GitlabMergeRequest, 'reference', [merge_request(iid) for iid in range(1, 4)], user.id)
+
+    # More keys than SQLite (32766) or Postgres (65535) accept as bound parameters
+    deleted = db_writer.write_blocking(
+        delete_missing, GitlabMergeRequest, 'reference', {f"acme/notifier!{iid}" for iid in range(2, 70000)}, user.id
+    )
+
+    assert deleted == 1
+    assert sorted(stored_iids(db, user.id)) == [2, 3]
+
+
+def test_delete_missing_without_keys_deletes_every_row_of_the_user(db, user):
+    db_writer.write_blocking(bulk_upsert, GitlabMergeRequest, 'reference', [merge_request(iid) for iid in range(1, 4)], user.id)
+
+    deleted = db_writer.write_blocking(delete_missing, GitlabMergeRequest, 'reference', set(), user.id)
+
+    assert deleted == 3
+    assert stored_iids(db, user.id) == []
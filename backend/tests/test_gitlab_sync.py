@@ -0,0 +1,117 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import delete, select
+
+import app.crud.gitlab as gitlab
+from app.core.config import settings as app_settings
+from app.core.db import db_writer
+from app.crud.gitlab import sync_gitlab_merge_requests
+from app.models import GitlabMergeRequest
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "upstream"
+
+ETAG = '"merge-requests-v1"'
+
+
+class GitlabStub:
+    """
+    Serves the recorded merge requests page with an ETag, answering `304 Not
+    Modified` when the request carries it, and keeps the requests it answered.
+    """
+
+    def __init__(self) -> None:
+        self.merge_requests = json.loads((FIXTURES_DIR / "gitlab_merge_requests.json").read_text())
+        self.requests: list[httpx.Request] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path.endswith("/user"):
+            return httpx.Response(200, json={"username": "carol"})
+        if request.headers.get("If-None-Match") == ETAG:
+            return httpx.Response(304, headers={"ETag": ETAG})
+        merge_requests = self.merge_requests if request.url.params["scope"] == "assigned_to_me" else []
+        return httpx.Response(200, json=merge_requests, headers={"ETag": ETAG, "X-Next-Page": ""})
+
+    def not_modified(self) -> int:
+        return sum(1 for request in self.requests if "If-None-Match" in request.headers)
+
+
+@pytest.fixture(autouse=True)
+def always_full_sync(monkeypatch):
+    monkeypatch.setattr(app_settings, "GITLAB_FULL_SYNC_INTERVAL_SECONDS", 0)
+
+
+def sync(db, user, stub: GitlabStub):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)) as client:
+            return await sync_gitlab_merge_requests(db, client, user)
+
+    db.rollback()
+    return asyncio.run(run())
+
+
+def stored_references(db, user):
+    db.rollback()
+    return sorted(
+        db.execute(select(GitlabMergeRequest.reference).where(GitlabMergeRequest.owner_id == user.id)).scalars()
+    )
+
+
+def test_unchanged_pages_are_not_stored_again(db, user):
+    stub = GitlabStub()
+    assert sync(db, user, stub).inserted == 1
+
+    counts = sync(db, user, stub)
+
+    assert (counts.inserted, counts.updated, counts.deleted) == (0, 0, 0)
+    assert stub.not_modified() > 0
+    assert stored_references(db, user) == ["acme/notifier!7"]
+
+
+def test_pages_whose_write_failed_are_fetched_again(db, user, monkeypatch):
+    stub = GitlabStub()
+
+    def fail(db, owner_id, mr_data_list):
+        raise RuntimeError("Database operation failed")
+
+    monkeypatch.setattr(gitlab, "store_gitlab_merge_requests_page", fail)
+    with pytest.raises(RuntimeError):
+        sync(db, user, stub)
+    monkeypatch.undo()
+    monkeypatch.setattr(app_settings, "GITLAB_FULL_SYNC_INTERVAL_SECONDS", 0)
+
+    counts = sync(db, user, stub)
+
+    assert counts.inserted == 1
+    assert stored_references(db, user) == ["acme/notifier!7"]
+
+
+def test_unchanged_pages_are_fetched_again_when_their_rows_are_gone(db, user):
+    stub = GitlabStub()
+    sync(db, user, stub)
+    db_writer.write_blocking(lambda session: session.execute(delete(GitlabMergeRequest)))
+
+    counts = sync(db, user, stub)
+
+    assert counts.inserted == 1
+    assert stored_references(db, user) == ["acme/notifier!7"]
+
+
+def test_merge_requests_with_the_same_iid_in_different_projects_are_both_stored(db, user):
+    stub = GitlabStub()
+    merge_request = stub.merge_requests[0]
+    stub.merge_requests.append({
+        **merge_request,
+        "id": merge_request["id"] + 1,
+        "references": {**merge_request["references"], "full": "acme/dashboard!7"},
+        "web_url": "https://gitlab.example.com/acme/dashboard/-/merge_requests/7",
+    })
+
+    counts = sync(db, user, stub)
+
+    assert counts.inserted == 2
+    assert stored_references(db, user) == ["acme/dashboard!7", "acme/notifier!7"]
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from app.core.db import db_writer, write_engine
+from app.crud.bulk import bulk_upsert, delete_keys
+from app.crud.search import search_items
+from app.models import JiraIssue
+
+UPDATED_AT = datetime(2024, 1, 2, 3, 4, 5)
+
+TITLES = {
+    "NOT-1": "Polling backoff",
+    "NOT-2": "Dashboard caching",
+    "NOT-3": "Webhook signatures",
+}
+
+
+def issue(key: str, title: str) -> dict:
+    return {
+        'issue': key,
+        'title': title,
+        'description': '',
+        'status': 'To Do',
+        'created_at': UPDATED_AT,
+        'updated_at': UPDATED_AT,
+        'url': f"https://acme.atlassian.net/browse/{key}",
+    }
+
+
+def search(db, user, query):
+    db.rollback()
+    return [(result.key, result.title) for result in search_items(db, user.id, query, source="jira")]
+
+
+def test_search_finds_items_by_the_start_of_a_word(db, user):
+    db_writer.write_blocking(bulk_upsert, JiraIssue, 'issue', [issue(key, title) for key, title in TITLES.items()], user.id)
+
+    assert search(db, user, "dash") == [("NOT-2", "Dashboard caching")]
+
+
+def test_search_still_finds_the_right_items_once_rowids_are_renumbered(db, user):
+    db_writer.write_blocking(bulk_upsert, JiraIssue, 'issue', [issue(key, title) for key, title in TITLES.items()], user.id)
+    db_writer.write_blocking(delete_keys, JiraIssue, 'issue', ["NOT-1"], user.id)
+
+    # As VACUUM may do to the implicit rowids of tables without an INTEGER PRIMARY KEY
+    with write_engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE jira_issues SET rowid = 1000 - rowid")
+    with write_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("VACUUM")
+    db_writer.write_blocking(bulk_upsert, JiraIssue, 'issue', [issue("NOT-4", "Export streaming")], user.id)
+
+    assert search(db, user, "dashboard") == [("NOT-2", "Dashboard caching")]
+    assert search(db, user, "webhook") == [("NOT-3", "Webhook signatures")]
+    assert search(db, user, "export") == [("NOT-4", "Export streaming")]
+    assert search(db, user, "polling") == []
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel
+from starlette.requests import Request
+
+from app.api.cache import ResponseCache
+from app.core.singleflight import SingleFlight
+
+TIMEOUT = 5
+
+
+class Body(BaseModel):
+    value: int
+
+
+def request(path: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+def test_async_and_thread_callers_share_one_flight():
+    flights = SingleFlight(0)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append("thread")
+        started.set()
+        assert release.wait(TIMEOUT)
+        return "result"
+
+    async def async_work():
+        calls.append("async")
+        return "async result"
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flights.run_blocking, "key", work)
+            assert await asyncio.to_thread(started.wait, TIMEOUT)
+            follower = pool.submit(flights.run_blocking, "key", work)
+            waiter = asyncio.ensure_future(flights.run("key", async_work))
+            await asyncio.sleep(0.05)
+            assert not waiter.done()
+
+            release.set()
+            return leader.result(TIMEOUT), follower.result(TIMEOUT), await asyncio.wait_for(waiter, TIMEOUT)
+
+    assert asyncio.run(run()) == ("result", "result", "result")
+    assert calls == ["thread"]
+
+
+def test_a_thread_caller_waits_for_the_flight_an_async_caller_started():
+    flights = SingleFlight(0)
+    release = asyncio.Event()
+    calls = []
+
+    async def work():
+        calls.append("async")
+        await release.wait()
+        return "result"
+
+    def blocking_work():
+        calls.append("thread")
+        return "thread result"
+
+    async def run():
+        leader = asyncio.ensure_future(flights.run("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(asyncio.to_thread(flights.run_blocking, "key", blocking_work))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(leader, follower), TIMEOUT)
+
+    assert asyncio.run(run()) == ["result", "result"]
+    assert calls == ["async"]
+
+
+def test_concurrent_misses_of_the_response_cache_build_the_body_once():
+    cache = ResponseCache(max_entries=10)
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(1)
+        started.set()
+        assert release.wait(TIMEOUT)
+        return Body(value=1)
+
+    def get():
+        return cache.get(request("/api/v1/issues"), 1, 0, build)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(get)
+        assert started.wait(TIMEOUT)
+        second = pool.submit(get)
+        # Give the second request the time to miss while the first one builds
+        time.sleep(0.05)
+        release.set()
+        bodies = [first.result(TIMEOUT).body, second.result(TIMEOUT).body]
+
+    assert bodies == [b'{"value":1}', b'{"value":1}']
+    assert len(builds) == 1
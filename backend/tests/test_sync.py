@@ -0,0 +1,251 @@
+import asyncio
+import json
+import random
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+from sqlalchemy import select
+
+from app.core.db import db_writer
+from app.crud.bulk import bulk_upsert
+from app.crud.settings import create_settings
+from app.crud.sync import run_sync
+from app.crud.sync_state import get_sync_state, record_sync
+from app.models import GithubPullRequest, JiraIssue, SyncCounts
+
+from tests.conftest import USER_SETTINGS
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "upstream"
+
+RATE_LIMITED = {"errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]}
+
+
+class GithubStub:
+    """
+    Serves the recorded search page for the pull requests the user authored, and
+    `review` for those awaiting their review.
+    """
+
+    def __init__(self, review: dict | None = None) -> None:
+        self.authored = json.loads((FIXTURES_DIR / "github_search.json").read_text())
+        self.review = review or {"data": {"search": {"pageInfo": {"hasNextPage": False}, "nodes": []}}}
+        self.requests: list[httpx.Request] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        search = json.loads(request.content)["variables"]["search"]
+        return httpx.Response(200, json=self.authored if "author:" in search else self.review)
+
+
+def sync(source: str, user, handler):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await run_sync(source, client, [user])
+
+    return asyncio.run(run())
+
+
+def stored_pull_requests(db, user):
+    db.rollback()
+    return sorted(
+        db.execute(select(GithubPullRequest.reference).where(GithubPullRequest.owner_id == user.id)).scalars()
+    )
+
+
+def test_github_sync_stores_pull_requests(db, user):
+    status = sync("github", user, GithubStub().handle)[user.id]
+
+    assert status.status == "ok"
+    assert status.counts.inserted == 1
+    assert stored_pull_requests(db, user) == ["notifier#42"]
+    assert get_sync_state(db, "github", user.id).last_synced_at is not None
+
+
+def test_github_pull_requests_with_the_same_number_in_different_repositories_are_both_stored(db, user):
+    stub = GithubStub()
+    pull_request = stub.authored["data"]["search"]["nodes"][0]
+    stub.authored["data"]["search"]["nodes"].append(
+        {**pull_request, "repository": {"name": "dashboard"}, "url": "https://github.com/acme/dashboard/pull/42"}
+    )
+
+    status = sync("github", user, stub.handle)[user.id]
+
+    assert status.counts.inserted == 2
+    assert stored_pull_requests(db, user) == ["dashboard#42", "notifier#42"]
+
+
+def test_rate_limited_github_sync_is_stale_and_keeps_the_last_synced_data(db, user):
+    synced_at = datetime(2024, 5, 1)
+    stored = {
+        'reference': 'notifier#7',
+        'pull_request': 7,
+        'title': "Older pull request",
+        'description': '',
+        'status': 'OPEN',
+        'created_at': synced_at,
+        'updated_at': synced_at,
+        'repository': 'notifier',
+        'url': "https://github.com/acme/notifier/pull/7",
+        'is_assigned': False,
+    }
+    db_writer.write_blocking(bulk_upsert, GithubPullRequest, 'reference', [stored], user.id)
+    db_writer.write_blocking(record_sync, "github", user.id, None, SyncCounts(inserted=1))
+    last_synced_at = get_sync_state(db, "github", user.id).last_synced_at
+
+    status = sync("github", user, GithubStub(review=RATE_LIMITED).handle)[user.id]
+
+    assert status.status == "stale"
+    assert "RATE_LIMITED" in status.message
+    # The page fetched before the limit was hit is stored; nothing is deleted without every page
+    assert stored_pull_requests(db, user) == ["notifier#42", "notifier#7"]
+    db.rollback()
+    state = get_sync_state(db, "github", user.id)
+    assert state.last_synced_at == last_synced_at
+    assert state.last_error == status.message
+
+
+class GithubOrgStub(GithubStub):
+    """
+    Also serves the organization search, matching `issue_count` pull requests but
+    listing only the one carol authored, and reports the scopes of each token.
+    """
+
+    def __init__(self, issue_count: int, scopes: dict[str, str]) -> None:
+        super().__init__(review={"data": {"search": {"pageInfo": {"hasNextPage": False}, "nodes": [REVIEW_NODE]}}})
+        node = self.authored["data"]["search"]["nodes"][0]
+        self.org = {"data": {"search": {
+            "issueCount": issue_count,
+            "pageInfo": {"hasNextPage": False},
+            "nodes": [{**node, "author": {"login": "carol"}, "reviewRequests": {"nodes": []}}],
+        }}}
+        self.scopes = scopes
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        response = super().handle(request)
+        search = json.loads(request.content)["variables"]["search"]
+        if "author:" not in search and "review-requested:" not in search:
+            response = httpx.Response(200, json=self.org)
+        elif "author:dave" in search or "review-requested:carol" in search:
+            response = httpx.Response(200, json=EMPTY_SEARCH)
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        response.headers["X-OAuth-Scopes"] = self.scopes[token]
+        return response
+
+    def org_searches(self) -> int:
+        searches = [json.loads(request.content)["variables"]["search"] for request in self.requests]
+        return sum(1 for search in searches if "author:" not in search and "review-requested:" not in search)
+
+
+EMPTY_SEARCH = {"data": {"search": {"pageInfo": {"hasNextPage": False}, "nodes": []}}}
+
+# A pull request awaiting the review of dave, which the organization search did not list
+REVIEW_NODE = {
+    "number": 7,
+    "title": "Older pull request",
+    "body": "",
+    "state": "OPEN",
+    "url": "https://github.com/acme/notifier/pull/7",
+    "createdAt": "2024-05-01T00:00:00Z",
+    "updatedAt": "2024-05-01T00:00:00Z",
+    "repository": {"name": "notifier"},
+}
+
+
+def sync_group(users, handler):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await run_sync("github", client, users)
+
+    return asyncio.run(run())
+
+
+def reviewer(token: str):
+    return db_writer.write_blocking(
+        create_settings, **{**USER_SETTINGS, "user_name": "dave", "github_user": "dave", "github_access_token": token}
+    )
+
+
+def test_truncated_organization_search_falls_back_to_the_searches_of_each_user(db, user):
+    dave = reviewer("dave-token")
+    stub = GithubOrgStub(issue_count=1500, scopes={"test-github-token": "repo, read:org", "dave-token": "read:org, repo"})
+    # The first sync learns the scopes of the tokens from the searches of each user
+    sync_group([user, dave], stub.handle)
+    assert stored_pull_requests(db, dave) == ["notifier#7"]
+
+    statuses = sync_group([user, dave], stub.handle)
+
+    assert stub.org_searches() == 1
+    assert statuses[dave.id].status == "ok"
+    assert statuses[dave.id].counts.deleted == 0
+    assert stored_pull_requests(db, user) == ["notifier#42"]
+    assert stored_pull_requests(db, dave) == ["notifier#7"]
+
+
+def test_complete_organization_search_is_shared_by_tokens_with_the_same_scopes(db, user):
+    dave = reviewer("dave-token")
+    stub = GithubOrgStub(issue_count=1, scopes={"test-github-token": "repo, read:org", "dave-token": "read:org, repo"})
+    sync_group([user, dave], stub.handle)
+    sent = len(stub.requests)
+
+    sync_group([user, dave], stub.handle)
+
+    assert stub.org_searches() == 1
+    assert len(stub.requests) == sent + 1
+    assert stored_pull_requests(db, user) == ["notifier#42"]
+
+
+def test_tokens_with_different_scopes_do_not_share_the_organization_search(db, user):
+    dave = reviewer("dave-token")
+    stub = GithubOrgStub(issue_count=1, scopes={"test-github-token": "repo, read:org", "dave-token": "public_repo"})
+    sync_group([user, dave], stub.handle)
+
+    sync_group([user, dave], stub.handle)
+
+    assert stub.org_searches() == 0
+    assert stored_pull_requests(db, dave) == ["notifier#7"]
+
+
+class JiraStub:
+    """
+    Serves `count` issues by offset. Like Jira, it only keeps their order between
+    requests when the JQL orders them; otherwise each request sees another order.
+    """
+
+    def __init__(self, count: int) -> None:
+        template = json.loads((FIXTURES_DIR / "jira_search.json").read_text())["issues"][0]
+        self.issues = [{**template, "key": f"NOT-{number}"} for number in range(1, count + 1)]
+        self.requests: list[httpx.Request] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        params = request.url.params
+        start_at, max_results = int(params["startAt"]), int(params["maxResults"])
+        issues = list(self.issues)
+        if params["jql"].endswith("ORDER BY key ASC"):
+            issues.sort(key=lambda issue: int(issue["key"].split("-")[1]))
+        else:
+            random.Random(start_at).shuffle(issues)
+        return httpx.Response(200, json={
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(issues),
+            "issues": issues[start_at:start_at + max_results],
+        })
+
+
+def stored_issues(db, user):
+    db.rollback()
+    return set(db.execute(select(JiraIssue.issue).where(JiraIssue.owner_id == user.id)).scalars())
+
+
+def test_jira_sync_pages_through_issues_in_a_stable_order(db, user):
+    stub = JiraStub(250)
+
+    assert sync("jira", user, stub.handle)[user.id].status == "ok"
+    assert stored_issues(db, user) == {issue["key"] for issue in stub.issues}
+
+    # The incremental sync that follows orders its issues as well
+    assert sync("jira", user, stub.handle)[user.id].status == "ok"
+    assert all(request.url.params["jql"].endswith("ORDER BY key ASC") for request in stub.requests)
+    assert 'updated >= "-' in stub.requests[-1].url.params["jql"]
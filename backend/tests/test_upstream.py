@@ -0,0 +1,132 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.core.circuit import OPEN, circuit_breakers
+from app.core.config import settings as app_settings
+from app.core.http import UpstreamClients
+from app.core.rate_limit import rate_limits
+from app.crud.sync import _probes, refresh_source, stop_probes, sync_all_users
+from app.models import GithubPullRequest
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "upstream"
+
+
+class GithubStub:
+    """
+    Serves the recorded search page, reporting `remaining` points left until an
+    hour from now, or answers every request with `status`.
+    """
+
+    def __init__(self, remaining: int = 4987, status: int = 200) -> None:
+        self.page = json.loads((FIXTURES_DIR / "github_search.json").read_text())
+        self.reset_at = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+        self.page["data"]["rateLimit"].update(remaining=remaining, resetAt=f"{self.reset_at.isoformat()}Z")
+        self.status = status
+        self.requests: list[httpx.Request] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status != 200:
+            return httpx.Response(self.status, json={"message": "Server Error"})
+        return httpx.Response(200, json=self.page, headers={"X-RateLimit-Resource": "graphql"})
+
+
+def run(stub: GithubStub, sync):
+    async def run_with_clients():
+        clients = UpstreamClients(transport=httpx.MockTransport(stub.handle))
+        try:
+            return await sync(clients)
+        finally:
+            await clients.aclose()
+
+    return asyncio.run(run_with_clients())
+
+
+def sync_github(clients: UpstreamClients):
+    return sync_all_users("github", clients["github"])
+
+
+def github_budget():
+    [budget] = [budget for budget in rate_limits.budgets() if budget.source == "github"]
+    return budget
+
+
+def test_scheduled_sync_through_the_upstream_clients_records_its_cost(db, user):
+    stub = GithubStub()
+
+    statuses = run(stub, sync_github)
+
+    assert statuses[user.id].status == "ok"
+    assert db.execute(select(GithubPullRequest.reference)).scalars().all() == ["notifier#42"]
+    # The authored and the review search, at the cost the GraphQL results report
+    assert len(stub.requests) == 2
+    budget = github_budget()
+    assert (budget.remaining, budget.run_cost) == (4987, 2)
+    assert circuit_breakers["github"].is_closed
+
+
+def test_failing_upstream_trips_the_circuit(user):
+    stub = GithubStub(status=502)
+
+    for _ in range(app_settings.CIRCUIT_FAILURE_THRESHOLD):
+        assert run(stub, sync_github)[user.id].status == "error"
+    sent = len(stub.requests)
+
+    assert circuit_breakers["github"].state == OPEN
+    assert run(stub, sync_github) == {}
+    status = run(stub, lambda clients: refresh_source("github", clients, user))
+    assert status.status == "stale"
+    assert len(stub.requests) == sent
+
+
+def test_used_up_budget_stops_the_sync_before_the_next_request(user):
+    stub = GithubStub(remaining=0)
+
+    # The first search reports the budget used up, so the second one is not sent
+    status = run(stub, sync_github)[user.id]
+    assert status.status == "stale"
+    assert len(stub.requests) == 1
+
+    status = run(stub, sync_github)[user.id]
+    assert status.status == "stale"
+    assert len(stub.requests) == 1
+
+    # The scheduler waits for the reset
+    wait = rate_limits.next_interval("github", 60)
+    assert wait == pytest.approx((stub.reset_at - datetime.utcnow()).total_seconds(), abs=5)
+
+
+def test_budget_paces_the_scheduled_syncs(user):
+    # Ten points left, one kept in reserve: the next four runs of two points are spread until the reset
+    stub = GithubStub(remaining=10)
+    stub.page["data"]["rateLimit"]["limit"] = 10
+
+    run(stub, sync_github)
+
+    wait = rate_limits.next_interval("github", 60)
+    until_reset = (stub.reset_at - datetime.utcnow()).total_seconds()
+    assert wait == pytest.approx(until_reset / ((10 - 1) / 2), abs=5)
+
+
+def test_shutdown_cancels_the_recovery_probes(user):
+    stub = GithubStub(status=502)
+
+    async def trip_and_stop(clients: UpstreamClients):
+        for _ in range(app_settings.CIRCUIT_FAILURE_THRESHOLD):
+            await sync_all_users("github", clients["github"])
+        probe = _probes["github"]
+        assert not probe.done()
+
+        await stop_probes()
+        return probe
+
+    probe = run(stub, trip_and_stop)
+
+    assert probe.cancelled()
+    assert _probes == {}
@@ -0,0 +1,235 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings as app_settings
+from app.core.db import db_writer
+from app.core.http import UpstreamClients
+from app.crud.jira import known_account_ids
+from app.crud.settings import create_or_update_settings, create_settings
+from app.main import app
+from app.models import GithubPullRequest, GitlabMergeRequest, JiraIssue
+from fixtures.replay_webhooks import FIXTURES_DIR, signed_headers
+
+from tests.conftest import USER_SETTINGS
+
+# The Jira account of the assignee of the recorded issue
+JIRA_ACCOUNT_ID = "5b10ac8d82e05b22cc7d4ef5"
+
+# What every recorded delivery does to the stored items of a user whose every
+# source matches it, when replayed on its own
+APPLIED = {
+    "github_ping.json": False,
+    "github_pull_request_closed.json": True,
+    "github_pull_request_opened.json": True,
+    "github_pull_request_review_request_removed.json": True,
+    "gitlab_merge_request_merged.json": True,
+    "gitlab_merge_request_opened.json": True,
+    "jira_issue_done.json": True,
+    "jira_issue_updated.json": True,
+}
+
+
+class UpstreamStub:
+    """
+    Answers the account lookups the webhooks of Jira and GitLab need, and keeps the requests it answered.
+    """
+
+    def __init__(self) -> None:
+        self.requests: list[httpx.Request] = []
+        self.available = True
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if not self.available:
+            return httpx.Response(503)
+        if request.url.path.endswith("/myself"):
+            return httpx.Response(200, json={"accountId": JIRA_ACCOUNT_ID})
+        if request.url.path.endswith("/user"):
+            return httpx.Response(200, json={"username": "carol"})
+        return httpx.Response(404)
+
+
+@pytest.fixture(autouse=True)
+def webhook_secrets(monkeypatch):
+    monkeypatch.setattr(app_settings, "GITHUB_WEBHOOK_SECRET", "test-github-secret")
+    monkeypatch.setattr(app_settings, "GITLAB_WEBHOOK_TOKEN", "test-gitlab-token")
+    monkeypatch.setattr(app_settings, "JIRA_WEBHOOK_SECRET", "test-jira-secret")
+
+
+@pytest.fixture
+def upstream():
+    stub = UpstreamStub()
+    clients = UpstreamClients(transport=httpx.MockTransport(stub.handle))
+    app.state.upstream_clients = clients
+    yield stub
+    del app.state.upstream_clients
+    asyncio.run(clients.aclose())
+
+
+@pytest.fixture
+def reviewer():
+    # The recorded pull request requests the review of bob
+    return db_writer.write_blocking(create_settings, **{**USER_SETTINGS, "github_user": "bob"})
+
+
+def replay(client, name: str, headers: dict | None = None):
+    fixture = json.loads((FIXTURES_DIR / name).read_text())
+    body = json.dumps(fixture["payload"]).encode()
+    headers = signed_headers(fixture["source"], body, fixture["headers"]) if headers is None else headers
+    return client.post(f"/api/v1/webhooks/{fixture['source']}", content=body, headers=headers)
+
+
+def stored(db, column, owner_id):
+    db.rollback()
+    return sorted(db.execute(select(column).where(column.class_.owner_id == owner_id)).scalars())
+
+
+@pytest.mark.parametrize("name", sorted(path.name for path in FIXTURES_DIR.glob("*.json")))
+def test_every_recorded_delivery_is_accepted(client, upstream, reviewer, name):
+    response = replay(client, name)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["applied"] is APPLIED[name]
+
+
+def test_github_deliveries_store_and_remove_the_pull_request(client, db, reviewer):
+    response = replay(client, "github_pull_request_opened.json")
+    assert response.json()["counts"][str(reviewer.id)]["inserted"] == 1
+    assert stored(db, GithubPullRequest.reference, reviewer.id) == ["notifier#42"]
+
+    response = replay(client, "github_pull_request_review_request_removed.json")
+    assert response.json()["counts"][str(reviewer.id)]["deleted"] == 1
+    assert stored(db, GithubPullRequest.reference, reviewer.id) == []
+
+
+def test_gitlab_deliveries_store_and_remove_the_merge_request(client, db, upstream, user):
+    replay(client, "gitlab_merge_request_opened.json")
+    assert stored(db, GitlabMergeRequest.reference, user.id) == ["acme/notifier!7"]
+
+    replay(client, "gitlab_merge_request_merged.json")
+    assert stored(db, GitlabMergeRequest.reference, user.id) == []
+
+
+def test_jira_deliveries_store_and_remove_the_issue(client, db, upstream, user):
+    response = replay(client, "jira_issue_updated.json")
+    assert response.json()["counts"][str(user.id)]["inserted"] == 1
+    assert stored(db, JiraIssue.issue, user.id) == ["NOT-12"]
+
+    replay(client, "jira_issue_done.json")
+    assert stored(db, JiraIssue.issue, user.id) == []
+
+    # The account id is looked up once per settings version
+    assert sum(1 for request in upstream.requests if request.url.path.endswith("/myself")) == 1
+
+
+def test_jira_account_lookups_are_replaced_when_the_settings_change(client, upstream, user):
+    replay(client, "jira_issue_updated.json")
+    db_writer.write_blocking(create_or_update_settings, user.id, jira_api_key="rotated-jira-key")
+    replay(client, "jira_issue_updated.json")
+
+    assert sum(1 for request in upstream.requests if request.url.path.endswith("/myself")) == 2
+    assert list(known_account_ids) == [user.id]
+
+
+def test_jira_deliveries_are_retried_while_the_account_lookup_fails(client, upstream, user):
+    upstream.available = False
+
+    assert replay(client, "jira_issue_updated.json").status_code == 503
+
+
+@pytest.mark.parametrize("name, headers", [
+    ("github_pull_request_opened.json", {"X-GitHub-Event": "pull_request"}),
+    ("github_pull_request_opened.json", {"X-GitHub-Event": "pull_request", "X-Hub-Signature-256": "sha256=" + "0" * 64}),
+    ("gitlab_merge_request_opened.json", {"X-Gitlab-Event": "Merge Request Hook"}),
+    ("gitlab_merge_request_opened.json", {"X-Gitlab-Event": "Merge Request Hook", "X-Gitlab-Token": "wrong"}),
+    ("jira_issue_updated.json", {}),
+    ("jira_issue_updated.json", {"X-Hub-Signature": "sha256=" + "0" * 64}),
+])
+def test_deliveries_without_a_valid_signature_are_refused(client, db, upstream, user, name, headers):
+    response = replay(client, name, headers)
+
+    assert response.status_code == 401
+    assert upstream.requests == []
+    assert stored(db, JiraIssue.issue, user.id) == []
+
+
+def test_deliveries_signed_with_another_secret_are_refused(client, user, monkeypatch):
+    fixture = json.loads((FIXTURES_DIR / "github_pull_request_opened.json").read_text())
+    body = json.dumps(fixture["payload"]).encode()
+    monkeypatch.setattr(app_settings, "GITHUB_WEBHOOK_SECRET", "another-secret")
+    headers = signed_headers("github", body, fixture["headers"])
+    monkeypatch.setattr(app_settings, "GITHUB_WEBHOOK_SECRET", "test-github-secret")
+
+    response = client.post("/api/v1/webhooks/github", content=body, headers=headers)
+
+    assert response.status_code == 401
+
+
+def test_deliveries_of_an_unconfigured_source_are_not_found(client, monkeypatch):
+    monkeypatch.setattr(app_settings, "GITHUB_WEBHOOK_SECRET", None)
+
+    assert replay(client, "github_pull_request_opened.json").status_code == 404
+
+
+def post(client, name: str, edit=lambda payload: None):
+    fixture = json.loads((FIXTURES_DIR / name).read_text())
+    edit(fixture["payload"])
+    body = json.dumps(fixture["payload"]).encode()
+    return client.post(
+        f"/api/v1/webhooks/{fixture['source']}",
+        content=body,
+        headers=signed_headers(fixture["source"], body, fixture["headers"]),
+    )
+
+
+@pytest.mark.parametrize("later, earlier, column", [
+    ("github_pull_request_closed.json", "github_pull_request_opened.json", GithubPullRequest.reference),
+    ("github_pull_request_review_request_removed.json", "github_pull_request_opened.json", GithubPullRequest.reference),
+    ("gitlab_merge_request_merged.json", "gitlab_merge_request_opened.json", GitlabMergeRequest.reference),
+    ("jira_issue_done.json", "jira_issue_updated.json", JiraIssue.issue),
+])
+def test_late_deliveries_do_not_bring_back_removed_items(client, db, upstream, reviewer, later, earlier, column):
+    replay(client, earlier)
+    assert stored(db, column, reviewer.id) != []
+
+    replay(client, later)
+    response = replay(client, earlier)
+
+    assert response.status_code == 200
+    assert stored(db, column, reviewer.id) == []
+
+
+def test_deliveries_that_never_saw_the_item_removed_do_not_bring_it_back(client, db, reviewer):
+    replay(client, "github_pull_request_closed.json")
+    replay(client, "github_pull_request_opened.json")
+
+    assert stored(db, GithubPullRequest.reference, reviewer.id) == []
+
+
+def test_late_deliveries_do_not_overwrite_newer_changes(client, db, reviewer):
+    def retitle(payload):
+        payload["pull_request"].update(title="Cache the dashboard", updated_at="2024-05-02T10:45:00Z")
+
+    post(client, "github_pull_request_opened.json", retitle)
+    response = replay(client, "github_pull_request_opened.json")
+
+    assert response.json()["counts"][str(reviewer.id)]["unchanged"] == 1
+    db.rollback()
+    assert db.execute(select(GithubPullRequest.title)).scalars().all() == ["Cache the dashboard"]
+
+
+def test_newer_deliveries_bring_back_removed_items(client, db, reviewer):
+    replay(client, "github_pull_request_closed.json")
+
+    def reopen(payload):
+        payload["pull_request"].update(state="open", merged=False, updated_at="2024-05-04T08:00:00Z")
+        payload["pull_request"]["requested_reviewers"] = [{"login": "bob", "id": 102, "type": "User"}]
+
+    post(client, "github_pull_request_closed.json", reopen)
+
+    assert stored(db, GithubPullRequest.reference, reviewer.id) == ["notifier#42"]
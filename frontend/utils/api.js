@@ -0,0 +1,31 @@
+import { API_BASE_URL } from '~/config';
+
+// The backend's API token is kept in this browser only; it is never part of the saved settings
+const TOKEN_KEY = 'apiToken';
+
+export function getApiToken() {
+  return localStorage.getItem(TOKEN_KEY) || '';
+}
+
+export function setApiToken(token) {
+  if (token) {
+    localStorage.setItem(TOKEN_KEY, token);
+  } else {
+    localStorage.removeItem(TOKEN_KEY);
+  }
+}
+
+export function apiFetch(path, options = {}) {
+  const token = getApiToken();
+  const headers = { ...options.headers };
+  if (token) {
+    headers.Authorization = `Bearer ${token}`;
+  }
+  return fetch(`${API_BASE_URL}${path}`, { ...options, headers });
+}
+
+// EventSource cannot send headers, so the token goes in the query string
+export function eventsUrl() {
+  const token = getApiToken();
+  return token ? `${API_BASE_URL}/events?token=${encodeURIComponent(token)}` : `${API_BASE_URL}/events`;
+}
@@ -0,0 +1,57 @@
+import { eventsUrl } from '~/utils/api';
+
+// One connection per tab, shared by every component that listens
+let eventSource = null;
+const listeners = new Set();
+let wasConnected = false;
+
+function notify(type, data) {
+  listeners.forEach(listener => listener(type, data));
+}
+
+function connect() {
+  eventSource = new EventSource(eventsUrl());
+
+  eventSource.onopen = () => {
+    // Events sent while the connection was down are lost, so lists are fetched again
+    notify(wasConnected ? 'resync' : 'open', {});
+    wasConnected = true;
+  };
+  eventSource.onerror = () => notify('error', {});
+
+  ['change', 'sync'].forEach(type => {
+    eventSource.addEventListener(type, event => notify(type, JSON.parse(event.data)));
+  });
+  eventSource.addEventListener('resync', () => notify('resync', {}));
+}
+
+export function subscribeToEvents(listener) {
+  listeners.add(listener);
+  if (eventSource === null) {
+    connect();
+  }
+
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0 && eventSource !== null) {
+      eventSource.close();
+      eventSource = null;
+      wasConnected = false;
+    }
+  };
+}
+
+// A new API token only applies to a new connection; listeners get a resync once it opens
+export function reconnectEvents() {
+  if (eventSource !== null) {
+    eventSource.close();
+    connect();
+  }
+}
+
+export function applyChanges(items, change) {
+  const byKey = new Map(items.map(item => [item[change.key], item]));
+  [...change.added, ...change.updated].forEach(item => byKey.set(item[change.key], item));
+  change.removed.forEach(key => byKey.delete(key));
+  return Array.from(byKey.values());
+}